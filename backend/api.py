@@ -1,29 +1,131 @@
-from fastapi import FastAPI, HTTPException, Body, status
+from fastapi import (FastAPI, HTTPException, Body, Depends, Header, Query, Request, WebSocket,
+                     WebSocketDisconnect, status)
 from fastapi.middleware.cors import CORSMiddleware
-from supabase import create_client, Client
-from dotenv import load_dotenv
-import os
+from fastapi.middleware.gzip import GZipMiddleware
+import asyncio
+import hmac
+import json
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from google import genai
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 
-# Load environment variables
-load_dotenv()
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from cache import cache
+from chat_context import ContextSource, Deadline, format_timings, gather_sources
+from context_builder import Section, build_context, format_report
+from feature_matrix import FeatureMatrixStore
+from http_cache import COMPRESS_MIN_SIZE, conditional_response, encode
+from live import ChangeFeed, LiveHub, parse_topics
+import deps
+import metrics
+from listing import CURSOR_HEADER, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
+from ml import MIN_FEATURE_COVERAGE, Scorer, load_best
+import fixtures_ingest
+import odds_scraper
+import simulation
+from repository import RepositoryError, SupabaseRepository, build_params
+from settlement import BetRejected, place_bet, settle_match
+from stats import STATS_TABLES, fetch_table, parse_categories, resolve_teams
+from streaming import SSE_HEADERS, sse_event, sse_stream
+from team_index import TeamIndexHolder, tokenize
+from value_bets import MARKETS, ValueBetService, devig, latest_by_team, odds_filters, pick_key, to_decimal
 
 # --- Configuration ---
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
-SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+# Environment (and .env) settings are read on first use, not at import; see
+# deps.settings() for WARMUP, SIMULATION_JOBS and the CHAT_* limits.
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Clients are built on first use or during warm-up, not at import (see deps.py)
+repo = deps.repo
+client = deps.gemini
+
+# Team-name automaton for chat queries, loaded once and refreshed in the background
+team_index = TeamIndexHolder(lambda: repo.select("teams", "id,name,country_code"))
+
+# Team x feature matrix over the stats tables; blocks rebuild when their table's cache version moves
+feature_store = FeatureMatrixStore(lambda table: cached_select(table), team_index.get, cache.version)
+
+# Push channel for match / value bet / odds changes (see live.py)
+hub = LiveHub()
+changes = ChangeFeed(hub)
+
+def rows_written(table: str, rows: List[dict], *dependents: str):
+    """After a write: drop cached reads of the table (and dependents) and push the deltas."""
+    cache.invalidate(table, *dependents)
+    changes.rows_changed(table, rows)
+    value_bets.schedule(table)
+
+def value_bets_written(upserted: List[dict], removed: list):
+    cache.invalidate("valuebets")
+    changes.rows_changed("valuebets", upserted, key=pick_key)
+    changes.rows_deleted("valuebets", [f"{market}:{team_id}" for market, team_id in removed])
+
+# Recomputes `valuebets` from odds + model probabilities when either changes
+value_bets = ValueBetService(repo, team_index.get, value_bets_written)
+
+# Served qualification model: the best saved artifact, loaded once at startup
+scorer: Optional[Scorer] = None
 
-if not all([SUPABASE_ANON_KEY, SUPABASE_URL, GEMINI_API_KEY]):
-    raise ValueError("Missing required environment variables. Check your .env file.")
+def load_scorer():
+    global scorer
+    try:
+        artifact = load_best()
+    except Exception as e:
+        print(f"Model artifact load failed: {e}")
+        return
+    scorer = Scorer(artifact) if artifact else None
+    print(f"Serving model {scorer.model_version}" if scorer else "No model artifacts found")
 
-# Initialize Clients
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Opt-in (PROFILE_SLOW_MS): flame-graph samples for slow requests, see metrics.py
+slow_requests: Optional[metrics.SlowRequestDumper] = None
 
-app = FastAPI(title="Sports Betting Companion API")
+def profile_slow_request(route: str, start: float, end: float):
+    if slow_requests is not None:
+        slow_requests(route, start, end)
+
+async def warm_up():
+    """
+    Build the clients and preload what the first requests would otherwise
+    wait on. Failures are logged, not fatal: those loads retry on demand.
+    """
+    start = time.perf_counter()
+    steps = {
+        "scorer": asyncio.to_thread(load_scorer),
+        "supabase": asyncio.to_thread(deps.repo.get),
+        # The Gemini SDK import is the slowest step; keep it off the event loop
+        "gemini": asyncio.to_thread(deps.gemini.get),
+        "team_index": team_index.get(),
+        "feature_matrix": feature_store.get(),
+        "top_features": cached_select("top_features", order="ranking"),
+    }
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for name, result in zip(steps, results):
+        if isinstance(result, BaseException):
+            print(f"Warm-up step {name} failed: {result}")
+    print(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global slow_requests
+    deps.check()
+    slow_requests = metrics.profiler_from_env()
+    if deps.settings().warmup:
+        await warm_up()
+    else:
+        await asyncio.to_thread(load_scorer)
+    team_index.start()
+    feature_store.start()
+    yield
+    if slow_requests is not None:
+        slow_requests.profiler.stop()
+    await feature_store.stop()
+    await team_index.stop()
+    await deps.aclose()
+
+app = FastAPI(title="Sports Betting Companion API", lifespan=lifespan)
 
 # --- Middleware ---
 app.add_middleware(
@@ -32,7 +134,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CURSOR_HEADER],
 )
+# List endpoints send pre-compressed bodies; this covers everything else
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+# Outermost, so route latency includes compression
+app.add_middleware(metrics.MetricsMiddleware, on_request=profile_slow_request)
+metrics.registry.add_collector(lambda: {f"cache_{k}": v for k, v in cache.stats().items()})
+metrics.registry.add_collector(lambda: {f"live_{k}": v for k, v in hub.stats().items() if k != "topics"})
+metrics.registry.add_collector(lambda: {"live_feed_rows": len(changes), "live_feed_evicted": changes.evicted})
 
 # --- Pydantic Models with Validation ---
 class Match(BaseModel):
@@ -62,20 +172,113 @@ class ResultUpdate(BaseModel):
     score_team1: int = Field(..., ge=0)
     score_team2: int = Field(..., ge=0)
 
+class MatchProbability(BaseModel):
+    team1_id: int = Field(..., gt=0)
+    team2_id: int = Field(..., gt=0)
+    team1_win: float = Field(..., ge=0, le=1)
+    draw: float = Field(..., ge=0, le=1)
+    team2_win: float = Field(..., ge=0, le=1)
+
+class SimulationRequest(BaseModel):
+    matches: List[MatchProbability] = Field(default_factory=list, max_length=200,
+                                            description="Outcome probabilities for group fixtures")
+
 class ChatRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=500, description="User query")
 
+# --- Cached reads ---
+async def cached_select(table: str, columns: str = "*", *, filters=None, order: Optional[str] = None,
+                        limit: Optional[int] = None, any_of=None):
+    """Read-through cached `select` (tagged with the table for invalidation)."""
+    async def load():
+        return await repo.select(table, columns, filters=filters, order=order, limit=limit, any_of=any_of)
+
+    # The encoded query string is the cache key, so equal queries share an entry
+    key = (table,) + tuple(build_params(columns, filters, order, False, limit, any_of))
+    return await cache.get_or_load_async(key, load, tags=(table,))
+
+async def list_page(request: Request, table: str, fields: Optional[str], after: Optional[str],
+                    limit: Optional[int], filters=None, any_of=None, key: str = "id"):
+    """
+    One keyset page of `table`. The page is cached already serialized, so a
+    repeat poll is answered with a 304 or the stored bytes.
+    """
+    async def load():
+        page = await fetch_page(repo.select, table, fields=fields, after=after, limit=limit,
+                                filters=filters, any_of=any_of, key=key)
+        return encode(page.rows), page.next_cursor
+
+    try:
+        cache_key = ("page", table, key, fields, after, limit) + tuple(
+            build_params(filters=filters, any_of=any_of))
+        body, cursor = await cache.get_or_load_async(cache_key, load, tags=(table,))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RepositoryError as e:
+        # PostgREST rejects unknown columns in `fields` with a 400
+        if e.status_code == 400 and fields:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid fields for {table}")
+        raise
+    return conditional_response(request, body, {CURSOR_HEADER: cursor} if cursor else None)
+
+def parse_date(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid {name}. Use ISO 8601 format.")
+
+# Shared query parameters for the paginated list endpoints
+FIELDS = Query(None, description="Comma-separated columns to return (default: all)")
+AFTER = Query(None, description=f"Cursor from the previous page's {CURSOR_HEADER} header")
+LIMIT = Query(None, ge=1, le=MAX_PAGE_SIZE,
+              description=f"Page size (default: every row, or {DEFAULT_PAGE_SIZE} when paging with a cursor)")
+
+# --- Auth ---
+ADMIN_KEY_HEADER = "X-Admin-Key"
+
+async def current_user_id(authorization: Optional[str] = Header(None)) -> str:
+    """Id of the Supabase user whose access token is sent as `Authorization: Bearer <token>`."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Sign in to continue",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        user = await repo.auth_user(token)
+    except Exception as e:
+        print(f"Auth lookup failed: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Unable to verify credentials")
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user["id"]
+
+def require_admin(x_admin_key: Optional[str] = Header(None, alias=ADMIN_KEY_HEADER)) -> None:
+    """Operator endpoints need the ADMIN_API_KEY; without one configured they stay closed."""
+    expected = deps.settings().admin_api_key
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Admin endpoints are disabled (ADMIN_API_KEY is not set)")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), expected.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin key")
+
 # --- Endpoints ---
 
 @app.get("/", status_code=status.HTTP_200_OK)
-def root():
+async def root():
     return {"status": "Sports Betting API is running", "version": "1.0"}
 
 @app.get("/teams", status_code=status.HTTP_200_OK)
-def get_teams():
+async def get_teams(request: Request, group_name: Optional[str] = None,
+                    fields: Optional[str] = FIELDS, after: Optional[str] = AFTER, limit: Optional[int] = LIMIT):
     try:
-        result = supabase.table("teams").select("*").execute()
-        return result.data if result.data else []
+        filters = {"group_name": ("eq", group_name)} if group_name else None
+        return await list_page(request, "teams", fields, after, limit, filters)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Database error fetching teams: {e}")
         raise HTTPException(
@@ -84,10 +287,12 @@ def get_teams():
         )
 
 @app.get("/match_cards", status_code=status.HTTP_200_OK)
-def get_match_cards():
+async def get_match_cards(request: Request, fields: Optional[str] = FIELDS,
+                          after: Optional[str] = AFTER, limit: Optional[int] = LIMIT):
     try:
-        result = supabase.table("match_cards").select("*").execute()
-        return result.data if result.data else []
+        return await list_page(request, "match_cards", fields, after, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Database error fetching match cards: {e}")
         raise HTTPException(
@@ -96,10 +301,29 @@ def get_match_cards():
         )
 
 @app.get("/matches", status_code=status.HTTP_200_OK)
-def get_matches():
+async def get_matches(request: Request,
+                      status_: Optional[str] = Query(None, alias="status", pattern="^(upcoming|live|finished)$"),
+                      stage: Optional[str] = None, team_id: Optional[int] = None,
+                      date_from: Optional[str] = None, date_to: Optional[str] = None,
+                      fields: Optional[str] = FIELDS, after: Optional[str] = AFTER, limit: Optional[int] = LIMIT):
+    """
+    Matches ordered by id, filtered in the database.
+    status / stage: exact match; team_id: either side; date_from / date_to: ISO 8601, inclusive.
+    """
+    filters = {}
+    if status_:
+        filters["status"] = ("eq", status_)
+    if stage:
+        filters["stage"] = ("eq", stage)
+    dates = [(op, parse_date(v, name)) for op, v, name in
+             (("gte", date_from, "date_from"), ("lte", date_to, "date_to")) if v]
+    if dates:
+        filters["match_date"] = dates
+    any_of = [("team1_id", "eq", team_id), ("team2_id", "eq", team_id)] if team_id else None
     try:
-        result = supabase.table("matches").select("*").execute()
-        return result.data if result.data else []
+        return await list_page(request, "matches", fields, after, limit, filters, any_of)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Database error: {e}")
         raise HTTPException(
@@ -108,7 +332,7 @@ def get_matches():
         )
 
 @app.post("/matches", status_code=status.HTTP_201_CREATED)
-def post_matches(match: Match):
+async def post_matches(match: Match):
     try:
         if match.status == "upcoming":
             clean_date = match.match_date.replace("Z", "+00:00")
@@ -126,15 +350,16 @@ def post_matches(match: Match):
                     detail="Match date must be in the future for upcoming matches."
                 )
 
-        result = supabase.table("matches").insert(match.dict()).execute()
+        rows = await repo.insert("matches", match.dict())
         
-        if not result.data:
+        if not rows:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create match"
             )
         
-        return result.data[0]
+        rows_written("matches", rows, "match_cards")
+        return rows[0]
     
     except HTTPException:
         raise
@@ -145,15 +370,116 @@ def post_matches(match: Match):
             detail=f"Server error: {str(e)}"
         )
     
+@app.post("/matches/ingest", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def ingest_matches(league: int = fixtures_ingest.WORLD_CUP, season: int = 2026,
+                         offline: bool = False, create_teams: bool = True):
+    """
+    Load a league season's fixtures from API-Football into matches (upserted
+    on api_ref; admin key required). offline: use cached responses only;
+    create_teams: insert teams the index cannot resolve instead of skipping
+    their fixtures.
+    """
+    try:
+        fixtures = await fixtures_ingest.fetch_fixtures(league, season, offline=offline)
+        result = await fixtures_ingest.ingest(repo, await team_index.get(), fixtures,
+                                              create_teams=create_teams)
+    except fixtures_ingest.IngestError as e:
+        print(f"Fixture ingestion failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Unable to fetch fixtures from API-Football"
+        )
+    except Exception as e:
+        print(f"Error ingesting fixtures: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to ingest fixtures"
+        )
+    if result["teams_created"]:
+        rows_written("teams", result["teams_created"], "match_cards")
+        await team_index.refresh()
+    rows_written("matches", result["matches"], "match_cards")
+    return {"fixtures": result["fixtures"], "matches": len(result["matches"]),
+            "teams_created": [t["name"] for t in result["teams_created"]]}
+
+# Betting Endpoints
+
+@app.post("/bets", status_code=status.HTTP_201_CREATED)
+async def post_bet(bet: Bet, user_id: str = Depends(current_user_id)):
+    """
+    Place a bet: the stake is debited from the user's balance in the same
+    transaction. Only the signed-in user can bet for themselves.
+    """
+    if bet.user_id != user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot place bets for another user")
+    try:
+        row = await place_bet(repo, bet.dict())
+        cache.invalidate("bets")
+        return row
+    except BetRejected as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        print(f"Error placing bet: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to place bet"
+        )
+
+@app.post("/results", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def post_result(result: ResultUpdate):
+    """
+    Record a final score and settle every pending bet on the match (admin
+    key required). Safe to retry: already settled bets are never paid again.
+    """
+    try:
+        summary = await settle_match(repo, result.match_id, result.score_team1, result.score_team2)
+    except BetRejected as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        print(f"Error settling match {result.match_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to settle match"
+        )
+
+    cache.invalidate("bets")
+    rows_written("matches", [{"id": result.match_id, "score_team1": result.score_team1,
+                              "score_team2": result.score_team2, "status": "finished"}], "match_cards")
+    return summary._asdict()
+
+@app.get("/user_bets", status_code=status.HTTP_200_OK)
+async def get_user_bets(request: Request, bet_type: Optional[str] = None,
+                        result: Optional[str] = Query(None, pattern="^(pending|won|lost|void)$"),
+                        fields: Optional[str] = FIELDS, after: Optional[str] = AFTER,
+                        limit: Optional[int] = LIMIT, user_id: str = Depends(current_user_id)):
+    """The signed-in user's bets, oldest first."""
+    filters = {"user_id": ("eq", user_id)}
+    if bet_type:
+        filters["bet_type"] = ("eq", bet_type)
+    if result:
+        filters["result"] = ("eq", result)
+    try:
+        return await list_page(request, "bets", fields, after, limit, filters)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Database error fetching bets: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to fetch bets"
+        )
+
 # Odds Endpoints
 
 @app.get("/qualifying_odds", status_code=status.HTTP_200_OK)
-def get_qualifying_odds():
+async def get_qualifying_odds(request: Request, team: Optional[str] = None, fields: Optional[str] = FIELDS,
+                              after: Optional[str] = AFTER, limit: Optional[int] = LIMIT):
     """Fetch all qualifying odds data."""
     try:
-        # Fetch data from the 'qualifying_odds' table
-        result = supabase.table("qualifying_odds").select("*").execute()
-        return result.data if result.data else []
+        filters = {"team": ("eq", team)} if team else None
+        return await list_page(request, "qualifying_odds", fields, after, limit, filters)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Database error fetching qualifying odds: {e}")
         raise HTTPException(
@@ -161,13 +487,39 @@ def get_qualifying_odds():
             detail="Unable to fetch qualifying odds from database"
         )
 
+@app.post("/qualifying_odds/scrape", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def scrape_qualifying_odds(sources: Optional[str] = None, offline: bool = False):
+    """
+    Scrape historical group-stage odds and upsert them into
+    historical_qualifying_odds (never the live qualifying_odds prices;
+    admin key required). sources: comma-separated subset of the scraper's sources (default all);
+    offline: parse the cached pages only.
+    """
+    try:
+        wanted = odds_scraper.parse_sources(sources)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        rows = await odds_scraper.scrape(wanted, offline=offline)
+        rows = await odds_scraper.write_odds(repo, rows)
+    except Exception as e:
+        print(f"Error scraping qualifying odds: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Unable to scrape qualifying odds"
+        )
+    rows_written(odds_scraper.ODDS_TABLE, rows)
+    return {"sources": [s.key for s in wanted], "rows": len(rows)}
+
 @app.get("/outright_winning_odds", status_code=status.HTTP_200_OK)
-def get_outright_winning_odds():
+async def get_outright_winning_odds(request: Request, team: Optional[str] = None, fields: Optional[str] = FIELDS,
+                                    after: Optional[str] = AFTER, limit: Optional[int] = LIMIT):
     """Fetch outright winning odds (e.g., tournament winners)."""
     try:
-        # Fetch data from the 'outright_winning_odds' table
-        result = supabase.table("outright_winning_odds").select("*").execute()
-        return result.data if result.data else []
+        filters = {"team": ("eq", team)} if team else None
+        return await list_page(request, "outright_winning_odds", fields, after, limit, filters)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Database error fetching outright odds: {e}")
         raise HTTPException(
@@ -176,16 +528,16 @@ def get_outright_winning_odds():
         )
 
 @app.get("/valuebets", status_code=status.HTTP_200_OK)
-def get_value_bets():
-    try:
-        result = supabase.table("valuebets").select("*").execute()
+async def get_value_bets(request: Request):
+    async def load():
+        rows = await repo.select("valuebets", order="rank")
         
         # Return actual data or demo fallback
-        if result.data and len(result.data) > 0:
-            return result.data
+        if rows:
+            return encode(rows)
         else:
             # Demo data for testing
-            return [
+            return encode([
                 {
                     "id": 1,
                     "match": "ARG vs BRA",
@@ -206,43 +558,66 @@ def get_value_bets():
                     "edge": "3.1%",
                     "ev": "4.0%"
                 },
-            ]
+            ])
+
+    try:
+        body = await cache.get_or_load_async(("json", "valuebets"), load, tags=("valuebets",))
+        return conditional_response(request, body)
     except Exception as e:
         print(f"Database error fetching value bets: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Unable to fetch value bets"
         )
+
+@app.post("/valuebets/refresh", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def refresh_value_bets(markets: Optional[str] = None):
+    """
+    Recompute value bets from the odds tables and model probabilities and
+    write the changed picks back (admin key required).
+    markets: comma-separated subset of 'qualify', 'outright'.
+    """
+    wanted = [m.strip() for m in markets.split(",") if m.strip()] if markets else None
+    unknown = [m for m in wanted or [] if m not in value_bets.engine.markets]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid market {', '.join(unknown)}. Available: {', '.join(value_bets.engine.markets)}"
+        )
+    try:
+        return await value_bets.refresh(wanted)
+    except Exception as e:
+        print(f"Error computing value bets: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to compute value bets"
+        )
+
 #stats endpointsto
 @app.get("/stats", status_code=status.HTTP_200_OK)
-def get_stats(category: str = "standard", team_id: Optional[int] = None):
+async def get_stats(request: Request, category: str = "standard", team_id: Optional[int] = None,
+                    fields: Optional[str] = FIELDS, after: Optional[str] = AFTER, limit: Optional[int] = LIMIT):
     """
     Fetch raw stats from one of the 4 specific tables.
     Categories: 'standard', 'shooting', 'passing', 'goalkeeping'
+    Without team_id, pages are keyed by the table's team name column.
     """
-    # Map simple category names to your exact Supabase table names
-    table_map = {
-        "standard": "2026 WC Quals Standard Stats",
-        "shooting": "2026 WC Quals Shooting Stats",
-        "passing": "2026 WC Quals Passing Stats",
-        "goalkeeping": "2026 WC Quals Goalkeeping Stats"
-    }
-    
-    table_name = table_map.get(category.lower())
+    spec = STATS_TABLES.get(category.lower())
     
-    if not table_name:
+    if not spec:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
-            detail=f"Invalid category. Available: {', '.join(table_map.keys())}"
+            detail=f"Invalid category. Available: {', '.join(STATS_TABLES.keys())}"
         )
 
     try:
-        query = supabase.table(table_name).select("*")
         if team_id:
-            query = query.eq("team_id", team_id)
-        
-        result = query.execute()
-        return result.data if result.data else []
+            index = await team_index.get()
+            teams = resolve_teams(index, [team_id])
+            return list((await fetch_table(repo, spec, index, teams)).values()) if teams else []
+        return await list_page(request, spec.table, fields, after, limit, key=spec.name_column)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"DB Error fetching {category} stats: {e}")
         raise HTTPException(
@@ -251,14 +626,106 @@ def get_stats(category: str = "standard", team_id: Optional[int] = None):
         )
 
 
+@app.get("/stats/bulk", status_code=status.HTTP_200_OK)
+async def get_bulk_stats(team_ids: Optional[str] = None, teams: Optional[str] = None,
+                         categories: Optional[str] = None):
+    """
+    Stats for many teams and categories in one call, one document per team.
+    team_ids: comma-separated IDs; teams: comma-separated names (aliases allowed);
+    categories: comma-separated subset of 'standard', 'shooting', 'passing', 'goalkeeping'.
+    """
+    try:
+        wanted = parse_categories(categories)
+        ids = [int(i) for i in team_ids.split(",") if i.strip()] if team_ids else []
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    names = [n.strip() for n in teams.split(",") if n.strip()] if teams else []
+    if not ids and not names:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Provide team_ids and/or teams")
+
+    try:
+        index = await team_index.get()
+        matrix = await feature_store.get()
+        return matrix.documents(resolve_teams(index, ids, names), wanted)
+    except Exception as e:
+        print(f"DB Error fetching bulk stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to fetch stats"
+        )
+
+
+# --- Feature matrix ---
+@app.get("/features", status_code=status.HTTP_200_OK)
+async def get_features(team_ids: Optional[str] = None, teams: Optional[str] = None,
+                       columns: Optional[str] = None):
+    """
+    Numeric team x feature matrix, one row per team keyed by teams.id.
+    team_ids / teams: comma-separated filters (default: every team);
+    columns: comma-separated 'category.column' names or whole categories.
+    Missing values are null.
+    """
+    try:
+        ids = [int(i) for i in team_ids.split(",") if i.strip()] if team_ids else []
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="team_ids must be integers")
+    names = [n.strip() for n in teams.split(",") if n.strip()] if teams else []
+    wanted = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+    try:
+        matrix = await feature_store.get()
+        if ids or names:
+            selected = resolve_teams(await team_index.get(), ids, names)
+        else:
+            selected = [{"id": int(t), "name": n} for t, n in zip(matrix.team_ids, matrix.team_names)]
+        try:
+            cols = [matrix.columns[i] for i in matrix.column_indices(wanted)] if wanted else matrix.columns
+        except KeyError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown column {e}")
+        values = matrix.select([t["id"] for t in selected], cols)
+        return {
+            "columns": cols,
+            "teams": [
+                {"team_id": t["id"], "name": t["name"],
+                 "values": [None if v != v else v for v in row]}  # NaN -> null
+                for t, row in zip(selected, values.tolist())
+            ],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error building feature matrix: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to fetch features"
+        )
+
+
+@app.get("/features/{team_id}", status_code=status.HTTP_200_OK)
+async def get_team_features(team_id: int):
+    """All features for one team, grouped by stats category."""
+    try:
+        matrix = await feature_store.get()
+    except Exception as e:
+        print(f"Error building feature matrix: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to fetch features"
+        )
+    i = matrix.row_index(team_id)
+    if i is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Team not found")
+    return matrix.documents([{"id": team_id, "name": matrix.team_names[i]}])[0]
+
+
 @app.get("/top_features", status_code=status.HTTP_200_OK)
-def get_top_features():
+async def get_top_features():
     """
     Fetch the list of most important features determined by the ML model.
     """
     try:
-        result = supabase.table("top_features").select("*").order("ranking", desc=False).execute()
-        return result.data if result.data else []
+        return await cached_select("top_features", order="ranking")
     except Exception as e:
         print(f"DB Error fetching features: {e}")
         raise HTTPException(
@@ -266,117 +733,549 @@ def get_top_features():
             detail="Unable to fetch ML features"
         )
 
+# --- Model scoring ---
+def require_scorer() -> Scorer:
+    if scorer is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="No trained model available")
+    return scorer
+
+@app.get("/model", status_code=status.HTTP_200_OK)
+async def get_model():
+    """The served model's version, training metrics and feature coverage."""
+    model = require_scorer()
+    try:
+        matrix = await feature_store.get()
+        missing, coverage = model.missing_features(matrix), round(model.feature_coverage(matrix), 4)
+    except Exception as e:
+        print(f"Error building feature matrix: {e}")
+        missing = coverage = None
+    return {
+        "model_version": model.model_version,
+        "trained_at": model.artifact.trained_at,
+        "metrics": model.artifact.metrics,
+        "features": model.artifact.features,
+        "missing_features": missing,
+        "feature_coverage": coverage,
+    }
+
+@app.get("/predictions/qualify", status_code=status.HTTP_200_OK)
+async def predict_qualify(team_ids: Optional[str] = None, teams: Optional[str] = None):
+    """
+    Probability of qualifying from the group stage, for every team or for
+    team_ids / teams (comma-separated; names may be aliases).
+    """
+    model = require_scorer()
+    try:
+        ids = [int(i) for i in team_ids.split(",") if i.strip()] if team_ids else []
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="team_ids must be integers")
+    names = [n.strip() for n in teams.split(",") if n.strip()] if teams else []
+
+    try:
+        matrix = await feature_store.get()
+        if ids or names:
+            selected = resolve_teams(await team_index.get(), ids, names)
+        else:
+            selected = [{"id": int(t), "name": n} for t, n in zip(matrix.team_ids, matrix.team_names)]
+        probs = model.predict(matrix, [t["id"] for t in selected])
+    except Exception as e:
+        print(f"Scoring error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to score teams"
+        )
+    return [
+        {"team_id": t["id"], "name": t["name"],
+         "probability": None if p != p else round(float(p), 4), "model_version": model.model_version}
+        for t, p in zip(selected, probs.tolist())
+    ]
+
+@app.get("/predictions/qualify/{team_id}", status_code=status.HTTP_200_OK)
+async def predict_team_qualify(team_id: int):
+    rows = await predict_qualify(team_ids=str(team_id))
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Team not found")
+    return rows[0]
+
+@app.post("/predictions/qualify/publish", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def publish_qualify_predictions(min_coverage: float = Query(MIN_FEATURE_COVERAGE, ge=0, le=1)):
+    """
+    Write every team's probability to model_probabilities (feeds the value-bet
+    engine; admin key required). Refused with a 409 when less than
+    min_coverage of the model's inputs are in the stats tables, since the
+    missing ones would be scored as 0.
+    """
+    model = require_scorer()
+    try:
+        matrix = await feature_store.get()
+        coverage = model.feature_coverage(matrix)
+    except Exception as e:
+        print(f"Error building feature matrix: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to publish predictions"
+        )
+    if coverage < min_coverage:
+        missing = model.missing_features(matrix)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only {coverage:.0%} of {model.model_version}'s feature values are available "
+                   f"(minimum {min_coverage:.0%}); missing features: {', '.join(missing) or 'none'}"
+        )
+    try:
+        probs = model.predict_all(matrix)
+        rows = [{"team_id": int(t), "market": "qualify", "probability": round(float(p), 6),
+                 "model_version": model.model_version}
+                for t, p in zip(matrix.team_ids, probs.tolist())]
+        await repo.upsert("model_probabilities", rows, on_conflict="team_id,market")
+    except Exception as e:
+        print(f"Error publishing predictions: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to publish predictions"
+        )
+    rows_written("model_probabilities", rows)
+    return {"model_version": model.model_version, "teams": len(rows), "feature_coverage": round(coverage, 4)}
+
+# --- Tournament simulation ---
+SIMS = Query(100_000, ge=1_000, le=2_000_000, description="Tournaments to simulate")
+SIMULATION_TAGS = ("teams", "matches", *(m.odds_table for m in MARKETS.values()),
+                   *(t.table for t in STATS_TABLES.values()))
+
+async def run_simulation(sims: int, seed: int, match_probs=None):
+    """
+    Simulate the tournament from `teams` groups and `matches` results. Team
+    strength comes from the served model's qualification probabilities
+    (equal strengths without a model); `match_probs` overrides single fixtures.
+    """
+    teams = await cached_select("teams")
+    matches = await cached_select("matches")
+    probs, ratings_from = {}, "uniform"
+    if scorer is not None:
+        matrix = await feature_store.get()
+        probs = dict(zip(matrix.team_ids.tolist(), scorer.predict_all(matrix).tolist()))
+        ratings_from = scorer.model_version
+    ratings = simulation.ratings_from_probabilities(probs, [t["id"] for t in teams])
+    try:
+        tournament = simulation.build_tournament(teams, matches, ratings, match_probs)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    start = time.perf_counter()
+    # CPU-bound; keep the event loop free
+    result = await asyncio.to_thread(simulation.simulate, tournament, sims, seed=seed, n_jobs=deps.settings().simulation_jobs)
+    print(f"Simulated {sims} tournaments in {time.perf_counter() - start:.2f}s")
+    return result, ratings_from
+
+async def market_prices() -> dict:
+    """{market: {team_id: (american odds, vig-free probability)}} from the odds tables."""
+    index = await team_index.get()
+    prices = {}
+    for name, market in MARKETS.items():
+        odds = latest_by_team(await cached_select(market.odds_table, filters=odds_filters(market)),
+                              index, "odds")
+        ids = list(odds)
+        if not ids:
+            prices[name] = {}
+            continue
+        implied = 1 / to_decimal([odds[t] for t in ids], market.odds_format)
+        fair = devig(implied, [0] * len(ids), [float(market.winners)])
+        prices[name] = {t: (odds[t], round(float(p), 4)) for t, p in zip(ids, fair.tolist())}
+    return prices
+
+async def simulation_response(result, ratings_from: str) -> dict:
+    teams = {t["id"]: t for t in await cached_select("teams")}
+    prices = await market_prices()
+    rows = []
+    for row in result.rows():
+        team = teams.get(row["team_id"], {})
+        row = {"team_id": row["team_id"], "name": team.get("name"),
+               "group": simulation.group_letter(team.get("group_name")), **row}
+        # Side by side with the bookmaker's vig-free price for the same event
+        for market in simulation.MARKET_STAGES:
+            odds, fair = prices[market].get(row["team_id"], (None, None))
+            row[f"{market}_odds"], row[f"{market}_fair_prob"] = odds, fair
+        rows.append(row)
+    rows.sort(key=lambda r: (r["group"] or "", -r["qualify"]))
+    return {"n_sims": result.n_sims, "seed": result.seed, "ratings": ratings_from,
+            "std_error": round(result.std_error(), 5), "teams": rows}
+
+@app.get("/simulations/tournament", status_code=status.HTTP_200_OK)
+async def get_tournament_simulation(sims: int = SIMS, seed: int = 2026):
+    """
+    Group finish, qualification (round of 32), knockout advancement and
+    outright probabilities per team from a Monte Carlo run of the tournament.
+    """
+    async def load():
+        return await simulation_response(*await run_simulation(sims, seed))
+
+    try:
+        key = ("simulation", sims, seed, scorer.model_version if scorer else None)
+        return await cache.get_or_load_async(key, load, tags=SIMULATION_TAGS)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Simulation error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to simulate tournament"
+        )
+
+@app.post("/simulations/tournament", status_code=status.HTTP_200_OK)
+async def post_tournament_simulation(request: SimulationRequest, sims: int = SIMS, seed: int = 2026):
+    """Like GET, with win/draw/win probabilities given for some group fixtures."""
+    match_probs = {(m.team1_id, m.team2_id): (m.team1_win, m.draw, m.team2_win) for m in request.matches}
+    if any(sum(p) <= 0 for p in match_probs.values()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Outcome probabilities sum to 0")
+    try:
+        return await simulation_response(*await run_simulation(sims, seed, match_probs))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Simulation error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to simulate tournament"
+        )
+
+@app.post("/simulations/tournament/publish", status_code=status.HTTP_200_OK,
+          dependencies=[Depends(require_admin)])
+async def publish_tournament_simulation(sims: int = SIMS, seed: int = 2026, markets: Optional[str] = None):
+    """
+    Write simulated probabilities to model_probabilities (feeds the value-bet
+    engine; admin key required). markets: comma-separated subset of 'qualify', 'outright'.
+    """
+    wanted = [m.strip() for m in markets.split(",") if m.strip()] if markets else list(simulation.MARKET_STAGES)
+    unknown = [m for m in wanted if m not in simulation.MARKET_STAGES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid market {', '.join(unknown)}. Available: {', '.join(simulation.MARKET_STAGES)}"
+        )
+    try:
+        result, ratings_from = await run_simulation(sims, seed)
+        probs = result.probabilities()
+        version = f"sim-{sims}-{seed}:{ratings_from}"
+        rows = [{"team_id": int(t), "market": market, "probability": round(float(p), 6), "model_version": version}
+                for market in wanted
+                for t, p in zip(result.team_ids.tolist(), probs[simulation.MARKET_STAGES[market]].tolist())]
+        await repo.upsert("model_probabilities", rows, on_conflict="team_id,market")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error publishing simulation: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to publish simulation"
+        )
+    rows_written("model_probabilities", rows)
+    return {"model_version": version, "markets": wanted, "teams": len(result.team_ids)}
+
 # --- GEMINI CHAT ENDPOINT ---
+# Prompt sections, most important first (see context_builder.build_context)
+PRIORITY_RANKINGS, PRIORITY_STATS, PRIORITY_VALUEBETS, PRIORITY_MATCHES, PRIORITY_ODDS = range(5)
+
+MATCH_COLUMNS = ("team1_id", "team2_id", "match_date", "stage", "venue", "status")
+
+async def stats_sections(teams: List[dict]) -> List[Section]:
+    """One section per stats table for the mentioned teams, read from the feature matrix."""
+    matrix = await feature_store.get()
+    sections = []
+    for category, spec in STATS_TABLES.items():
+        rows = []
+        for t in teams:
+            features = matrix.features(t['id'], category)
+            if features is not None:
+                rows.append(dict({"team": t['name']}, **features))
+        if rows:
+            sections.append(Section(spec.table, f"DATA - {spec.table}", PRIORITY_STATS, rows))
+    return sections
+
+def mentioned_first(rows: List[dict], teams: List[dict], column: str = "team") -> List[dict]:
+    """Put rows about the mentioned teams first so truncation keeps them."""
+    names = {t['name'].lower() for t in teams}
+    return sorted(rows, key=lambda r: str(r.get(column, "")).lower() not in names)
+
+async def rows_section(name: str, label: str, priority: int, rows_coro, columns=None,
+                       teams: Optional[List[dict]] = None) -> Optional[Section]:
+    rows = await rows_coro
+    if not rows:
+        return None
+    if teams:
+        rows = mentioned_first(rows, teams)
+    return Section(name, label, priority, rows, columns)
+
+def context_source(name: str, fetch, key: tuple = (), tables: tuple = ()) -> ContextSource:
+    """A chat context source whose sections are cached until its tables (default: `name`) change."""
+    tables = tables or (name,)
+    return ContextSource(name, lambda: cache.get_or_load_async(("chat-block", name) + key, fetch, tags=tables), tables)
+
+async def plan_chat(request: ChatRequest):
+    """Detect teams and pick context sources. Returns (query, context header, sources)."""
+    query = request.query.strip().lower()
+    if not query:
+        raise HTTPException(status_code=400, detail="Query empty")
+
+    context = "Role: Sports betting assistant. Use the provided DATA to answer.\n"
+
+    # 1. Detect Teams (Store names AND IDs)
+    mentioned_teams = [] # List of dicts: {'id': 1, 'name': 'Mexico'}
+    try:
+        index = await team_index.get()
+        mentioned_teams = index.detect(request.query)
+        for team in mentioned_teams:
+            context += f"Detected Team: {team['name']} (ID: {team['id']})\n"
+    except Exception as e:
+        print(f"Team lookup warning: {e}")
+
+    # 2. Context sources, one per keyword bucket / stats table
+    sources = []
+    team_key = tuple(sorted(t['id'] for t in mentioned_teams))
+
+    if any(w in query for w in ["match", "game", "vs", "play", "schedule"]):
+        sources.append(context_source("matches", lambda: rows_section(
+            "matches", "Upcoming Matches", PRIORITY_MATCHES,
+            repo.select("matches", limit=5), MATCH_COLUMNS)))
+
+    if any(w in query for w in ["bet", "value", "odds", "money", "wager"]):
+        sources.append(context_source("valuebets", lambda: rows_section(
+            "valuebets", "Top Value Bets", PRIORITY_VALUEBETS, repo.select("valuebets", limit=3))))
+
+    if any(w in query for w in ["qualify", "outright", "winner", "champion", "tournament"]):
+        sources.append(context_source("outright_winning_odds", lambda: rows_section(
+            "outright_winning_odds", "Outright Odds", PRIORITY_ODDS,
+            repo.select("outright_winning_odds", limit=100), teams=mentioned_teams), team_key))
+        sources.append(context_source("qualifying_odds", lambda: rows_section(
+            "qualifying_odds", "Qualifying Odds", PRIORITY_ODDS,
+            repo.select("qualifying_odds", limit=100), teams=mentioned_teams), team_key))
+
+    stat_triggers = ["stat", "shoot", "goal", "xg", "perform", "analysis", "win", "chance", "predict", "pass"]
+    should_fetch_stats = any(w in query for w in stat_triggers) or len(mentioned_teams) > 0
+
+    if should_fetch_stats:
+        # A. Rankings
+        async def rankings():
+            top_feats = await repo.select("top_features", "feature_name,ranking", order="ranking", limit=5)
+            if not top_feats:
+                return None
+            feats = [f"{f['feature_name']} (Rank #{f['ranking']})" for f in top_feats]
+            return Section("top_features", "Model's Top Predictive Stats", PRIORITY_RANKINGS,
+                           top_feats, text=", ".join(feats))
+
+        sources.append(context_source("top_features", rankings))
+
+        # B. Specific Team Stats, cached per team set
+        if mentioned_teams:
+            sources.append(context_source(
+                "stats", lambda: stats_sections(mentioned_teams), team_key,
+                tuple(spec.table for spec in STATS_TABLES.values())))
+
+    return query, context, sources
+
+async def assemble_context(context: str, sources: List[ContextSource]):
+    """
+    Fetch every section concurrently under the time budget, then render them
+    under the token budget. Returns (context, complete).
+    """
+    settings = deps.settings()
+    results, timings = await gather_sources(sources, Deadline(settings.chat_context_budget),
+                                            settings.chat_source_timeout)
+    complete = all(t.status in ("ok", "empty") for t in timings)
+    sections = []
+    for s in sources:
+        result = results[s.name]
+        if result:
+            sections.extend(result if isinstance(result, list) else [result])
+    ranking = results.get("top_features")
+    features = [r["feature_name"] for r in ranking.rows] if ranking else []
+
+    built = build_context(context, sections, features, settings.chat_context_tokens)
+    print(f"Chat context timings: {format_timings(timings)} | {format_report(built)}")
+    return built.text, complete
+
+def system_prompt(context: str, query: str) -> str:
+    system_instruction = f"""
+    {context}
+    
+    Answer using the DATA provided.
+    1. If 'Top Predictive Stats' are listed, use them to prioritize your analysis.
+    2. Look for specific stats in the DATA tables provided (pipe-separated columns, e.g. 'Per 90 Gls', 'Cmp%').
+    """
+    return f"System: {system_instruction}\n\nUser: {query}"
+
 @app.post("/chat", status_code=status.HTTP_200_OK)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     try:
-        query = request.query.strip().lower()
-        if not query:
-            raise HTTPException(status_code=400, detail="Query empty")
-        
-        context = "Role: Sports betting assistant. Use the provided DATA to answer.\n"
-        
-        # 1. Detect Teams (Store names AND IDs)
-        mentioned_teams = [] # List of dicts: {'id': 1, 'name': 'Mexico'}
-        try:
-            all_teams = supabase.table("teams").select("id, name").execute()
-            if all_teams.data:
-                for team in all_teams.data:
-                    if team['name'].lower() in query:
-                        mentioned_teams.append(team)
-                        context += f"Detected Team: {team['name']} (ID: {team['id']})\n"
-        except Exception as e:
-            print(f"Team lookup warning: {e}")
-
-        # 2. General Keywords
-        if any(w in query for w in ["match", "game", "vs", "play", "schedule"]):
-            try:
-                matches = supabase.table("matches").select("*").limit(5).execute()
-                if matches.data: context += f"\nUpcoming Matches: {matches.data}\n"
-            except: pass
+        query, context, sources = await plan_chat(request)
+        tables = tuple({t for s in sources for t in s.tables}) + ("teams",)
 
-        if any(w in query for w in ["bet", "value", "odds", "money", "wager"]):
-            try:
-                val_bets = supabase.table("valuebets").select("*").limit(3).execute()
-                if val_bets.data: context += f"\nTop Value Bets: {val_bets.data}\n"
-            except: pass
+        async def answer():
+            full_context, complete = await assemble_context(context, sources)
+            return await generate_answer(system_prompt(full_context, query)), complete
 
-        if any(w in query for w in ["qualify", "outright", "winner", "champion", "tournament"]):
-            try:
-                outright = supabase.table("outright_winning_odds").select("*").limit(100).execute()
-                if outright.data: context += f"\nOutright Odds: {outright.data}\n"
-                
-                qualify = supabase.table("qualifying_odds").select("*").limit(100).execute()
-                if qualify.data: context += f"\nQualifying Odds: {qualify.data}\n"
-            except: pass
-
-        # 3. Stats & Analysis (Updated for Robustness)
-        stat_triggers = ["stat", "shoot", "goal", "xg", "perform", "analysis", "win", "chance", "predict", "pass"]
-        should_fetch_stats = any(w in query for w in stat_triggers) or len(mentioned_teams) > 0
-
-        if should_fetch_stats:
-            try:
-                # A. Rankings
-                top_feats = supabase.table("top_features").select("feature_name, ranking").order("ranking").limit(5).execute()
-                if top_feats.data:
-                    feats = [f"{f['feature_name']} (Rank #{f['ranking']})" for f in top_feats.data]
-                    context += f"\nModel's Top Predictive Stats: {', '.join(feats)}\n"
-
-                # B. Specific Team Stats (Double-Check Logic)
-                if mentioned_teams:
-                    tables = [
-                        "2026 WC Quals Standard Stats",
-                        "2026 WC Quals Shooting Stats",
-                        "2026 WC Quals Passing Stats", 
-                        "2026 WC Quals Goalkeeping Stats"
-                    ]
-                    
-                    for table in tables:
-                        # Attempt 1: Fetch by ID (Preferred)
-                        ids = [t['id'] for t in mentioned_teams]
-                        stats_res = supabase.table(table).select("*").in_("team_id", ids).execute()
-                        
-                        # Attempt 2: Fetch by Name (Fallback if IDs are missing in stats table)
-                        if not stats_res.data:
-                            names = [t['name'] for t in mentioned_teams]
-                            # Note: Supabase doesn't have an easy 'in_' for strings in all client versions, 
-                            # so we do a simple loop or single query if 1 team.
-                            # For robustness, we check 'Squad' column which usually holds the name.
-                            for name in names:
-                                name_res = supabase.table(table).select("*").eq("Squad", name).execute()
-                                if name_res.data:
-                                    context += f"\nDATA - {table} (Found by Name '{name}'): {name_res.data}\n"
-                        else:
-                            context += f"\nDATA - {table} (Found by ID): {stats_res.data}\n"
-
-            except Exception as e:
-                print(f"Stats fetch error: {e}")
-
-        # 4. Generate Answer
-        system_instruction = f"""
-        {context}
-        
-        Answer using the DATA provided.
-        1. If 'Top Predictive Stats' are listed, use them to prioritize your analysis.
-        2. Look for specific stats in the JSON data provided (e.g. 'Per 90 Gls', 'Cmp%').
-        3. If you found data via Name fallback, mention that you found the stats.
-        """
+        ttl = deps.settings().chat_cache_ttl
+        if ttl > 0:
+            # Identical questions (after normalization) reuse the last answer,
+            # unless it was built from a degraded context
+            key = ("chat-response", " ".join(tokenize(query)))
+            response, _ = await cache.get_or_load_async(
+                key, answer, tags=tables, ttl=ttl, store_if=lambda r: r[1])
+            return response
+        response, _ = await answer()
+        return response
 
-        try:
-            response = client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=f"System: {system_instruction}\n\nUser: {query}"
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Unexpected Error: {e}")
+        raise HTTPException(status_code=500, detail="Processing failed")
+
+async def generate_answer(contents: str) -> dict:
+    try:
+        with metrics.timed("gemini", GEMINI_MODEL, "generate_content") as call:
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=contents
             )
-            return {"response": response.text}
-        except Exception as e:
-            print(f"Gemini Error: {e}")
-            raise HTTPException(status_code=503, detail="AI Service Unavailable")
+            call["nbytes"] = len((response.text or "").encode())
+        return {"response": response.text}
+    except Exception as e:
+        print(f"Gemini Error: {e}")
+        raise HTTPException(status_code=503, detail="AI Service Unavailable")
 
+async def gemini_stream(contents: str):
+    """Yield answer text chunks as Gemini produces them."""
+    start = time.perf_counter()
+    nbytes, error = 0, True
+    try:
+        stream = await client.aio.models.generate_content_stream(model=GEMINI_MODEL, contents=contents)
+        async for chunk in stream:
+            if chunk.text:
+                if not nbytes:
+                    metrics.record_upstream("gemini", GEMINI_MODEL, "stream_first_token",
+                                            time.perf_counter() - start)
+                nbytes += len(chunk.text.encode())
+                yield chunk.text
+        error = False
+    finally:
+        metrics.record_upstream("gemini", GEMINI_MODEL, "generate_content_stream",
+                                time.perf_counter() - start, nbytes=nbytes, error=error)
+
+# Swappable so the stream endpoint can run against a local fake generator
+answer_stream = gemini_stream
+
+@app.post("/chat/stream", status_code=status.HTTP_200_OK)
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat over Server-Sent Events. Emits one
+    `data: {"text": ...}` event per chunk, then an `event: done` carrying
+    time-to-first-token, or `event: error` if generation fails midway.
+    """
+    started = time.perf_counter()
+    try:
+        query, context, sources = await plan_chat(request)
+        full_context, _ = await assemble_context(context, sources)
     except HTTPException:
         raise
     except Exception as e:
         print(f"Unexpected Error: {e}")
         raise HTTPException(status_code=500, detail="Processing failed")
+
+    chunks = answer_stream(system_prompt(full_context, query))
+    return StreamingResponse(sse_stream(chunks, label="Chat stream", started=started),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# --- Live updates ---
+async def live_events(sub):
+    """Coalesced event batches until the subscription closes."""
+    while True:
+        batch = await sub.next_batch()
+        if batch is None:
+            return
+        yield batch
+
+@app.websocket("/live")
+async def live_socket(websocket: WebSocket, topics: Optional[str] = None):
+    """
+    Subscribe with ?topics=matches,match:12,valuebets,odds and/or by sending
+    {"subscribe": ...} / {"unsubscribe": ...} (a list or a comma-separated
+    string). Receives {"events": [...]} batches; a "resync" event means the
+    client should refetch that topic. Invalid frames get {"error": ...}.
+    """
+    await websocket.accept()
+    try:
+        sub = hub.subscribe(parse_topics(topics))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    async def read_commands():
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    message = json.loads(text)
+                    if not isinstance(message, dict):
+                        raise ValueError("Expected a JSON object")
+                    subscribe = parse_topics(message.get("subscribe"))
+                    unsubscribe = parse_topics(message.get("unsubscribe"))
+                except ValueError as e:
+                    # A bad frame is answered, not fatal: the subscription stays open
+                    await websocket.send_json({"error": str(e)})
+                    continue
+                sub.subscribe(*subscribe)
+                sub.unsubscribe(*unsubscribe)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sub.close()
+
+    reader = asyncio.create_task(read_commands())
+    try:
+        # send_json waits on the socket, so a slow client coalesces instead of queueing
+        async for batch in live_events(sub):
+            await websocket.send_json({"events": batch})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        sub.close()
+        reader.cancel()
+
+@app.get("/live/stream", status_code=status.HTTP_200_OK)
+async def live_stream(topics: str):
+    """SSE fallback for /live: one `data: {"events": [...]}` message per batch."""
+    try:
+        wanted = parse_topics(topics)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def events():
+        sub = hub.subscribe(wanted)
+        try:
+            async for batch in live_events(sub):
+                yield sse_event({"events": batch})
+        finally:
+            sub.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/live/stats", status_code=status.HTTP_200_OK)
+async def get_live_stats():
+    """Subscriber and pending-event counts for the live hub."""
+    return hub.stats()
+
+
+# --- Cache diagnostics ---
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition: route latency, upstream timings, cache and live-hub gauges."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/cache/stats", status_code=status.HTTP_200_OK)
+async def get_cache_stats():
+    """Hit/miss counters for the in-process read cache."""
+    return cache.stats()
     
 
 if __name__ == "__main__":
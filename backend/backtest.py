@@ -0,0 +1,474 @@
+"""
+Backtesting value-bet strategies on past tournaments.
+
+A history is one row per (snapshot, team): the bookmaker's price, the
+model's probability and whether the bet won. A strategy is the set of knobs
+behind /valuebets (minimum edge and EV, flat or Kelly staking, a per-bet
+stake cap and a per-snapshot exposure cap). A whole grid of strategies is
+replayed at once, one NumPy row per strategy, in chunks spread over
+processes.
+
+Snapshots are replayed in time order. The bets of one snapshot are sized
+from the bankroll at that point and settled before the next snapshot, as a
+pre-tournament "to qualify" price is settled after the group stage.
+
+Model probabilities are out-of-fold: each tournament is predicted by a model
+fitted on the other tournaments, so no row is scored by a model that was
+trained on its outcome. Tournaments come from the training dataset's season
+of each row (ml/dataset.py), so adding e.g. a euro-2020 partition adds it
+here too.
+
+    python backtest.py                                  # every tournament in the dataset, default grid
+    python backtest.py --odds wc_2022_odds.csv --odds euro_2024_odds.csv --jobs -1
+    python backtest.py --staking kelly --kelly-fraction 0.1,0.25,0.5 --min-edge 0,0.05
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import odds_scraper
+from team_index import ALIAS_GROUPS, tokenize
+from value_bets import KELLY_FRACTION, MAX_STAKE, MIN_EV, devig, kelly, to_decimal
+
+DEFAULT_BACKTEST_DIR = Path(__file__).resolve().parent / "backtests"
+BANKROLL = 100.0
+CHUNK_SIZE = 20_000     # strategies per task; bounds the (strategies, rows) arrays
+MIN_BETS = 10           # fewer bets than this is noise, not a strategy
+TOP_N = 20
+
+# Teams advancing from the group stage: what a qualify market pays out on
+QUALIFIERS = {"wc-2022": 16, "euro-2020": 16, "euro-2024": 16}
+
+DEFAULT_GRID: Dict[str, List[Any]] = {
+    "min_edge": [-1.0, 0.0, 0.02, 0.05, 0.1],
+    "min_ev": [0.0, 0.05, 0.1, 0.2, 0.3],
+    "staking": ["flat", "kelly"],
+    "kelly_fraction": [0.1, 0.25, 0.5, 1.0],
+    "max_stake": [0.01, 0.02, 0.05, 0.1],
+    "max_exposure": [0.25, 0.5, 1.0],
+}
+
+_ALIASES = {tokenize(alias): tokenize(group[0]) for group in ALIAS_GROUPS for alias in group}
+
+
+def team_key(name: str) -> Tuple[str, ...]:
+    """Spelling-independent team key ('South Korea' and 'Korea Republic' agree)."""
+    words = tokenize(name)
+    return _ALIASES.get(words, words)
+
+
+# --- History ---
+
+class History(NamedTuple):
+    snapshots: List[str]       # replay order, e.g. ["wc-2022", "euro-2024"]
+    snapshot: np.ndarray       # (rows,) index into `snapshots`, non-decreasing
+    teams: List[str]
+    decimal: np.ndarray        # bookmaker decimal odds
+    fair: np.ndarray           # bookmaker probability, vig removed over the snapshot's full field
+    model: np.ndarray          # model probability
+    outcome: np.ndarray        # 1.0 = the bet won
+
+    @property
+    def bounds(self) -> np.ndarray:
+        """Rows of snapshot i are bounds[i]:bounds[i + 1]."""
+        return np.searchsorted(self.snapshot, np.arange(len(self.snapshots) + 1))
+
+
+def build_history(odds: Dict[str, List[Dict[str, Any]]], outcomes: Dict[str, Dict[str, int]],
+                  model: Dict[str, Dict[str, float]], *, odds_format: str = "american",
+                  winners: Optional[Dict[str, int]] = None) -> History:
+    """
+    Join each snapshot's odds rows ({team, odds}) with its outcomes and model
+    probabilities ({snapshot: {team: value}}) on team name, snapshots in the
+    order of `odds`. Teams missing an outcome or a probability are dropped
+    after the vig has been removed.
+    """
+    winners = winners or QUALIFIERS
+    snapshots, index, teams, decimal, fair, prob, outcome = [], [], [], [], [], [], []
+    for key, rows in odds.items():
+        if key not in winners:
+            raise ValueError(f"No payout count for {key} (known: {', '.join(winners)})")
+        rows = list({team_key(r["team"]): r for r in rows}.values())
+        price = to_decimal(np.array([r["odds"] for r in rows], dtype=float), odds_format)
+        field = devig(1 / price, np.zeros(len(rows), dtype=int), np.array([winners[key]], dtype=float))
+        won = {team_key(t): v for t, v in outcomes.get(key, {}).items()}
+        predicted = {team_key(t): v for t, v in model.get(key, {}).items()}
+        kept = [i for i, r in enumerate(rows) if team_key(r["team"]) in won and team_key(r["team"]) in predicted]
+        missing = [r["team"] for r in rows if team_key(r["team"]) not in won or team_key(r["team"]) not in predicted]
+        if missing:
+            print(f"{key}: no outcome or probability for {', '.join(missing)}")
+        if not kept:
+            continue
+        index += [len(snapshots)] * len(kept)
+        snapshots.append(key)
+        teams += [rows[i]["team"] for i in kept]
+        decimal.append(price[kept])
+        fair.append(field[kept])
+        prob += [predicted[team_key(rows[i]["team"])] for i in kept]
+        outcome += [won[team_key(rows[i]["team"])] for i in kept]
+    if not snapshots:
+        raise ValueError("No snapshot has odds, outcomes and model probabilities for the same teams")
+    return History(snapshots, np.array(index, dtype=np.int64), teams, np.concatenate(decimal),
+                   np.concatenate(fair), np.array(prob, dtype=float), np.array(outcome, dtype=float))
+
+
+def default_candidate(directory: Optional[Path] = None):
+    """The top candidate of the last model evaluation (results.json), else logistic regression."""
+    from ml.artifacts import artifact_dir
+    from ml.evaluation import Candidate
+
+    path = Path(directory or artifact_dir()) / "results.json"
+    if path.exists():
+        best = json.loads(path.read_text())[0]
+        return Candidate(best["model"], json.loads(best["params"]))
+    return Candidate("LogisticRegression", {"C": 1.0})
+
+
+def out_of_fold(X, y: np.ndarray, seasons: np.ndarray, candidate,
+                folds: Union[str, int] = "season") -> np.ndarray:
+    """
+    P(qualify) for every row from a model that never saw it: fitted on the
+    other tournaments (`folds="season"`) or the other stratified folds.
+    """
+    from sklearn.model_selection import LeaveOneGroupOut, StratifiedKFold, cross_val_predict
+
+    from ml.evaluation import ESTIMATORS
+
+    if folds == "season":
+        if len(set(seasons.tolist())) < 2:
+            raise ValueError("Out-of-season predictions need two tournaments; use a number of folds")
+        cv = LeaveOneGroupOut()
+    else:
+        cv = StratifiedKFold(int(folds))
+    model = ESTIMATORS[candidate.name](**candidate.params)
+    return cross_val_predict(model, X, y, groups=seasons, cv=cv, method="predict_proba")[:, 1]
+
+
+def labelled_seasons(name: Optional[str] = None, directory: Optional[Path] = None):
+    """The labelled training rows and the tournament of each row."""
+    from ml.dataset import DEFAULT_NAME, load_dataset
+
+    dataset = load_dataset(name or DEFAULT_NAME, directory).labelled()
+    return dataset, np.array(dataset.seasons)
+
+
+def _by_season(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    keys = {(s.comp_id, s.season_id): s.key for s in odds_scraper.SOURCES.values()}
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        key = keys.get((int(r["comp_id"]), int(r["season_id"])))
+        if key is not None:
+            out.setdefault(key, []).append({"team": r["team"], "odds": float(r["odds"])})
+    return out
+
+
+def read_odds(paths: Sequence[Path]) -> Dict[str, List[Dict[str, Any]]]:
+    """Odds CSVs as written by the scraper script (team, odds, comp_id, season_id), by season."""
+    rows = []
+    for path in paths:
+        with open(path, newline="") as f:
+            rows.extend(csv.DictReader(f))
+    return _by_season(rows)
+
+
+def load_history(seasons: Optional[Sequence[str]] = None, *, odds_files: Sequence[Path] = (),
+                 candidate=None, folds: Union[str, int] = "season", offline: bool = False,
+                 dataset: Optional[str] = None) -> History:
+    """
+    Past qualify markets: scraped odds (or `odds_files`) joined with the
+    training dataset's Qualify labels and out-of-fold model probabilities.
+    Seasons replay in calendar order; by default every one with outcomes.
+    """
+    data, season_of = labelled_seasons(dataset)
+    X = data.frame()
+    if np.isnan(data.X).any():
+        X = X.fillna(0.0)   # as in training and at serving time
+    y = np.asarray(data.y, dtype=int)
+    candidate = candidate or default_candidate()
+    prob = out_of_fold(X, y, season_of, candidate, folds)
+    print(f"Model probabilities: {candidate.label}, out-of-fold by {folds}")
+
+    known = list(dict.fromkeys(season_of.tolist()))
+    keys = list(seasons) if seasons else known
+    unknown = [k for k in keys if k not in known]
+    if unknown:
+        raise ValueError(f"No outcomes for {', '.join(unknown)} (dataset has {', '.join(known)})")
+    unpriced = [k for k in keys if k not in odds_scraper.SOURCES]
+    if unpriced and not odds_files:
+        raise ValueError(f"No odds source for {', '.join(unpriced)} (known: {', '.join(odds_scraper.SOURCES)}); "
+                         "give the dataset rows a season column with these keys")
+    order = {s.key: s.season_id for s in odds_scraper.SOURCES.values()}
+    keys.sort(key=lambda k: order.get(k, 0))
+
+    if odds_files:
+        odds = read_odds(odds_files)
+    else:
+        odds = _by_season(asyncio.run(odds_scraper.scrape([odds_scraper.SOURCES[k] for k in keys],
+                                                          offline=offline)))
+    outcomes: Dict[str, Dict[str, int]] = {}
+    model: Dict[str, Dict[str, float]] = {}
+    for key, team, label, p in zip(season_of.tolist(), data.keys, y.tolist(), prob.tolist()):
+        outcomes.setdefault(key, {})[team] = label
+        model.setdefault(key, {})[team] = p
+    return build_history({k: odds[k] for k in keys if k in odds}, outcomes, model)
+
+
+# --- Strategies ---
+
+class Grid(NamedTuple):
+    """Strategies as parallel arrays, one entry per strategy."""
+    min_edge: np.ndarray        # model_prob - fair_prob must be at least this
+    min_ev: np.ndarray          # EV per unit must be above this (as MIN_EV in value_bets)
+    kelly: np.ndarray           # bool: Kelly staking, else flat
+    kelly_fraction: np.ndarray  # NaN for flat staking
+    max_stake: np.ndarray       # per bet, share of bankroll (flat: the stake, off the starting bankroll)
+    max_exposure: np.ndarray    # per snapshot, share of the current bankroll
+
+    @property
+    def size(self) -> int:
+        return len(self.min_edge)
+
+    def slice(self, start: int, stop: int) -> "Grid":
+        return Grid(*(a[start:stop] for a in self))
+
+
+def _product(*axes: Sequence[float]) -> List[np.ndarray]:
+    return [m.ravel() for m in np.meshgrid(*[np.asarray(a, dtype=float) for a in axes], indexing="ij")]
+
+
+def make_grid(axes: Optional[Dict[str, List[Any]]] = None) -> Grid:
+    """Every combination of DEFAULT_GRID, with `axes` replacing whole axes (kelly_fraction only varies Kelly)."""
+    axes = {**DEFAULT_GRID, **(axes or {})}
+    unknown = [k for k in axes if k not in DEFAULT_GRID]
+    if unknown:
+        raise ValueError(f"Unknown grid axis: {', '.join(unknown)} (known: {', '.join(DEFAULT_GRID)})")
+    bad = [s for s in axes["staking"] if s not in ("flat", "kelly")]
+    if bad:
+        raise ValueError(f"Unknown staking: {', '.join(bad)} (flat, kelly)")
+    if not all(0 < x <= 1 for x in axes["max_exposure"]):
+        raise ValueError("max_exposure must be in (0, 1]")
+    parts = []
+    for staking in dict.fromkeys(axes["staking"]):
+        fractions = axes["kelly_fraction"] if staking == "kelly" else [np.nan]
+        edge, ev, fraction, stake, exposure = _product(axes["min_edge"], axes["min_ev"], fractions,
+                                                       axes["max_stake"], axes["max_exposure"])
+        parts.append(Grid(edge, ev, np.full(len(edge), staking == "kelly"), fraction, stake, exposure))
+    return Grid(*(np.concatenate(columns) for columns in zip(*parts)))
+
+
+def live_strategy() -> Grid:
+    """The settings /valuebets publishes with: EV above MIN_EV, fractional Kelly capped at MAX_STAKE."""
+    return Grid(np.array([-1.0]), np.array([MIN_EV]), np.array([True]), np.array([KELLY_FRACTION]),
+                np.array([MAX_STAKE]), np.array([1.0]))
+
+
+# --- Replay ---
+
+def replay(history: History, grid: Grid, bankroll: float = BANKROLL) -> Dict[str, np.ndarray]:
+    """Replay every strategy of `grid` over the history; one array of grid.size per metric."""
+    edge = history.model - history.fair
+    ev = history.model * history.decimal - 1
+    full = kelly(history.model, history.decimal, fraction=1.0, cap=np.inf)
+    take = (edge >= grid.min_edge[:, None]) & (ev > grid.min_ev[:, None])
+    # Share of the bankroll per bet: current bankroll for Kelly, starting bankroll for flat
+    share = np.where(grid.kelly[:, None],
+                     np.minimum(full * np.nan_to_num(grid.kelly_fraction)[:, None], grid.max_stake[:, None]),
+                     grid.max_stake[:, None])
+    share = np.where(take, share, 0.0)
+    payoff = history.outcome * history.decimal
+
+    n, bounds = grid.size, history.bounds
+    money = np.full(n, float(bankroll))
+    curve = np.empty((n, len(history.snapshots) + 1))
+    curve[:, 0] = bankroll
+    staked, bets, wins, edge_sum = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+    for i in range(len(history.snapshots)):
+        lo, hi = bounds[i], bounds[i + 1]
+        stakes = share[:, lo:hi] * np.where(grid.kelly, money, bankroll)[:, None]
+        total = stakes.sum(axis=1)
+        limit = grid.max_exposure * money
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(total > limit, limit / total, 1.0)
+        stakes *= scale[:, None]
+        total *= scale
+        placed = (stakes > 0).astype(float)
+        money += stakes @ payoff[lo:hi] - total
+        staked += total
+        bets += placed.sum(axis=1)
+        wins += placed @ history.outcome[lo:hi]
+        edge_sum += placed @ edge[lo:hi]
+        curve[:, i + 1] = money
+
+    peak = np.maximum.accumulate(curve, axis=1)
+    profit = money - bankroll
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "bets": bets.astype(np.int64),
+            "hit_rate": wins / bets,
+            "mean_edge": edge_sum / bets,
+            "staked": staked,
+            "profit": profit,
+            "roi": profit / staked,
+            "growth": money / bankroll - 1,
+            "max_drawdown": (1 - curve / peak).max(axis=1),
+        }
+
+
+def calibration(prob: np.ndarray, outcome: np.ndarray, bins: int = 10
+                ) -> Tuple[Dict[str, float], List[Dict[str, Any]]]:
+    """Brier score, log loss and expected calibration error, plus the reliability table (equal-width bins)."""
+    p = np.clip(prob, 1e-6, 1 - 1e-6)
+    index = np.minimum((prob * bins).astype(int), bins - 1)
+    count = np.bincount(index, minlength=bins)
+    seen = count > 0
+    mean_prob = np.bincount(index, weights=prob, minlength=bins)[seen] / count[seen]
+    observed = np.bincount(index, weights=outcome, minlength=bins)[seen] / count[seen]
+    scores = {
+        "brier": float(np.mean((prob - outcome) ** 2)),
+        "log_loss": float(-np.mean(outcome * np.log(p) + (1 - outcome) * np.log(1 - p))),
+        "ece": float(np.sum(count[seen] * np.abs(mean_prob - observed)) / len(prob)),
+    }
+    table = [{"bin": int(b), "lower": b / bins, "upper": (b + 1) / bins, "count": int(c),
+              "mean_prob": float(m), "observed": float(o)}
+             for b, c, m, o in zip(np.flatnonzero(seen), count[seen], mean_prob, observed)]
+    return scores, table
+
+
+class Report(NamedTuple):
+    strategies: Any              # pandas.DataFrame, one row per strategy, best growth first
+    calibration: Any             # pandas.DataFrame, reliability bins of the model and the market
+    summary: Dict[str, Any]      # history, calibration scores, live settings, recommended strategy
+
+
+def _frame(grid: Grid, metrics: Dict[str, np.ndarray]):
+    import pandas as pd
+    return pd.DataFrame({
+        "min_edge": grid.min_edge, "min_ev": grid.min_ev,
+        "staking": np.where(grid.kelly, "kelly", "flat"), "kelly_fraction": grid.kelly_fraction,
+        "max_stake": grid.max_stake, "max_exposure": grid.max_exposure, **metrics})
+
+
+def _records(frame) -> List[Dict[str, Any]]:
+    return json.loads(frame.to_json(orient="records"))
+
+
+def run(history: History, grid: Grid, *, bankroll: float = BANKROLL, min_bets: int = MIN_BETS,
+        n_jobs: int = 1, chunk_size: int = CHUNK_SIZE) -> Report:
+    """Replay the grid in chunks of at most `chunk_size` strategies over `n_jobs` processes (joblib)."""
+    import pandas as pd
+    from joblib import Parallel, delayed, effective_n_jobs
+
+    # A few chunks per worker, but never so small that pickling the history dominates
+    size = max(1_000, min(chunk_size, -(-grid.size // (effective_n_jobs(n_jobs) * 4))))
+    chunks = [grid.slice(s, s + size) for s in range(0, grid.size, size)]
+    start = time.perf_counter()
+    if n_jobs == 1 or len(chunks) == 1:
+        results = [replay(history, c, bankroll) for c in chunks]
+    else:
+        results = Parallel(n_jobs=n_jobs)(delayed(replay)(history, c, bankroll) for c in chunks)
+    print(f"Replayed {grid.size:,} strategies over {len(history.teams)} bets in "
+          f"{len(history.snapshots)} snapshots in {time.perf_counter() - start:.2f}s")
+
+    metrics = {k: np.concatenate([r[k] for r in results]) for k in results[0]}
+    table = _frame(grid, metrics).sort_values(["growth", "max_drawdown"], ascending=[False, True],
+                                              kind="stable").reset_index(drop=True)
+    live = _frame(live_strategy(), replay(history, live_strategy(), bankroll))
+    eligible = table[table["bets"] >= min_bets]
+
+    scores, bins = {}, []
+    for source, prob in (("model", history.model), ("market", history.fair)):
+        scores[source], rows = calibration(prob, history.outcome)
+        bins += [{"source": source, **r} for r in rows]
+    summary = {
+        "snapshots": {k: int(n) for k, n in zip(history.snapshots, np.diff(history.bounds))},
+        "bets_available": len(history.teams),
+        "strategies": grid.size,
+        "bankroll": bankroll,
+        "min_bets": min_bets,
+        "calibration": scores,
+        "live": _records(live)[0],
+        "recommended": _records(eligible.head(1))[0] if len(eligible) else None,
+        "top": _records(table.head(TOP_N)),
+    }
+    return Report(table, pd.DataFrame(bins), summary)
+
+
+def backtest_dir() -> Path:
+    """BACKTEST_DIR, or backtests/ next to this script."""
+    return Path(os.getenv("BACKTEST_DIR", DEFAULT_BACKTEST_DIR))
+
+
+def write_report(report: Report, directory: Optional[Path] = None) -> Path:
+    """strategies.csv (every strategy), calibration.csv and summary.json under `directory`."""
+    directory = Path(directory or backtest_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    report.strategies.to_csv(directory / "strategies.csv", index=False)
+    report.calibration.to_csv(directory / "calibration.csv", index=False)
+    path = directory / "summary.json"
+    path.write_text(json.dumps(report.summary, indent=2))
+    return path
+
+
+def _floats(text: str) -> List[float]:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Backtest value-bet strategies on past qualify markets")
+    parser.add_argument("seasons", nargs="*", help="season keys (default: every season with outcomes)")
+    parser.add_argument("--odds", type=Path, action="append", default=[],
+                        help="odds CSV from the scraper script (default: scrape, cached pages first)")
+    parser.add_argument("--offline", action="store_true", help="parse cached odds pages only")
+    parser.add_argument("--model", help="estimator name (default: best of the last evaluation)")
+    parser.add_argument("--params", default="{}", help="estimator parameters as JSON")
+    parser.add_argument("--folds", default="season", help="'season' or a number of stratified folds")
+    parser.add_argument("--bankroll", type=float, default=BANKROLL)
+    parser.add_argument("--min-bets", type=int, default=MIN_BETS)
+    parser.add_argument("--jobs", type=int, default=1, help="processes (-1 = all cores)")
+    parser.add_argument("--out", type=Path, help="report directory (default: BACKTEST_DIR or ./backtests)")
+    for axis in DEFAULT_GRID:
+        parser.add_argument("--" + axis.replace("_", "-"), help=f"comma-separated (default: "
+                            f"{','.join(map(str, DEFAULT_GRID[axis]))})")
+    args = parser.parse_args(argv)
+
+    axes = {}
+    for axis in DEFAULT_GRID:
+        value = getattr(args, axis)
+        if value:
+            axes[axis] = [s.strip() for s in value.split(",")] if axis == "staking" else _floats(value)
+    candidate = None
+    if args.model:
+        from ml.evaluation import Candidate
+        candidate = Candidate(args.model, json.loads(args.params))
+    folds = args.folds if args.folds == "season" else int(args.folds)
+
+    history = load_history(args.seasons, odds_files=args.odds, candidate=candidate, folds=folds,
+                           offline=args.offline)
+    report = run(history, make_grid(axes), bankroll=args.bankroll, min_bets=args.min_bets, n_jobs=args.jobs)
+
+    columns = ["min_edge", "min_ev", "staking", "kelly_fraction", "max_stake", "max_exposure",
+               "bets", "hit_rate", "roi", "growth", "max_drawdown"]
+    print(report.strategies[columns].head(10).to_string(float_format="%.3f"))
+    for source, scores in report.summary["calibration"].items():
+        print(f"{source:>6}: brier {scores['brier']:.4f}  log loss {scores['log_loss']:.4f}  ece {scores['ece']:.4f}")
+    for name in ("live", "recommended"):
+        row = report.summary[name]
+        if row is None:
+            print(f"{name}: no strategy with at least {args.min_bets} bets")
+        else:
+            print(f"{name}: " + ", ".join(f"{c}={row[c]:.3g}" if isinstance(row[c], float) else f"{c}={row[c]}"
+                                          for c in columns))
+    print(f"Report -> {write_report(report, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Load benchmark: blocking sync handlers vs async repository handlers.
+
+Both variants talk to a local stub PostgREST server that answers every
+request after a fixed delay, so the numbers isolate how each path copes with
+I/O wait under concurrency.
+
+    python benchmarks/bench_async_repository.py --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from repository import SupabaseRepository  # noqa: E402
+
+ROWS = [{"id": i, "name": f"Team {i}", "country_code": "XX", "group_name": "A"} for i in range(48)]
+BODY = json.dumps(ROWS).encode()
+
+
+async def _serve_stub(port: int, delay: float, ready) -> None:
+    head = (b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n")
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                if not request:
+                    break
+                await asyncio.sleep(delay)
+                writer.write(head + BODY)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=4096)
+    ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def _run_stub(port: int, delay: float, ready) -> None:
+    asyncio.run(_serve_stub(port, delay, ready))
+
+
+def start_stub_postgrest(delay: float):
+    """Run a keep-alive stub PostgREST in its own process so it never competes
+    with the app under test for the GIL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    ready = multiprocessing.Event()
+    proc = multiprocessing.Process(target=_run_stub, args=(port, delay, ready), daemon=True)
+    proc.start()
+    ready.wait(10)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def build_sync_app(base_url: str) -> FastAPI:
+    # Mirrors the previous api.py: a blocking client inside a sync `def`
+    # handler, which Starlette runs on its threadpool.
+    app = FastAPI()
+    blocking = httpx.Client(base_url=base_url + "/rest/v1")
+
+    @app.get("/teams")
+    def get_teams():
+        return blocking.get("/teams", params={"select": "*"}).json()
+
+    return app
+
+
+def build_async_app(base_url: str) -> FastAPI:
+    app = FastAPI()
+    repo = SupabaseRepository(base_url, "stub-key")
+
+    @app.get("/teams")
+    async def get_teams():
+        return await repo.select("teams")
+
+    return app
+
+
+async def drive(app: FastAPI, total: int, concurrency: int):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await http.get("/teams")
+                latencies.append(time.perf_counter() - t0)
+                assert resp.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "rps": round(total / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="stub upstream latency")
+    args = parser.parse_args()
+
+    stub, base_url = start_stub_postgrest(args.delay_ms / 1000)
+    try:
+        for label, build in (("sync (threadpool)", build_sync_app), ("async repository", build_async_app)):
+            result = asyncio.run(drive(build(base_url), args.requests, args.concurrency))
+            print(f"{label:<20} p50={result['p50_ms']:>8} ms  p99={result['p99_ms']:>8} ms  "
+                  f"rps={result['rps']:>8}")
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
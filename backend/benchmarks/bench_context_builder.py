@@ -0,0 +1,85 @@
+"""
+Prompt-size benchmark: raw dict-repr context vs the token-budgeted builder.
+
+Uses representative synthetic rows shaped like the production tables
+(48 teams, 100-row odds tables, full-width stats rows).
+
+    python benchmarks/bench_context_builder.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from context_builder import Section, build_context, estimate_tokens  # noqa: E402
+
+random.seed(7)
+TEAMS = [f"Team {i}" for i in range(1, 49)]
+
+STANDARD = ["# Pl", "Age", "Poss", "MP", "Starts", "Min", "Gls", "Ast", "G+A", "G-PK", "PK",
+            "PKatt", "CrdY", "CrdR", "Per 90 Gls", "Per 90 Ast", "Per 90 G+A", "Per 90 G-PK",
+            "Per 90 G+A-PK"]
+SHOOTING = ["# Pl", "90s", "Gls", "Sh", "SoT", "SoT%", "Sh/90", "SoT/90", "G/Sh", "G/SoT",
+            "Dist", "PK", "PKatt"]
+GOALKEEPING = ["GA90", "SoTA", "Saves", "Save%", "W", "D", "L", "CS", "CS%", "PKatt", "PKA",
+               "PKsv", "PKm", "Save% (PK)"]
+PASSING = ["pass_success_pct", "accurate_passes_per", "successful_long_ball",
+           "successful_long_ball_pct", "cross_success_pct", "crosses_per_match"]
+FEATURES = ["SoT/90", "successful_long_ball_pct", "GA90", "Poss", "pass_success_pct"]
+
+
+def stats_rows(columns, name_col, teams):
+    return [dict({"team_id": TEAMS.index(t) + 1, name_col: t},
+                 **{c: round(random.uniform(0, 100), 3) for c in columns}) for t in teams]
+
+
+def odds_rows(n):
+    return [{"id": i, "team": TEAMS[i % 48], "odds": random.choice([-300, -150, 110, 250, 900]),
+             "comp_id": 2, "season": 2026, "created_at": "2025-12-05T00:00:00+00:00"} for i in range(n)]
+
+
+def scenario(teams, with_odds):
+    sections = [Section("top_features", "Model's Top Predictive Stats", 0,
+                        [{"feature_name": f, "ranking": i} for i, f in enumerate(FEATURES, 1)],
+                        text=", ".join(f"{f} (Rank #{i})" for i, f in enumerate(FEATURES, 1)))]
+    for table, cols, name_col in (("Standard", STANDARD, "Squad"), ("Shooting", SHOOTING, "Squad"),
+                                  ("Passing", PASSING, "team"), ("Goalkeeping", GOALKEEPING, "Squad")):
+        if teams:
+            sections.append(Section(table, f"DATA - 2026 WC Quals {table} Stats", 1,
+                                    stats_rows(cols, name_col, teams)))
+    sections.append(Section("valuebets", "Top Value Bets", 2,
+                            [{"id": i, "match_name": "ARG vs BRA", "market": "Moneyline",
+                              "pick": "ARG", "current_odds": "+140"} for i in range(3)]))
+    if with_odds:
+        sections.append(Section("outright_winning_odds", "Outright Odds", 4, odds_rows(100)))
+        sections.append(Section("qualifying_odds", "Qualifying Odds", 4, odds_rows(100)))
+    return sections
+
+
+def raw_context(header, sections):
+    # What chat() used to send: dict reprs of every row and column.
+    return header + "".join(f"\n{s.label}: {s.text or list(s.rows)}\n" for s in sections)
+
+
+def main():
+    header = "Role: Sports betting assistant. Use the provided DATA to answer.\n"
+    cases = {
+        "1 team, stats": scenario(TEAMS[:1], False),
+        "2 teams, stats + odds": scenario(TEAMS[:2], True),
+        "4 teams, stats + odds": scenario(TEAMS[:4], True),
+        "odds only": scenario([], True),
+    }
+    for label, sections in cases.items():
+        raw = estimate_tokens(raw_context(header, sections))
+        built = build_context(header, sections, FEATURES)
+        unbounded = build_context(header, sections, FEATURES, budget=10 ** 9)
+        ms = timeit.timeit(lambda: build_context(header, sections, FEATURES), number=200) / 200 * 1000
+        print(f"{label:<24} raw={raw:>6}t  compact={unbounded.tokens:>6}t  "
+              f"budgeted={built.tokens:>5}t ({built.tokens / raw:.0%})  build={ms:.2f} ms")
+        for r in built.report:
+            print(f"    {r.name:<24} {r.tokens:>5}t  rows={r.rows:<4} {r.status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Wire-size and server-CPU benchmark for the polled list endpoints.
+
+"before": the handler returns cached rows and FastAPI encodes them on every
+request (jsonable_encoder + json.dumps), uncompressed.
+"after": the body is pre-encoded with an ETag; a poll is answered with the
+stored gzip bytes, or with a 304 when the client sends If-None-Match.
+
+Both apps run in-process over ASGI, so CPU time is the server side only
+(plus the in-process client, identical for both).
+
+    python benchmarks/bench_http_cache.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import conditional_response, encode  # noqa: E402
+
+random.seed(11)
+N = 500
+
+MATCHES = [{"id": i, "team1_id": random.randint(1, 48), "team2_id": random.randint(1, 48),
+            "match_date": f"2026-06-{11 + i % 20:02d}T19:00:00+00:00", "score_team1": None,
+            "score_team2": None, "status": "upcoming", "stage": f"Group {'ABCDEFGHIJKL'[i % 12]}",
+            "venue": random.choice(["Estadio Azteca", "MetLife Stadium", "BC Place", "SoFi Stadium"]),
+            "api_ref": str(1_000_000 + i)} for i in range(104)]
+ODDS = [{"id": i, "team": f"Team {i % 48}", "odds": random.choice([-300, -150, 110, 250, 900]),
+         "comp_id": 2, "season": 2026, "created_at": "2025-12-05T00:00:00+00:00"} for i in range(200)]
+
+
+def make_before(rows):
+    app = FastAPI()
+
+    @app.get("/list")
+    async def handler():
+        return rows
+
+    return app
+
+
+def make_after(rows):
+    app = FastAPI()
+    body = encode(rows)
+
+    @app.get("/list")
+    async def handler(request: Request):
+        return conditional_response(request, body)
+
+    return app
+
+
+def wire_bytes(resp: httpx.Response) -> int:
+    # httpx decodes gzip transparently; Content-Length is what was sent
+    head = sum(len(k) + len(v) + 4 for k, v in resp.headers.raw)
+    body = int(resp.headers.get("content-length", len(resp.content)))
+    return head + body + len(b"HTTP/1.1 200 OK\r\n\r\n")
+
+
+async def run(app, headers):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        first = await client.get("/list", headers={"Accept-Encoding": "gzip"})
+        if headers.get("If-None-Match") == "*":
+            headers = dict(headers, **{"If-None-Match": first.headers["etag"]})
+        for _ in range(20):  # warm-up
+            await client.get("/list", headers=headers)
+        cpu, wall = time.process_time(), time.perf_counter()
+        for _ in range(N):
+            resp = await client.get("/list", headers=headers)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return resp.status_code, wire_bytes(resp), cpu / N * 1e6, wall / N * 1e6
+
+
+def main():
+    for label, rows in (("matches (104 rows)", MATCHES), ("odds (200 rows)", ODDS)):
+        print(label)
+        cases = (
+            ("before, identity", make_before(rows), {}),
+            ("after, full body (gzip)", make_after(rows), {"Accept-Encoding": "gzip"}),
+            ("after, revalidated (304)", make_after(rows), {"Accept-Encoding": "gzip", "If-None-Match": "*"}),
+        )
+        for name, app, headers in cases:
+            code, size, cpu_us, wall_us = asyncio.run(run(app, headers))
+            print(f"    {name:<26} {code}  {size:>7} B on wire  {cpu_us:>7.0f} us CPU/req  {wall_us:>7.0f} us/req")
+
+
+if __name__ == "__main__":
+    main()
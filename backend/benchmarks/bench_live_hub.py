@@ -0,0 +1,112 @@
+"""
+Load test for the live hub: thousands of in-process subscribers fed by the
+change feed, with a share of deliberately slow consumers.
+
+Each subscriber follows `matches` or two single-match topics; a writer
+pushes random status/score changes for 104 matches. Reports fan-out cost,
+delivery latency (publish -> batch received), coalescing, resyncs and the
+message volume compared with clients polling /matches.
+
+    python benchmarks/bench_live_hub.py [subscribers] [updates_per_sec] [seconds]
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import encode  # noqa: E402
+from live import ChangeFeed, LiveHub  # noqa: E402
+
+MATCHES = 104
+POLL_INTERVAL = 5.0  # what the frontend would otherwise poll at
+SLOW_SHARE = 0.1
+SLOW_DELAY = 0.5     # seconds a slow client takes to drain one message
+
+
+async def consumer(sub, slow, latencies, messages):
+    while True:
+        batch = await sub.next_batch()
+        if batch is None:
+            return
+        now = time.perf_counter()
+        messages[0] += 1
+        messages[1] += len(json.dumps({"events": batch}))
+        stamps = [e["changes"]["ts"] for e in batch if e.get("changes") and "ts" in e["changes"]]
+        if stamps:
+            latencies.append(now - min(stamps))
+        if slow:
+            await asyncio.sleep(SLOW_DELAY)
+
+
+async def run(n_subs, rate, seconds):
+    random.seed(5)
+    hub = LiveHub(max_pending=64)
+    feed = ChangeFeed(hub)
+    table = [{"id": i, "team1_id": i % 48 + 1, "team2_id": (i + 7) % 48 + 1,
+              "match_date": "2026-06-11T19:00:00+00:00", "score_team1": 0, "score_team2": 0,
+              "status": "upcoming", "stage": "Group A", "venue": "Estadio Azteca", "api_ref": str(i)}
+             for i in range(MATCHES)]
+    feed.rows_changed("matches", table)
+    poll_bytes = len(encode(table).gzipped())
+
+    subs, tasks, latencies, messages = [], [], [], [0, 0]
+    for i in range(n_subs):
+        topics = ["matches"] if i % 2 else [f"match:{random.randrange(MATCHES)}" for _ in range(2)]
+        sub = hub.subscribe(topics)
+        subs.append(sub)
+        tasks.append(asyncio.create_task(consumer(sub, random.random() < SLOW_SHARE, latencies, messages)))
+
+    publish_cpu = 0.0
+    updates = int(rate * seconds)
+    start = time.perf_counter()
+    for n in range(updates):
+        target = start + n / rate
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        row = {"id": random.randrange(MATCHES), "status": random.choice(["upcoming", "live", "finished"]),
+               "score_team1": random.randint(0, 4), "ts": time.perf_counter()}
+        t0 = time.process_time()
+        feed.rows_changed("matches", [row])
+        publish_cpu += time.process_time() - t0
+    await asyncio.sleep(SLOW_DELAY + 0.2)
+    elapsed = time.perf_counter() - start
+
+    peak_pending = hub.stats()["pending"]
+    for sub in subs:
+        sub.close()
+    await asyncio.gather(*tasks)
+
+    delivered = sum(s.delivered for s in subs)
+    coalesced = sum(s.coalesced for s in subs)
+    resyncs = sum(s.resyncs for s in subs)
+    lat = sorted(latencies)
+    print(f"{n_subs} subscribers, {updates} row updates over {elapsed:.1f}s "
+          f"({hub.published} topic publishes)")
+    print(f"  publish CPU:      {publish_cpu / updates * 1e3:.2f} ms per row update "
+          f"({publish_cpu / max(hub.published, 1) * 1e6:.0f} us per topic publish)")
+    print(f"  delivered:        {delivered} events in {messages[0]} messages "
+          f"({coalesced} coalesced, {resyncs} resyncs, {peak_pending} pending at end)")
+    if lat:
+        print(f"  latency:          p50={statistics.median(lat) * 1e3:.0f} ms  "
+              f"p99={lat[int(len(lat) * 0.99) - 1] * 1e3:.0f} ms  max={lat[-1] * 1e3:.0f} ms")
+    # Every poll sees a changed table at these rates, so each one is a full (gzip) body
+    polls = n_subs * elapsed / POLL_INTERVAL
+    print(f"  pushed:           {messages[1] / 1e6:.1f} MB in {messages[0]} messages; polling every "
+          f"{POLL_INTERVAL:.0f}s: {polls * poll_bytes / 1e6:.1f} MB in {polls:.0f} responses, "
+          f"each up to {POLL_INTERVAL:.0f}s stale")
+
+
+def main():
+    n_subs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    asyncio.run(run(n_subs, rate, seconds))
+
+
+if __name__ == "__main__":
+    main()
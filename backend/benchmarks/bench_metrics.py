@@ -0,0 +1,85 @@
+"""
+Fast-path overhead of the metrics middleware and the repository observer.
+
+Calls a trivial FastAPI route directly over ASGI (no client, no network)
+with and without `MetricsMiddleware`, and times `Registry.observe` and
+`/metrics` rendering on their own.
+
+    python benchmarks/bench_metrics.py [requests]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics  # noqa: E402
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/features/{team_id}")
+    async def features(team_id: int):
+        return {"team_id": team_id}
+
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware, registry=metrics.Registry())
+    return app
+
+
+async def call(app, path: str) -> None:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+             "headers": [], "client": ("127.0.0.1", 1), "server": ("test", 80)}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def per_request_us(app, n: int) -> float:
+    for i in range(200):
+        await call(app, f"/features/{i % 48}")
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for i in range(n):
+            await call(app, f"/features/{i % 48}")
+        runs.append((time.perf_counter() - start) / n * 1e6)
+    return statistics.median(runs)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    plain = asyncio.run(per_request_us(make_app(False), n))
+    instrumented = asyncio.run(per_request_us(make_app(True), n))
+    print(f"route, no middleware   {plain:7.1f} us/request")
+    print(f"route, with middleware {instrumented:7.1f} us/request  (+{instrumented - plain:.1f} us)")
+
+    registry = metrics.Registry()
+    labels = (("upstream", "supabase"), ("target", "teams"), ("op", "GET"))
+    start = time.perf_counter()
+    for i in range(100_000):
+        registry.observe("upstream_request_duration_seconds", labels, (i % 100) / 1000)
+    print(f"Registry.observe       {(time.perf_counter() - start) / 100_000 * 1e6:7.2f} us/call")
+
+    for route in range(40):
+        for status in ("200", "304", "404"):
+            registry.observe("http_request_duration_seconds",
+                             (("method", "GET"), ("route", f"/r{route}"), ("status", status)), 0.01)
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"/metrics render        {(time.perf_counter() - start) * 1000:7.2f} ms "
+          f"({len(text.splitlines())} lines, {len(text)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
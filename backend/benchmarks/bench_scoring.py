@@ -0,0 +1,93 @@
+"""
+Latency benchmark for /predictions/qualify scoring.
+
+"naive": per request, build the feature row(s) from stats dicts and call
+`predict_proba`, as a handler without a scorer would.
+"scorer": `ml.Scorer` against a feature-matrix snapshot; `predict_proba`
+runs once per snapshot and a request is an index lookup.
+
+Models are fitted on synthetic data shaped like the qualification set
+(DataFrame input, so feature names are checked like in production).
+
+    python benchmarks/bench_scoring.py [requests]
+"""
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from feature_matrix import Block, FeatureMatrix  # noqa: E402
+from ml import Artifact, Scorer  # noqa: E402
+
+TEAMS = 211
+FEATURES = 57
+BATCH = 48
+
+
+def setup():
+    rng = np.random.default_rng(5)
+    features = [f"stat_{j}" for j in range(FEATURES)]
+    values = rng.normal(size=(TEAMS, FEATURES))
+    y = (values[:, :5].sum(axis=1) + rng.normal(size=TEAMS) > 0).astype(int)
+    teams = [{"id": i + 1, "name": f"Team {i + 1}"} for i in range(TEAMS)]
+    matrix = FeatureMatrix(teams, {"standard": Block(features, np.asfortranarray(values),
+                                                     np.ones(TEAMS, bool))})
+    rows = {t["id"]: dict(zip(features, values[i])) for i, t in enumerate(teams)}
+    models = {
+        "LogisticRegression": Pipeline([("scaler", StandardScaler()),
+                                        ("clf", LogisticRegression(max_iter=1000))]),
+        "RandomForest": RandomForestClassifier(n_estimators=200, random_state=5),
+    }
+    for model in models.values():
+        model.fit(pd.DataFrame(values, columns=features), y)
+    return features, matrix, rows, models
+
+
+def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    features, matrix, rows, models = setup()
+    rng = np.random.default_rng(9)
+    single = [int(t) for t in rng.integers(1, TEAMS + 1, n)]
+    batch = [int(t) for t in rng.choice(np.arange(1, TEAMS + 1), BATCH, replace=False)]
+
+    for name, model in models.items():
+        def naive(team_ids):
+            X = pd.DataFrame([[rows[t].get(f, 0.0) for f in features] for t in team_ids], columns=features)
+            return model.predict_proba(X)[:, 1]
+
+        scorer = Scorer(Artifact(name, "bench", model, features, {}, "", "", None))
+        expected = naive(batch)
+        assert np.allclose(scorer.predict(matrix, batch), expected), name
+
+        a, b = iter(single), iter(single)
+        for label, fn in (("naive  single", lambda: naive([next(a)])),
+                          ("scorer single", lambda: scorer.predict(matrix, [next(b)])),
+                          ("naive  batch ", lambda: naive(batch)),
+                          ("scorer batch ", lambda: scorer.predict(matrix, batch))):
+            p50, p99 = timed(fn, n)
+            print(f"{name:<19} {label}  p50={p50:7.3f} ms  p99={p99:7.3f} ms")
+        start = time.perf_counter()
+        Scorer(scorer.artifact).predict_all(matrix)
+        print(f"{name:<19} snapshot refresh   {(time.perf_counter() - start) * 1000:7.3f} ms ({TEAMS} teams)")
+
+
+if __name__ == "__main__":
+    main()
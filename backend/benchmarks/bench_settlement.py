@@ -0,0 +1,121 @@
+"""
+Settlement benchmark on a SQLite stand-in for the Postgres schema.
+
+Compares grading a match's pending bets row by row (one SELECT, then an
+UPDATE per bet and per winning user, all in one transaction) with the
+set-based form used by `settle_match` in sql/schema.sql (one credit UPDATE
+over an aggregate plus one grading UPDATE). Checks that both produce the
+same balances and that a retried settlement changes nothing.
+
+    python benchmarks/bench_settlement.py [bets ...]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+SCHEMA = """
+CREATE TABLE users (id TEXT PRIMARY KEY, balance NUMERIC NOT NULL DEFAULT 0);
+CREATE TABLE teams (id INTEGER PRIMARY KEY, name TEXT NOT NULL, country_code TEXT);
+CREATE TABLE matches (id INTEGER PRIMARY KEY, team1_id INTEGER, team2_id INTEGER,
+                      score_team1 INTEGER, score_team2 INTEGER, status TEXT NOT NULL DEFAULT 'upcoming');
+CREATE TABLE bets (id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, match_id INTEGER NOT NULL,
+                   bet_type TEXT NOT NULL, bet_on TEXT NOT NULL, odds NUMERIC NOT NULL,
+                   amount NUMERIC NOT NULL, result TEXT NOT NULL DEFAULT 'pending');
+CREATE INDEX bets_pending_match_idx ON bets (match_id) WHERE result = 'pending';
+"""
+
+USERS = 5000
+
+
+def setup(path, n_bets):
+    random.seed(3)
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    db.execute("BEGIN")
+    db.executemany("INSERT INTO users VALUES (?, 1000)", [(f"u{i}",) for i in range(USERS)])
+    db.executemany("INSERT INTO teams VALUES (?, ?, ?)", [(1, "Mexico", "MEX"), (2, "Korea Republic", "KOR")])
+    db.execute("INSERT INTO matches (id, team1_id, team2_id) VALUES (1, 1, 2)")
+    picks = ["Mexico", "MEX", "1", "Korea Republic", "KOR", "draw"]
+    db.executemany(
+        "INSERT INTO bets (user_id, match_id, bet_type, bet_on, odds, amount) VALUES (?, 1, ?, ?, ?, ?)",
+        [(f"u{random.randrange(USERS)}", "team_winner" if random.random() < 0.95 else "player_score",
+          random.choice(picks), round(random.uniform(1.2, 6.0), 2), random.randint(1, 100))
+         for _ in range(n_bets)])
+    db.execute("COMMIT")
+    return db
+
+
+def winner_spellings(db, match_id, s1, s2):
+    if s1 == s2:
+        return ["draw"]
+    t1, t2 = db.execute("SELECT team1_id, team2_id FROM matches WHERE id = ?", (match_id,)).fetchone()
+    name, code, tid = db.execute("SELECT name, country_code, id FROM teams WHERE id = ?",
+                                 (t1 if s1 > s2 else t2,)).fetchone()
+    return [name.lower(), (code or "").lower(), str(tid)]
+
+
+def settle_row_by_row(db, match_id, s1, s2):
+    db.execute("BEGIN IMMEDIATE")
+    db.execute("UPDATE matches SET score_team1 = ?, score_team2 = ?, status = 'finished' WHERE id = ?",
+               (s1, s2, match_id))
+    winner = winner_spellings(db, match_id, s1, s2)
+    rows = db.execute("SELECT id, user_id, bet_on, odds, amount FROM bets "
+                      "WHERE match_id = ? AND result = 'pending' AND bet_type = 'team_winner'",
+                      (match_id,)).fetchall()
+    for bet_id, user_id, bet_on, odds, amount in rows:
+        won = bet_on.strip().lower() in winner
+        db.execute("UPDATE bets SET result = ? WHERE id = ?", ("won" if won else "lost", bet_id))
+        if won:
+            db.execute("UPDATE users SET balance = balance + ? WHERE id = ?", (amount * odds, user_id))
+    db.execute("COMMIT")
+    return len(rows)
+
+
+def settle_set_based(db, match_id, s1, s2):
+    db.execute("BEGIN IMMEDIATE")
+    db.execute("UPDATE matches SET score_team1 = ?, score_team2 = ?, status = 'finished' WHERE id = ?",
+               (s1, s2, match_id))
+    winner = winner_spellings(db, match_id, s1, s2)
+    marks = ",".join("?" * len(winner))
+    pending = "match_id = ? AND result = 'pending' AND bet_type = 'team_winner'"
+    # Credit first, from the still-pending rows, then grade them
+    db.execute(f"""
+        UPDATE users SET balance = balance + w.total
+          FROM (SELECT user_id, sum(amount * odds) AS total FROM bets
+                 WHERE {pending} AND lower(trim(bet_on)) IN ({marks}) GROUP BY user_id) AS w
+         WHERE users.id = w.user_id""", (match_id, *winner))
+    cur = db.execute(f"""
+        UPDATE bets SET result = CASE WHEN lower(trim(bet_on)) IN ({marks}) THEN 'won' ELSE 'lost' END
+         WHERE {pending}""", (*winner, match_id))
+    db.execute("COMMIT")
+    return cur.rowcount
+
+
+def balances(db):
+    return db.execute("SELECT round(sum(balance), 2), count(*) FROM users").fetchone()
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 50_000, 100_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            results = {}
+            for name, settle in (("row-by-row", settle_row_by_row), ("set-based", settle_set_based)):
+                db = setup(os.path.join(tmp, f"{name}-{n}.db"), n)
+                start = time.perf_counter()
+                settled = settle(db, 1, 2, 1)
+                ms = (time.perf_counter() - start) * 1000
+                results[name] = balances(db)
+                retry = settle_set_based(db, 1, 2, 1)
+                print(f"{n:>7} bets  {name:<11} {ms:>8.1f} ms  settled={settled:<7} "
+                      f"retry settled={retry}  balance total={results[name][0]}")
+                db.close()
+            assert results["row-by-row"] == results["set-based"], results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of the tournament simulator, in simulated tournaments per second.
+
+"loop": one tournament at a time in plain Python (random.choices per match,
+sorted() per group), the straightforward way to write it.
+"vectorized": `simulation.simulate`, a batch of tournaments per NumPy pass,
+single process and then across all cores (joblib). Counts are identical
+for any number of workers.
+
+48 teams with random ratings; 12 group fixtures already played.
+
+    python benchmarks/bench_simulation.py [sims]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import simulation  # noqa: E402
+
+
+def setup():
+    rng = np.random.default_rng(48)
+    teams = [{"id": i + 1, "group_name": "ABCDEFGHIJKL"[i // 4]} for i in range(48)]
+    played = [{"team1_id": 4 * g + 1, "team2_id": 4 * g + 2, "stage": "Group", "status": "finished",
+               "score_team1": int(rng.integers(0, 3)), "score_team2": int(rng.integers(0, 3))}
+              for g in range(12)]
+    return simulation.build_tournament(teams, played, rng.normal(0, 1, 48))
+
+
+def loop(tournament, n: int, seed: int = 0) -> np.ndarray:
+    """Reference implementation: returns qualify counts per team."""
+    rnd = random.Random(seed)
+    cells = list(range(simulation.CELLS))
+    side = simulation.MAX_GOALS + 1
+    weights = []
+    for f in tournament.fixtures:
+        if f.score is not None:
+            weights.append(None)
+        else:
+            pmf = simulation.scoreline_pmf(tournament.rates[f.home, f.away], tournament.rates[f.away, f.home])
+            weights.append(list(np.cumsum(pmf.ravel())))
+    qualify = np.zeros(len(tournament.team_ids), dtype=np.int64)
+    for _ in range(n):
+        table = {t: [0, 0, 0] for t in range(len(tournament.team_ids))}
+        for f, w in zip(tournament.fixtures, weights):
+            h, a = f.score if w is None else divmod(rnd.choices(cells, cum_weights=w)[0], side)
+            for team, gf, ga in ((f.home, h, a), (f.away, a, h)):
+                table[team][0] += 3 if gf > ga else 1 if gf == ga else 0
+                table[team][1] += gf - ga
+                table[team][2] += gf
+        thirds = []
+        for members in tournament.groups.tolist():
+            ranked = sorted(members, key=lambda t: (table[t], rnd.random()), reverse=True)
+            qualify[ranked[:2]] += 1
+            thirds.append(ranked[2])
+        qualify[sorted(thirds, key=lambda t: (table[t], rnd.random()), reverse=True)[:simulation.BEST_THIRDS]] += 1
+    return qualify
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    tournament = setup()
+
+    loop_n = max(1, n // 100)
+    start = time.perf_counter()
+    loop(tournament, loop_n)
+    base = loop_n / (time.perf_counter() - start)
+    print(f"loop (group stage only)  {base:12,.0f} sims/s  ({loop_n:,} sims)")
+
+    for jobs in (1, -1):
+        simulation.simulate(tournament, simulation.BATCH_SIZE, n_jobs=jobs)   # warm up workers
+        start = time.perf_counter()
+        result = simulation.simulate(tournament, n, seed=1, n_jobs=jobs)
+        rate = n / (time.perf_counter() - start)
+        print(f"vectorized, n_jobs={jobs:<3d}   {rate:12,.0f} sims/s  ({n:,} sims, {os.cpu_count()} cores, "
+              f"x{rate / base:.0f}; std error <= {result.std_error():.4f})")
+
+
+if __name__ == "__main__":
+    main()
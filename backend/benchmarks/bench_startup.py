@@ -0,0 +1,76 @@
+"""
+Worker boot cost: `import api` and lifespan startup, each in a fresh
+interpreter (as a new uvicorn worker pays them).
+
+Runs with BACKEND_CLIENTS=stub and no credentials, so it measures the app
+itself rather than the network. "deferred" is what the import no longer
+pays: importing the Gemini SDK and building its client, now done in the
+warm-up thread.
+
+    python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT = "import time; s = time.perf_counter(); import api; print(time.perf_counter() - s)"
+STARTUP = """
+import asyncio, time
+s = time.perf_counter()
+import api
+i = time.perf_counter()
+async def main():
+    async with api.lifespan(api.app):
+        print(i - s, time.perf_counter() - i)
+asyncio.run(main())
+"""
+DEFERRED = ("import time; s = time.perf_counter(); from google import genai; "
+            "genai.Client(api_key='x'); print(time.perf_counter() - s)")
+
+
+def run(code: str, *args: str) -> str:
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "GEMINI_API_KEY")}
+    env.update(BACKEND_CLIENTS="stub", PYTHONDONTWRITEBYTECODE="1")
+    out = subprocess.run([sys.executable, *args, "-c", code], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True)
+    return out.stdout.strip().splitlines()[-1] if not args else out.stderr
+
+
+def top_imports(n: int = 8):
+    """Modules `api` imports directly, by cumulative import time (`python -X importtime`)."""
+    rows = []
+    for line in run(IMPORT, "-X", "importtime").splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            rows.append((int(cumulative), name.rstrip()))
+        except ValueError:
+            continue
+    # Names are indented two spaces per import level (after the separator's own space)
+    top = [(us, name.strip()) for us, name in rows if name.startswith("   ") and not name.startswith("    ")]
+    return sorted(top, reverse=True)[:n]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    imports, startups = [], []
+    for _ in range(runs):
+        first, second = map(float, run(STARTUP).split())
+        imports.append(first * 1000)
+        startups.append(second * 1000)
+    deferred = statistics.median(float(run(DEFERRED)) * 1000 for _ in range(runs))
+    print(f"import api          {statistics.median(imports):7.0f} ms  (median of {runs})")
+    print(f"lifespan startup    {statistics.median(startups):7.0f} ms  (stub clients, warm-up included)")
+    print(f"deferred to warm-up {deferred:7.0f} ms  (google.genai import + Client)")
+    print("largest imports by api.py:")
+    for us, name in top_imports():
+        print(f"  {us / 1000:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
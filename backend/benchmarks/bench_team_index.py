@@ -0,0 +1,56 @@
+"""
+Micro-benchmark: team detection in chat queries.
+
+Compares the previous per-team substring loop against the Aho-Corasick
+TeamIndex for the 48-team 2026 field.
+
+    python benchmarks/bench_team_index.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from team_index import TeamIndex  # noqa: E402
+
+TEAMS = [
+    "Mexico", "South Africa", "Korea Republic", "Canada", "Qatar", "Switzerland",
+    "Brazil", "Morocco", "Haiti", "Scotland", "United States", "Paraguay",
+    "Australia", "Germany", "Curaçao", "Côte d'Ivoire", "Ecuador", "Netherlands",
+    "Japan", "Tunisia", "Belgium", "Egypt", "IR Iran", "New Zealand", "Spain",
+    "Cabo Verde", "Saudi Arabia", "Uruguay", "France", "Senegal", "Norway",
+    "Argentina", "Algeria", "Austria", "Jordan", "Portugal", "Uzbekistan",
+    "Colombia", "England", "Croatia", "Ghana", "Panama", "Czechia", "Türkiye",
+    "Italy", "Denmark", "Bolivia", "Jamaica",
+]
+ROWS = [{"id": i, "name": name} for i, name in enumerate(TEAMS, 1)]
+
+QUERIES = [
+    "what are the most significant stats when determining whether a group qualifies from the group stage?",
+    "I have $50, what are the top value bets that I can spread my money across",
+    "How do Mexico and South Africa compare on shooting and xG?",
+    "Should I bet on the USA or Paraguay to qualify? What about South Korea?",
+    "give me the outright odds for argentina, france, england, brazil and spain " * 3,
+]
+
+
+def substring_loop(query: str):
+    q = query.lower()
+    return [t for t in ROWS if t["name"].lower() in q]
+
+
+def main():
+    index = TeamIndex(ROWS)
+    n = 20000
+    for query in QUERIES:
+        old = timeit.timeit(lambda: substring_loop(query), number=n) / n * 1e6
+        new = timeit.timeit(lambda: index.detect(query), number=n) / n * 1e6
+        print(f"{len(query):>4} chars  loop={old:7.2f} us  index={new:7.2f} us  "
+              f"loop={[t['name'] for t in substring_loop(query)]}  "
+              f"index={[t['name'] for t in index.detect(query)]}")
+    build = timeit.timeit(lambda: TeamIndex(ROWS), number=200) / 200 * 1e3
+    print(f"index build: {build:.2f} ms (once per refresh)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+In-process read-through cache for the reference-data endpoints.
+
+Entries are tagged with the Supabase tables they were built from, so a write
+to a table can drop every cached response that depends on it. Concurrent
+misses on the same key share a single load (stampede protection).
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+# Per-table TTLs in seconds. Odds and value bets move more often than the
+# team list, so they expire sooner.
+DEFAULT_TTL = 60.0
+TABLE_TTLS = {
+    "teams": 3600.0,
+    "top_features": 3600.0,
+    "matches": 60.0,
+    "match_cards": 60.0,
+    "valuebets": 30.0,
+    "qualifying_odds": 300.0,
+    "outright_winning_odds": 300.0,
+    "2026 WC Quals Standard Stats": 3600.0,
+    "2026 WC Quals Shooting Stats": 3600.0,
+    "2026 WC Quals Passing Stats": 3600.0,
+    "2026 WC Quals Goalkeeping Stats": 3600.0,
+}
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "tags")
+
+    def __init__(self, value: Any, expires_at: float, tags: frozenset):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class TTLCache:
+    """Size-bounded LRU cache with per-entry TTL and tag-based invalidation."""
+
+    def __init__(self, maxsize: int = 256, default_ttl: float = DEFAULT_TTL,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._inflight_async: Dict[Hashable, asyncio.Future] = {}
+        self._versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, tags: Iterable[str]) -> float:
+        """Shortest configured TTL among the tables an entry depends on."""
+        ttls = [self.ttls[t] for t in tags if t in self.ttls]
+        return min(ttls) if ttls else self.default_ttl
+
+    def _lookup(self, key: Hashable) -> Optional[_Entry]:
+        # Caller holds self._lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Hashable, value: Any, ttl: float, tags: frozenset) -> None:
+        # Caller holds self._lock.
+        self._entries[key] = _Entry(value, time.monotonic() + ttl, tags)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    tags: Iterable[str] = (), ttl: Optional[float] = None) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` on a miss.
+        Only one thread runs the loader per key; the others wait for it.
+        """
+        tags = frozenset(tags)
+        while True:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry.value
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self.misses += 1
+                    waiter = self._inflight[key] = threading.Event()
+                    versions = {t: self._versions.get(t, 0) for t in tags}
+                    break
+            # Another thread is loading this key; wait and re-check.
+            waiter.wait()
+
+        try:
+            value = loader()
+            with self._lock:
+                # Skip the store if a write invalidated a tag mid-load.
+                if all(self._versions.get(t, 0) == v for t, v in versions.items()):
+                    self._store(key, value, self.ttl_for(tags) if ttl is None else ttl, tags)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.set()
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                                tags: Iterable[str] = (), ttl: Optional[float] = None,
+                                store_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Async counterpart of `get_or_load` for coroutine loaders. Results for
+        which `store_if` returns False are handed back but not cached.
+        """
+        tags = frozenset(tags)
+        while True:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry.value
+                waiter = self._inflight_async.get(key)
+                if waiter is None:
+                    self.misses += 1
+                    waiter = asyncio.get_running_loop().create_future()
+                    self._inflight_async[key] = waiter
+                    versions = {t: self._versions.get(t, 0) for t in tags}
+                    break
+            # Shield so a cancelled waiter doesn't cancel the shared load.
+            await asyncio.shield(waiter)
+
+        try:
+            value = await loader()
+            if store_if is not None and not store_if(value):
+                return value
+            with self._lock:
+                if all(self._versions.get(t, 0) == v for t, v in versions.items()):
+                    self._store(key, value, self.ttl_for(tags) if ttl is None else ttl, tags)
+            return value
+        finally:
+            with self._lock:
+                self._inflight_async.pop(key, None)
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def invalidate(self, *tables: str) -> int:
+        """Drop every entry tagged with any of `tables`. Returns the count dropped."""
+        tables = set(tables)
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+            stale = [k for k, e in self._entries.items() if e.tags & tables]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def version(self, table: str) -> int:
+        """Monotonic per-table write counter (bumped by `invalidate`)."""
+        return self._versions.get(table, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared instance used by api.py
+cache = TTLCache(maxsize=512, ttls=TABLE_TTLS)
@@ -0,0 +1,72 @@
+"""
+Concurrent context assembly for the /chat endpoint.
+
+Each piece of prompt context is a named source. Sources run concurrently,
+each under its own timeout and all under a shared deadline; a source that
+is slow or fails is left out of the prompt instead of stalling the reply.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, NamedTuple, Tuple
+
+# Seconds. The total budget covers every phase of context assembly. The API
+# takes its values from CHAT_CONTEXT_BUDGET / CHAT_SOURCE_TIMEOUT (deps.Settings).
+CONTEXT_BUDGET = 3.0
+SOURCE_TIMEOUT = 1.5
+
+
+class ContextSource(NamedTuple):
+    name: str
+    fetch: Callable[[], Awaitable[Any]]
+    tables: Tuple[str, ...] = ()  # tables the result is built from
+
+
+class SourceTiming(NamedTuple):
+    name: str
+    ms: float
+    status: str  # ok | empty | timeout | error | skipped
+
+
+class Deadline:
+    """Tracks the remaining share of the overall context budget."""
+
+    def __init__(self, budget: float = CONTEXT_BUDGET):
+        self.expires_at = time.perf_counter() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.perf_counter())
+
+
+async def _run(source: ContextSource, timeout: float):
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(source.fetch(), timeout)
+        status = "ok" if result else "empty"
+    except asyncio.TimeoutError:
+        result, status = None, "timeout"
+    except Exception as e:
+        print(f"Context source {source.name} failed: {e}")
+        result, status = None, "error"
+    return result, SourceTiming(source.name, (time.perf_counter() - start) * 1000, status)
+
+
+async def gather_sources(sources: List[ContextSource], deadline: Deadline,
+                         timeout: float = SOURCE_TIMEOUT):
+    """
+    Run `sources` concurrently. Returns ({name: result}, [SourceTiming]);
+    sources that timed out, failed or were skipped map to None.
+    """
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        return ({s.name: None for s in sources},
+                [SourceTiming(s.name, 0.0, "skipped") for s in sources])
+
+    limit = min(timeout, remaining)
+    outcomes = await asyncio.gather(*(_run(s, limit) for s in sources))
+    results = {s.name: result for s, (result, _) in zip(sources, outcomes)}
+    return results, [timing for _, timing in outcomes]
+
+
+def format_timings(timings: List[SourceTiming]) -> str:
+    ordered = sorted(timings, key=lambda t: t.ms, reverse=True)
+    return ", ".join(f"{t.name}={t.ms:.0f}ms({t.status})" for t in ordered)
@@ -0,0 +1,145 @@
+"""
+Token-budgeted prompt context for /chat.
+
+Context arrives as sections of rows. Each section is projected to the columns
+that matter (stats columns ranked by `top_features`), rendered as a compact
+pipe-separated table instead of a list of dict reprs, and added in priority
+order until the token budget is spent. A section that no longer fits is cut
+down to the rows that do, or dropped.
+"""
+import math
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from ml.dataset import feature_key
+
+TOKEN_BUDGET = 2000      # the API's comes from CHAT_CONTEXT_TOKENS (deps.Settings)
+MAX_STAT_COLUMNS = 12
+
+# Identity columns always kept ahead of ranked stats columns.
+KEY_COLUMNS = ("team_id", "Squad", "team", "name")
+# Bookkeeping columns that never help the model answer.
+SKIP_COLUMNS = {"id", "created_at", "updated_at", "api_ref"}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English/JSON-ish text)."""
+    return math.ceil(len(text) / 4)
+
+
+class Section(NamedTuple):
+    name: str
+    label: str
+    priority: int  # lower is more important
+    rows: Sequence[Dict[str, Any]] = ()
+    columns: Optional[Sequence[str]] = None  # fixed projection; None = rank by features
+    text: str = ""  # preformatted body, used instead of rows
+
+
+class SectionReport(NamedTuple):
+    name: str
+    tokens: int
+    rows: int
+    status: str  # full | truncated | dropped
+
+
+class BuiltContext(NamedTuple):
+    text: str
+    tokens: int
+    report: List[SectionReport]
+
+
+def rank_columns(columns: Sequence[str], features: Sequence[str],
+                 limit: int = MAX_STAT_COLUMNS) -> List[str]:
+    """
+    Key columns first, then columns matching `features` in ranking order,
+    then the rest in their original order, capped at `limit` non-key columns.
+    Names are compared by `feature_key`, as the model's features are, so the
+    dataset's 'psxg_per_sot' ranks the stats table's 'PSxG/SoT'.
+    """
+    keys = [c for c in columns if c in KEY_COLUMNS]
+    rest = [c for c in columns if c not in KEY_COLUMNS]
+    normed = {c: feature_key(c) for c in rest}
+
+    ranked = []
+    for feature in features:
+        f = feature_key(feature)
+        if not f:
+            continue
+        for c in rest:
+            if c not in ranked and (normed[c] == f or (len(normed[c]) > 2 and (normed[c] in f or f in normed[c]))):
+                ranked.append(c)
+    ranked += [c for c in rest if c not in ranked]
+    return keys + ranked[:limit]
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def render_rows(rows: Sequence[Dict[str, Any]], columns: Sequence[str]) -> List[str]:
+    """Header line plus one pipe-separated line per row."""
+    return ["|".join(columns)] + ["|".join(_cell(r.get(c)) for c in columns) for r in rows]
+
+
+def _columns_for(section: Section, features: Sequence[str]) -> List[str]:
+    if section.columns is not None:
+        return list(section.columns)
+    seen: Dict[str, None] = {}
+    for row in section.rows:
+        seen.update(dict.fromkeys(row))
+    return rank_columns([c for c in seen if c not in SKIP_COLUMNS], features)
+
+
+def build_context(header: str, sections: Sequence[Section], features: Sequence[str] = (),
+                  budget: int = TOKEN_BUDGET) -> BuiltContext:
+    """Render `sections` under `budget` tokens, most important first."""
+    remaining = budget - estimate_tokens(header)
+    rendered: Dict[str, str] = {}
+    report = []
+
+    for section in sorted(sections, key=lambda s: s.priority):
+        title = f"\n{section.label}:"
+        if section.text:
+            body, lines = f"{title} {section.text}\n", None
+        else:
+            lines = render_rows(section.rows, _columns_for(section, features))
+            body = title + "\n" + "\n".join(lines) + "\n"
+
+        cost = estimate_tokens(body)
+        if cost <= remaining:
+            rendered[section.name] = body
+            remaining -= cost
+            report.append(SectionReport(section.name, cost, len(section.rows), "full"))
+            continue
+
+        # Keep the header plus as many leading rows as still fit.
+        if lines and len(lines) > 2:
+            kept, used = [lines[0]], estimate_tokens(title + lines[0]) + 8
+            for line in lines[1:]:
+                line_cost = estimate_tokens(line + "\n")
+                if used + line_cost > remaining:
+                    break
+                kept.append(line)
+                used += line_cost
+            if len(kept) > 1:
+                omitted = len(lines) - len(kept)
+                body = title + "\n" + "\n".join(kept) + f"\n(+{omitted} more rows omitted)\n"
+                cost = estimate_tokens(body)
+                rendered[section.name] = body
+                remaining -= cost
+                report.append(SectionReport(section.name, cost, len(kept) - 1, "truncated"))
+                continue
+
+        report.append(SectionReport(section.name, 0, 0, "dropped"))
+
+    # Emit in the caller's order so the prompt reads naturally.
+    text = header + "".join(rendered.get(s.name, "") for s in sections)
+    return BuiltContext(text, estimate_tokens(text), report)
+
+
+def format_report(built: BuiltContext) -> str:
+    parts = [f"{r.name}={r.tokens}t({r.status})" for r in built.report]
+    return f"~{built.tokens} tokens: " + ", ".join(parts)
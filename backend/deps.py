@@ -0,0 +1,140 @@
+"""
+Lazily built, swappable clients for the API.
+
+Importing api.py builds nothing and needs no credentials. The Supabase
+repository and the Gemini client are created on first use, or during the
+lifespan warm-up. The Gemini SDK is only imported then; importing it costs
+more than the rest of the app combined.
+
+BACKEND_CLIENTS=stub replaces both with local stand-ins (stubs.py), so the
+full app starts and can be load-tested offline. Tests plug in their own
+clients with `Provider.override`.
+"""
+import os
+import threading
+from typing import Any, Callable, Generic, NamedTuple, Optional, TypeVar
+
+import chat_context
+import context_builder
+import metrics
+from repository import SupabaseRepository
+
+T = TypeVar("T")
+
+
+class Settings(NamedTuple):
+    supabase_url: str
+    supabase_anon_key: str
+    gemini_api_key: str
+    clients: str            # "live" | "stub"
+    admin_api_key: str      # X-Admin-Key for operator endpoints; empty disables them
+    supabase_service_key: str  # runs place_bet / settle_match, which anon may not execute
+    warmup: bool            # WARMUP=0 skips preloading caches at startup
+    simulation_jobs: int    # worker processes for tournament simulations (-1 = all cores)
+    chat_cache_ttl: float   # seconds to reuse a full /chat answer (0 = off)
+    chat_context_budget: float  # seconds for all of a /chat request's context sources
+    chat_source_timeout: float  # seconds for any one of them
+    chat_context_tokens: int    # token budget of the rendered /chat context
+
+
+_settings: Optional[Settings] = None
+
+
+def settings() -> Settings:
+    """Environment (and .env) read once, on first call."""
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        clients = os.getenv("BACKEND_CLIENTS", "live").lower()
+        if clients not in ("live", "stub"):
+            raise ValueError(f"BACKEND_CLIENTS must be 'live' or 'stub', got {clients!r}")
+        _settings = Settings(os.getenv("SUPABASE_URL", ""), os.getenv("SUPABASE_ANON_KEY", ""),
+                             os.getenv("GEMINI_API_KEY", ""), clients, os.getenv("ADMIN_API_KEY", ""),
+                             os.getenv("SUPABASE_SERVICE_ROLE_KEY", ""),
+                             os.getenv("WARMUP", "1") != "0", int(os.getenv("SIMULATION_JOBS", "1")),
+                             float(os.getenv("CHAT_RESPONSE_CACHE_TTL", "0")),
+                             float(os.getenv("CHAT_CONTEXT_BUDGET", chat_context.CONTEXT_BUDGET)),
+                             float(os.getenv("CHAT_SOURCE_TIMEOUT", chat_context.SOURCE_TIMEOUT)),
+                             int(os.getenv("CHAT_CONTEXT_TOKENS", context_builder.TOKEN_BUDGET)))
+    return _settings
+
+
+class Provider(Generic[T]):
+    """
+    A client built by `factory` on first use. Attribute access is forwarded,
+    so `repo.select(...)` works on the provider itself and holders can
+    capture it at import time.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    @property
+    def built(self) -> bool:
+        return self._value is not None
+
+    def override(self, value: Optional[T]) -> None:
+        """Use `value` from now on (None: build from the factory again on next use)."""
+        self._value = value
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+def _require(*names: str) -> None:
+    values = dict(zip(("SUPABASE_URL", "SUPABASE_ANON_KEY", "GEMINI_API_KEY"), settings()[:3]))
+    missing = [n for n in names if not values[n]]
+    if missing:
+        raise ValueError(f"Missing required environment variables: {', '.join(missing)}. "
+                         "Check your .env file, or set BACKEND_CLIENTS=stub to run without them.")
+
+
+def build_repository() -> SupabaseRepository:
+    if settings().clients == "stub":
+        from stubs import PostgrestStub
+        return SupabaseRepository("http://stub.local", "stub", transport=PostgrestStub(),
+                                  observer=metrics.supabase_observer)
+    _require("SUPABASE_URL", "SUPABASE_ANON_KEY")
+    # One pooled async client for every request (keep-alive, no threadpool hop)
+    return SupabaseRepository(settings().supabase_url, settings().supabase_anon_key,
+                              service_key=settings().supabase_service_key or None,
+                              observer=metrics.supabase_observer)
+
+
+def build_gemini() -> Any:
+    if settings().clients == "stub":
+        from stubs import StubGemini
+        return StubGemini()
+    _require("GEMINI_API_KEY")
+    from google import genai
+    return genai.Client(api_key=settings().gemini_api_key)
+
+
+repo: Provider[SupabaseRepository] = Provider("supabase", build_repository)
+gemini: Provider[Any] = Provider("gemini", build_gemini)
+
+
+def check() -> None:
+    """Fail fast at startup (not import) when live credentials are missing."""
+    if settings().clients == "live":
+        _require("SUPABASE_URL", "SUPABASE_ANON_KEY", "GEMINI_API_KEY")
+
+
+async def aclose() -> None:
+    """Close the pooled clients; a later lifespan builds fresh ones."""
+    if repo.built:
+        await repo.get().aclose()
+        repo.override(None)
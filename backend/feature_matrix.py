@@ -0,0 +1,218 @@
+"""
+In-memory team x feature matrix over the 2026 WC Quals stats tables.
+
+The four stats tables are keyed inconsistently (team_id, Squad, team). This
+module joins them once onto the canonical `teams.id` key and keeps the numeric
+columns in a column-major NumPy array, so a per-team lookup is a dict hit plus
+a row slice rather than several queries. Each table is its own column block
+and can be rebuilt without touching the others.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from stats import STATS_TABLES, StatsTable
+from team_index import TeamIndex
+
+KEY_COLUMNS = {"id", "team_id", "Squad", "team", "created_at"}
+
+
+class Block(NamedTuple):
+    columns: List[str]
+    values: np.ndarray   # (teams, columns) float64, NaN where missing
+    present: np.ndarray  # (teams,) bool, True where the table has a row for the team
+
+
+def _to_float(value) -> float:
+    if value is None or isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        # Sheet exports carry thousands separators and percent signs ("1,234", "54.2%")
+        return float(str(value).replace(",", "").rstrip("%"))
+    except ValueError:
+        return np.nan
+
+
+def build_block(spec: StatsTable, rows: Iterable[dict], index: TeamIndex,
+                team_ids: Sequence[int]) -> Block:
+    """Numeric columns of one stats table aligned to `team_ids` (NaN where missing)."""
+    position = {t: i for i, t in enumerate(team_ids)}
+    placed: Dict[int, dict] = {}
+    for row in rows:
+        team_id = row.get(spec.id_column) if spec.id_column else None
+        if team_id not in position:
+            name = row.get(spec.name_column)
+            team = index.resolve(str(name)) if name else None
+            team_id = team["id"] if team else None
+        if team_id in position and team_id not in placed:
+            placed[team_id] = row
+
+    columns: Dict[str, None] = {}
+    for row in placed.values():
+        columns.update(dict.fromkeys(c for c in row if c not in KEY_COLUMNS))
+
+    block = np.full((len(team_ids), len(columns)), np.nan)
+    for team_id, row in placed.items():
+        block[position[team_id]] = [_to_float(row.get(c)) for c in columns]
+
+    # Drop text-only columns (e.g. a minutes column stored as free text)
+    keep = ~np.all(np.isnan(block), axis=0) if len(placed) else np.zeros(len(columns), bool)
+    names = [c for c, k in zip(columns, keep) if k]
+    present = np.zeros(len(team_ids), bool)
+    present[[position[t] for t in placed]] = True
+    return Block(names, np.ascontiguousarray(block[:, keep]), present)
+
+
+class FeatureMatrix:
+    """Immutable snapshot: rows are teams, columns are '<category>.<column>'."""
+
+    def __init__(self, teams: Sequence[dict], blocks: Dict[str, Block]):
+        self.team_ids = np.array([t["id"] for t in teams], dtype=np.int64)
+        self.team_names = [t["name"] for t in teams]
+        self._row = {int(t): i for i, t in enumerate(self.team_ids)}
+        self.blocks = blocks
+
+        self.columns: List[str] = []
+        self.block_slices: Dict[str, slice] = {}
+        arrays = []
+        for category, block in blocks.items():
+            start = len(self.columns)
+            self.columns += [f"{category}.{c}" for c in block.columns]
+            self.block_slices[category] = slice(start, len(self.columns))
+            arrays.append(block.values)
+        values = np.hstack(arrays) if arrays else np.empty((len(teams), 0))
+        self.values = np.asfortranarray(values)
+        self._col = {c: i for i, c in enumerate(self.columns)}
+        self.built_at = time.time()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    def row_index(self, team_id: int) -> Optional[int]:
+        return self._row.get(team_id)
+
+    def column_indices(self, columns: Sequence[str]) -> List[int]:
+        """Indices for full names ('shooting.SoT') or whole categories ('shooting')."""
+        out = []
+        for c in columns:
+            if c in self.block_slices:
+                out += list(range(*self.block_slices[c].indices(len(self.columns))))
+            elif c in self._col:
+                out.append(self._col[c])
+            else:
+                raise KeyError(c)
+        return out
+
+    def select(self, team_ids: Sequence[int], columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Sub-matrix for `team_ids` (unknown IDs give NaN rows) and `columns`."""
+        cols = self.column_indices(columns) if columns else list(range(len(self.columns)))
+        rows = np.array([self._row.get(t, -1) for t in team_ids], dtype=np.intp)
+        out = np.full((len(rows), len(cols)), np.nan)
+        known = rows >= 0
+        out[known] = self.values[np.ix_(rows[known], cols)]
+        return out
+
+    def features(self, team_id: int, category: str) -> Optional[Dict[str, Optional[float]]]:
+        """{column: value} for one team in one category, None if the table has no row for it."""
+        i = self._row.get(team_id)
+        block = self.blocks[category]
+        if i is None or not block.present[i]:
+            return None
+        return {c: (None if np.isnan(v) else float(v)) for c, v in zip(block.columns, block.values[i].tolist())}
+
+    def documents(self, teams: Sequence[dict], categories: Optional[Sequence[str]] = None) -> List[dict]:
+        """One document per team: {"team_id", "name", <category>: {column: value} or None, ...}."""
+        categories = categories or list(self.blocks)
+        return [
+            dict({"team_id": t["id"], "name": t["name"]},
+                 **{c: self.features(t["id"], c) for c in categories})
+            for t in teams
+        ]
+
+    def with_block(self, category: str, block: Block) -> "FeatureMatrix":
+        """Copy with one category's block replaced (teams unchanged)."""
+        blocks = dict(self.blocks)
+        blocks[category] = block
+        teams = [{"id": int(t), "name": n} for t, n in zip(self.team_ids, self.team_names)]
+        return FeatureMatrix(teams, blocks)
+
+
+class FeatureMatrixStore:
+    """
+    Builds the matrix on first use and keeps it current. Staleness is read
+    from per-table write counters (`version`, e.g. `cache.version`): a bumped
+    stats table rebuilds only its block, a bumped `teams` rebuilds everything.
+    """
+
+    def __init__(self, fetch_table: Callable[[str], Awaitable[List[dict]]],
+                 get_index: Callable[[], Awaitable[TeamIndex]],
+                 version: Callable[[str], int] = lambda table: 0,
+                 refresh_interval: float = 900.0):
+        self._fetch = fetch_table
+        self._get_index = get_index
+        self._version = version
+        self.refresh_interval = refresh_interval
+        self.matrix: Optional[FeatureMatrix] = None
+        self._built: Dict[str, int] = {}  # table -> version the matrix was built from
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _block(self, category: str, index: TeamIndex, team_ids: Sequence[int]) -> Block:
+        spec = STATS_TABLES[category]
+        version = self._version(spec.table)
+        block = build_block(spec, await self._fetch(spec.table), index, team_ids)
+        self._built[spec.table] = version
+        return block
+
+    def _stale(self) -> List[str]:
+        return [c for c, spec in STATS_TABLES.items()
+                if self._built.get(spec.table) != self._version(spec.table)]
+
+    async def rebuild(self) -> FeatureMatrix:
+        version = self._version("teams")
+        index = await self._get_index()
+        teams = sorted(index.teams.values(), key=lambda t: t["id"])
+        ids = [t["id"] for t in teams]
+        blocks = await asyncio.gather(*(self._block(c, index, ids) for c in STATS_TABLES))
+        self.matrix = FeatureMatrix(teams, dict(zip(STATS_TABLES, blocks)))
+        self._built["teams"] = version
+        return self.matrix
+
+    async def get(self) -> FeatureMatrix:
+        if self.matrix is not None and not self._stale() \
+                and self._built.get("teams") == self._version("teams"):
+            return self.matrix
+        async with self._lock:
+            if self.matrix is None or self._built.get("teams") != self._version("teams"):
+                await self.rebuild()
+            elif self._stale():
+                index = await self._get_index()
+                matrix = self.matrix
+                ids = matrix.team_ids.tolist()
+                for category in self._stale():
+                    matrix = matrix.with_block(category, await self._block(category, index, ids))
+                self.matrix = matrix
+        return self.matrix
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self._lock:
+                    await self.rebuild()
+            except Exception as e:
+                print(f"Feature matrix refresh failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,220 @@
+"""
+API-Football fixtures ingestion into `teams` and `matches`.
+
+Fixture pages are streamed from /fixtures and every raw response is cached on
+disk (keyed by endpoint and parameters), so a re-run or `offline=True` costs
+no API quota. Team names go through one in-memory `TeamIndex` (aliases such
+as "USA" / "South Korea" included); teams it cannot resolve are created in a
+single insert. Matches are bulk-upserted on `api_ref` (the fixture id), so the
+job is idempotent and picks up score/status changes on every run.
+"""
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from repository import SupabaseRepository, chunked
+from team_index import TeamIndex
+
+BASE_URL = "https://v3.football.api-sports.io"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "api_football"
+WORLD_CUP = 1
+BATCH_SIZE = 500
+
+# fixture.status.short -> matches.status
+STATUSES = {
+    **dict.fromkeys(["TBD", "NS", "PST", "CANC", "ABD", "SUSP"], "upcoming"),
+    **dict.fromkeys(["1H", "HT", "2H", "ET", "BT", "P", "INT", "LIVE"], "live"),
+    **dict.fromkeys(["FT", "AET", "PEN", "AWD", "WO"], "finished"),
+}
+
+
+class IngestError(Exception):
+    """API-Football answered with errors or an unexpected payload."""
+
+
+def classify_stage(round_name: Optional[str]) -> Optional[str]:
+    """API-Football `league.round` -> stage ('Group', 'RO16', ...); None for 3rd place and others."""
+    r = (round_name or "").lower()
+    if "group" in r:
+        return "Group"
+    if "round of 32" in r:
+        return "RO32"
+    if "round of 16" in r:
+        return "RO16"
+    if "quarter" in r:
+        return "Quarterfinals"
+    if "semi" in r:
+        return "Semifinals"
+    if "final" in r and "3rd" not in r and "third" not in r:
+        return "Final"
+    return None
+
+
+# --- Fetching ---
+
+def cache_dir() -> Path:
+    """API_FOOTBALL_CACHE_DIR, or .cache/api_football next to this module."""
+    return Path(os.getenv("API_FOOTBALL_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+class ResponseCache:
+    """Raw JSON responses on disk, one file per (endpoint, params, page)."""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory or cache_dir())
+
+    def path(self, endpoint: str, params: Dict[str, Any]) -> Path:
+        key = json.dumps([endpoint, sorted(params.items())], default=str)
+        return self.directory / f"{endpoint}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.json"
+
+    def get(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        path = self.path(endpoint, params)
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def put(self, endpoint: str, params: Dict[str, Any], payload: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(endpoint, params)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload))
+        tmp.replace(path)
+
+
+async def stream_pages(client: Optional[httpx.AsyncClient], endpoint: str, params: Dict[str, Any], *,
+                       cache: ResponseCache, offline: bool = False,
+                       refresh: bool = False) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield the `response` list of each page of `endpoint`, following
+    `paging.total`. Cached pages are used unless `refresh`; `offline` never
+    touches the network.
+    """
+    page, total = 1, 1
+    while page <= total:
+        page_params = dict(params, page=page) if page > 1 else dict(params)
+        payload = None if refresh and not offline else cache.get(endpoint, page_params)
+        if payload is None:
+            if offline or client is None:
+                raise IngestError(f"{endpoint} {page_params} is not cached (run online once)")
+            resp = await client.get(f"/{endpoint}", params=page_params)
+            if resp.status_code >= 400:
+                raise IngestError(f"{endpoint}: HTTP {resp.status_code}: {resp.text[:200]}")
+            payload = resp.json()
+            # Quota and auth problems come back as 200 with a non-empty `errors`
+            if payload.get("errors"):
+                raise IngestError(f"{endpoint}: {payload['errors']}")
+            cache.put(endpoint, page_params, payload)
+        yield payload.get("response") or []
+        total = int((payload.get("paging") or {}).get("total") or 1)
+        page += 1
+
+
+async def fetch_fixtures(league: int = WORLD_CUP, season: int = 2022, *, api_key: Optional[str] = None,
+                         cache: Optional[ResponseCache] = None, offline: bool = False, refresh: bool = False,
+                         transport: Optional[httpx.AsyncBaseTransport] = None) -> List[Dict[str, Any]]:
+    """Every fixture of a league season (API-Football `response` items)."""
+    cache = cache or ResponseCache()
+    api_key = api_key or os.getenv("API_FOOTBALL_KEY", "")
+    if not offline and not api_key:
+        print("API_FOOTBALL_KEY not set; reading cached responses only")
+        offline = True
+    fixtures: List[Dict[str, Any]] = []
+    headers = {"x-rapidapi-key": api_key, "x-rapidapi-host": "v3.football.api-sports.io"}
+    async with httpx.AsyncClient(base_url=BASE_URL, headers=headers, timeout=20.0, transport=transport) as client:
+        async for page in stream_pages(client, "fixtures", {"league": league, "season": season},
+                                       cache=cache, offline=offline, refresh=refresh):
+            fixtures.extend(page)
+    return fixtures
+
+
+# --- Mapping ---
+
+def fixture_teams(fixtures: Iterable[Dict[str, Any]]) -> List[str]:
+    """Distinct team names, in order of first appearance."""
+    names: Dict[str, None] = {}
+    for f in fixtures:
+        names.setdefault(f["teams"]["home"]["name"])
+        names.setdefault(f["teams"]["away"]["name"])
+    return list(names)
+
+
+def match_row(fixture: Dict[str, Any], team_ids: Dict[str, int]) -> Dict[str, Any]:
+    """`matches` row for one fixture; `team_ids` maps API team names to teams.id."""
+    info, teams, goals = fixture["fixture"], fixture["teams"], fixture.get("goals") or {}
+    venue = info.get("venue") or {}
+    status = STATUSES.get((info.get("status") or {}).get("short"), "upcoming")
+    return {
+        "api_ref": str(info["id"]),
+        "team1_id": team_ids[teams["home"]["name"]],
+        "team2_id": team_ids[teams["away"]["name"]],
+        "match_date": info["date"],
+        "score_team1": goals.get("home") if status != "upcoming" else None,
+        "score_team2": goals.get("away") if status != "upcoming" else None,
+        "status": status,
+        "stage": classify_stage(fixture["league"].get("round")) or fixture["league"].get("round"),
+        "venue": ", ".join(v for v in (venue.get("name"), venue.get("city")) if v) or None,
+    }
+
+
+def opponents_by_round(fixtures: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """{team: {"Group": [opponents by date], "RO16": opponent, ...}} in one pass."""
+    out: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"Group": []})
+    for f in sorted(fixtures, key=lambda f: f["fixture"]["date"]):
+        stage = classify_stage(f["league"].get("round"))
+        home, away = f["teams"]["home"]["name"], f["teams"]["away"]["name"]
+        if stage == "Group":
+            out[home]["Group"].append(away)
+            out[away]["Group"].append(home)
+        elif stage:
+            out[home][stage] = away
+            out[away][stage] = home
+    return dict(out)
+
+
+# --- Loading ---
+
+async def resolve_teams(repo: SupabaseRepository, index: TeamIndex, names: Iterable[str], *,
+                        create: bool = True) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+    """
+    ({api name: teams.id}, inserted team rows). Unknown names are inserted in
+    one batch when `create`, otherwise their fixtures are skipped.
+    """
+    ids: Dict[str, int] = {}
+    missing = []
+    for name in names:
+        team = index.resolve(name)
+        if team:
+            ids[name] = team["id"]
+        else:
+            missing.append(name)
+    created: List[Dict[str, Any]] = []
+    if missing and create:
+        created = await repo.insert("teams", [{"name": n} for n in missing])
+        ids.update({t["name"]: t["id"] for t in created})
+    elif missing:
+        print(f"Skipping fixtures of unknown teams: {', '.join(missing)}")
+    return ids, created
+
+
+async def upsert_matches(repo: SupabaseRepository, rows: List[Dict[str, Any]], *,
+                         batch_size: int = BATCH_SIZE) -> List[Dict[str, Any]]:
+    """Bulk upsert on api_ref; returns the stored rows."""
+    written = []
+    for batch in chunked(rows, batch_size):
+        written.extend(await repo.upsert("matches", batch, on_conflict="api_ref", returning=True))
+    return written
+
+
+async def ingest(repo: SupabaseRepository, index: TeamIndex, fixtures: List[Dict[str, Any]], *,
+                 create_teams: bool = True) -> Dict[str, Any]:
+    """Load fixtures into teams/matches. Returns the written rows and counts."""
+    team_ids, created = await resolve_teams(repo, index, fixture_teams(fixtures), create=create_teams)
+    rows = [match_row(f, team_ids) for f in fixtures
+            if f["teams"]["home"]["name"] in team_ids and f["teams"]["away"]["name"] in team_ids]
+    written = await upsert_matches(repo, rows)
+    return {"fixtures": len(fixtures), "matches": written, "teams_created": created,
+            "ingested_at": datetime.now(timezone.utc).isoformat()}
@@ -0,0 +1,88 @@
+"""
+Pre-encoded JSON bodies with strong ETags for the polled list endpoints.
+
+A body is serialized once when its cache entry is filled, hashed into an
+ETag, and compressed lazily the first time a client asks for it, so a
+repeat poll costs a dict lookup plus either a 304 or a copy of ready bytes.
+"""
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed (headers would dominate)
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# Clients may keep the body but must revalidate it on every poll
+CACHE_CONTROL = "no-cache"
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+class EncodedBody:
+    """Serialized JSON plus its ETag; compressed variants are built on first use."""
+
+    __slots__ = ("body", "etag", "_gzip", "_br")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self._gzip: Optional[bytes] = None
+        self._br: Optional[bytes] = None
+
+    def gzipped(self) -> bytes:
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+        return self._gzip
+
+    def brotli(self) -> bytes:
+        if self._br is None:
+            self._br = brotli.compress(self.body, quality=5)
+        return self._br
+
+
+def encode(value: Any) -> EncodedBody:
+    return EncodedBody(dumps(value))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_response(request: Request, encoded: EncodedBody,
+                         headers: Optional[Dict[str, str]] = None) -> Response:
+    """200 with the (possibly compressed) body, or 304 if the client's copy is current."""
+    headers = dict(headers or {}, ETag=encoded.etag, Vary="Accept-Encoding")
+    headers["Cache-Control"] = CACHE_CONTROL
+    if etag_matches(request.headers.get("if-none-match"), encoded.etag):
+        return Response(status_code=304, headers=headers)
+
+    body = encoded.body
+    if len(body) >= COMPRESS_MIN_SIZE:
+        accept = request.headers.get("accept-encoding", "")
+        if brotli is not None and "br" in accept:
+            body, headers["Content-Encoding"] = encoded.brotli(), "br"
+        elif "gzip" in accept:
+            body, headers["Content-Encoding"] = encoded.gzipped(), "gzip"
+    return Response(body, media_type="application/json", headers=headers)
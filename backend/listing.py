@@ -0,0 +1,72 @@
+"""
+Keyset pagination and column projection for the list endpoints.
+
+Pages are ordered by a unique key column and continue with `key > cursor`,
+so every page is one bounded PostgREST query no matter how deep the client
+has paged. The response body stays a plain list; the cursor for the next
+page travels in the `X-Next-Cursor` header and is absent on the last page.
+
+Paging is opt-in: a request with neither `limit` nor a cursor gets every
+row, as the list endpoints always returned. A cursor without a limit pages
+by DEFAULT_PAGE_SIZE.
+"""
+import re
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from repository import AnyOf, Filters
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+CURSOR_HEADER = "X-Next-Cursor"
+
+# Column names as they appear in the tables, including the sheet-style
+# stats headers ("Per 90 Gls", "SoT%", "G+A-PK", "Save% (PK)").
+_FIELD = re.compile(r"^[\w#%+\-/ ().]+$")
+
+
+class Page(NamedTuple):
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def parse_fields(fields: Optional[str], key: str = "id") -> str:
+    """
+    PostgREST `select` list for a comma-separated `fields` parameter ('*' when
+    empty). The key column is always included so the next cursor can be read.
+    Raises ValueError on names that are not plain column names.
+    """
+    if not fields:
+        return "*"
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    bad = [f for f in names if not _FIELD.match(f)]
+    if bad:
+        raise ValueError(f"Invalid field {', '.join(bad)}")
+    if key not in names:
+        names.insert(0, key)
+    return ",".join(f if re.match(r"^\w+$", f) else f'"{f}"' for f in dict.fromkeys(names))
+
+
+async def fetch_page(select: Callable[..., Awaitable[List[Dict[str, Any]]]], table: str, *,
+                     fields: Optional[str] = None, after: Optional[str] = None,
+                     limit: Optional[int] = None, filters: Optional[Filters] = None,
+                     any_of: Optional[AnyOf] = None, key: str = "id") -> Page:
+    """
+    One page of `table` through `select` (a `repo.select`-compatible callable).
+    Fetches one extra row to tell whether another page follows. Without
+    `limit` and `after` the page is the whole table.
+    """
+    filters = dict(filters or {})
+    if limit is None and after is None:
+        rows = await select(table, parse_fields(fields, key), filters=filters or None, order=key, any_of=any_of)
+        return Page(rows, None)
+    limit = DEFAULT_PAGE_SIZE if limit is None else limit
+    if after is not None:
+        existing = filters.get(key)
+        filters[key] = ([] if existing is None else existing if isinstance(existing, list)
+                        else [existing]) + [("gt", after)]
+    rows = await select(table, parse_fields(fields, key), filters=filters or None,
+                        order=key, limit=limit + 1, any_of=any_of)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, str(rows[-1][key]))
+    return Page(rows, None)
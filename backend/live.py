@@ -0,0 +1,224 @@
+"""
+Push updates for matches, value bets and odds.
+
+Writes report changed rows to a `ChangeFeed`, which diffs them against the
+last version it saw and publishes the changed fields to a `LiveHub`. The hub
+fans each delta out to the subscribers of its topics:
+
+    matches      every match row
+    match:<id>   one match
+    valuebets    the value bets table
+    odds         qualifying and outright odds
+
+Each subscriber holds at most one pending event per (topic, row). A newer
+delta for the same row is merged into the pending one, so a slow consumer
+receives the latest state rather than a backlog. If a subscriber still falls
+behind by more than `max_pending` rows, its pending events for that topic
+are replaced by a single `resync` event and the client refetches over REST.
+
+The feed remembers the last `max_rows` rows it published (least recently
+written dropped first). A forgotten row's next change goes out as a full
+`upsert` instead of a diff.
+"""
+import asyncio
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+
+TOPIC_PATTERN = re.compile(r"^(matches|valuebets|odds|match:\d+)$")
+
+# Which topics a changed row is published to, per source table
+TABLE_TOPICS: Dict[str, Callable[[dict], List[str]]] = {
+    "matches": lambda row: ["matches", f"match:{row['id']}"],
+    "match_cards": lambda row: ["matches"],
+    "valuebets": lambda row: ["valuebets"],
+    "qualifying_odds": lambda row: ["odds"],
+    "outright_winning_odds": lambda row: ["odds"],
+}
+
+
+def parse_topics(topics: Union[None, str, Iterable[str]]) -> List[str]:
+    """Comma-separated string or list of topics. Raises ValueError on unknown topics."""
+    if topics is None or isinstance(topics, str):
+        topics = (topics or "").split(",")
+    elif not all(isinstance(t, str) for t in topics):
+        raise ValueError("Topics must be strings")
+    wanted = [t.strip() for t in topics if t.strip()]
+    bad = [t for t in wanted if not TOPIC_PATTERN.match(t)]
+    if bad:
+        raise ValueError(f"Unknown topic {', '.join(bad)}. Use matches, valuebets, odds or match:<id>")
+    return wanted
+
+
+class Subscription:
+    """One client's topics and its coalesced pending events."""
+
+    def __init__(self, hub: "LiveHub", max_pending: int):
+        self.hub = hub
+        self.topics: Set[str] = set()
+        self.max_pending = max_pending
+        self.closed = False
+        self.delivered = 0
+        self.coalesced = 0
+        self.resyncs = 0
+        self._pending: Dict[Tuple[str, Hashable], dict] = {}
+        self._wake = asyncio.Event()
+
+    def subscribe(self, *topics: str) -> None:
+        self.hub._attach(self, topics)
+
+    def unsubscribe(self, *topics: str) -> None:
+        self.hub._detach(self, topics)
+
+    def offer(self, event: dict) -> None:
+        topic = event["topic"]
+        if (topic, None) in self._pending:
+            return  # a resync is already queued for this topic
+        key = (topic, event.get("key"))
+        prev = self._pending.get(key)
+        if prev is not None:
+            # Events are shared between subscribers, so merge into a copy
+            merged = dict(event)
+            if prev["type"] != "delete" and event["type"] == "update":
+                merged["type"] = prev["type"]
+                merged["changes"] = dict(prev.get("changes") or {}, **event["changes"])
+            self._pending[key] = merged
+            self.coalesced += 1
+        elif len(self._pending) >= self.max_pending:
+            for k in [k for k in self._pending if k[0] == topic]:
+                del self._pending[k]
+            self._pending[(topic, None)] = {"topic": topic, "type": "resync"}
+            self.resyncs += 1
+        else:
+            self._pending[key] = event
+        self._wake.set()
+
+    async def next_batch(self, window: Optional[float] = None) -> Optional[List[dict]]:
+        """
+        Wait for events, then linger `window` seconds so bursts go out as one
+        message. Returns None once the subscription is closed.
+        """
+        await self._wake.wait()
+        if self.closed:
+            return None
+        window = self.hub.coalesce_window if window is None else window
+        if window > 0:
+            await asyncio.sleep(window)
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._wake.clear()
+        self.delivered += len(batch)
+        return batch
+
+    def close(self) -> None:
+        self.hub._detach(self, tuple(self.topics))
+        self.closed = True
+        self._wake.set()
+
+
+class LiveHub:
+    """Topic -> subscriber fan-out. `publish` never blocks on a subscriber."""
+
+    def __init__(self, max_pending: int = 256, coalesce_window: float = 0.1):
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    def subscribe(self, topics: Iterable[str] = ()) -> Subscription:
+        sub = Subscription(self, self.max_pending)
+        sub.subscribe(*topics)
+        return sub
+
+    def _attach(self, sub: Subscription, topics: Iterable[str]) -> None:
+        for topic in topics:
+            self._subscribers.setdefault(topic, set()).add(sub)
+            sub.topics.add(topic)
+
+    def _detach(self, sub: Subscription, topics: Iterable[str]) -> None:
+        for topic in topics:
+            subs = self._subscribers.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[topic]
+            sub.topics.discard(topic)
+
+    def publish(self, topic: str, event_type: str, key: Hashable = None,
+                changes: Optional[Dict[str, Any]] = None) -> int:
+        """Queue an event for every subscriber of `topic`. Returns the fan-out count."""
+        subs = self._subscribers.get(topic)
+        if not subs:
+            return 0
+        event = {"topic": topic, "type": event_type, "key": key}
+        if changes is not None:
+            event["changes"] = changes
+        for sub in subs:
+            sub.offer(event)
+        self.published += 1
+        return len(subs)
+
+    def stats(self) -> Dict[str, Any]:
+        subs = {s for group in self._subscribers.values() for s in group}
+        return {
+            "subscribers": len(subs),
+            "topics": {t: len(s) for t, s in self._subscribers.items()},
+            "published": self.published,
+            "pending": sum(len(s._pending) for s in subs),
+        }
+
+
+def diff_row(old: Optional[dict], new: dict) -> Dict[str, Any]:
+    """Fields of `new` that differ from `old` (all of them when `old` is None)."""
+    if old is None:
+        return dict(new)
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+
+class ChangeFeed:
+    """
+    In-process change feed: remembers the last version of each published
+    row (up to `max_rows`) and publishes only the changed fields. Tables
+    without topics are not tracked.
+    """
+
+    def __init__(self, hub: LiveHub, max_rows: int = 20_000):
+        self.hub = hub
+        self.max_rows = max_rows
+        self.evicted = 0
+        self._rows: "OrderedDict[Tuple[str, Hashable], dict]" = OrderedDict()
+
+    def rows_changed(self, table: str, rows: Iterable[dict],
+                     key: Union[str, Callable[[dict], Hashable]] = "id") -> int:
+        """Publish inserts/updates for `rows`. Returns the number of rows that changed."""
+        topics_for = TABLE_TOPICS.get(table)
+        if topics_for is None:
+            return 0
+        changed = 0
+        for row in rows:
+            row_key = key(row) if callable(key) else row.get(key)
+            old = self._rows.get((table, row_key))
+            changes = diff_row(old, row)
+            if not changes:
+                continue
+            self._rows[(table, row_key)] = dict(old or {}, **row)
+            self._rows.move_to_end((table, row_key))
+            changed += 1
+            for topic in topics_for(row):
+                self.hub.publish(topic, "upsert" if old is None else "update", row_key, changes)
+        while len(self._rows) > self.max_rows:
+            self._rows.popitem(last=False)
+            self.evicted += 1
+        return changed
+
+    def rows_deleted(self, table: str, keys: Iterable[Hashable]) -> None:
+        topics_for = TABLE_TOPICS.get(table)
+        if topics_for is None:
+            return
+        for row_key in keys:
+            old = self._rows.pop((table, row_key), None)
+            for topic in topics_for(old or {"id": row_key}):
+                self.hub.publish(topic, "delete", row_key)
+
+    def __len__(self) -> int:
+        return len(self._rows)
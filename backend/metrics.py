@@ -0,0 +1,262 @@
+"""
+Latency and upstream instrumentation, exposed in Prometheus text format.
+
+    http_request_duration_seconds{method,route,status}    ASGI middleware
+    upstream_request_duration_seconds{upstream,target,op}  Supabase tables/RPCs, Gemini
+    upstream_rows_total / upstream_response_bytes_total / upstream_errors_total
+
+Recording is a bisect into fixed buckets plus a few integer adds on the
+event-loop thread, so the fast path costs a couple of microseconds. Routes
+are labelled by their path template (`/features/{team_id}`), never the raw
+path, to keep the label set bounded.
+
+Set PROFILE_SLOW_MS to run a sampling profiler: while enabled, a background
+thread samples the event-loop thread's stack, and requests slower than the
+threshold dump the samples taken during them as folded stacks
+(`frame;frame;frame count`, readable by flamegraph.pl and speedscope) to
+PROFILE_DIR.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; upstream calls and chat answers reach into the tens of seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Registry:
+    """Histograms and counters keyed by (name, labels). Not thread-safe: record from the event loop."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.help: Dict[str, str] = {}
+        self.collectors: List[Callable[[], Dict[str, float]]] = []
+
+    def describe(self, name: str, text: str) -> None:
+        self.help[name] = text
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        series = self.histograms.setdefault(name, {})
+        hist = series.get(labels)
+        if hist is None:
+            hist = series[labels] = Histogram()
+        hist.observe(value)
+
+    def inc(self, name: str, labels: Labels, amount: float = 1.0) -> None:
+        series = self.counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0.0) + amount
+
+    def add_collector(self, collect: Callable[[], Dict[str, float]]) -> None:
+        """`collect()` returns {metric name: value} gauges read at scrape time (e.g. cache stats)."""
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, series in sorted(self.histograms.items()):
+            lines += [f"# HELP {name} {self.help.get(name, name)}", f"# TYPE {name} histogram"]
+            for labels, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS + ("+Inf",), hist.counts):
+                    cumulative += n
+                    le = 'le="%s"' % bound
+                    lines.append(f"{name}_bucket{_labels(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {hist.sum:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        for name, series in sorted(self.counters.items()):
+            lines += [f"# HELP {name} {self.help.get(name, name)}", f"# TYPE {name} counter"]
+            lines += [f"{name}{_labels(labels)} {value:g}" for labels, value in sorted(series.items())]
+        for collect in self.collectors:
+            try:
+                gauges = collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, value in gauges.items():
+                lines += [f"# TYPE {name} gauge", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+registry.describe("http_request_duration_seconds", "Time from request start to the last body chunk.")
+registry.describe("upstream_request_duration_seconds", "Supabase and Gemini call latency.")
+registry.describe("upstream_rows_total", "Rows returned by Supabase.")
+registry.describe("upstream_response_bytes_total", "Response payload bytes from upstreams.")
+registry.describe("upstream_errors_total", "Upstream calls that failed (HTTP >= 400 or exception).")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def record_upstream(upstream: str, target: str, op: str, seconds: float, *,
+                    rows: int = 0, nbytes: int = 0, error: bool = False) -> None:
+    labels = (("upstream", upstream), ("target", target), ("op", op))
+    registry.observe("upstream_request_duration_seconds", labels, seconds)
+    if rows:
+        registry.inc("upstream_rows_total", labels, rows)
+    if nbytes:
+        registry.inc("upstream_response_bytes_total", labels, nbytes)
+    if error:
+        registry.inc("upstream_errors_total", labels)
+
+
+def supabase_observer(target: str, op: str, seconds: float, status_code: int, rows: int, nbytes: int) -> None:
+    """`SupabaseRepository(observer=...)` hook; status_code 0 means the request raised."""
+    record_upstream("supabase", target, op, seconds, rows=rows, nbytes=nbytes,
+                    error=status_code == 0 or status_code >= 400)
+
+
+@contextmanager
+def timed(upstream: str, target: str, op: str) -> Iterator[Dict[str, int]]:
+    """
+    Time a block as one upstream call. Set `rows` / `nbytes` on the yielded
+    dict; an exception escaping the block counts as an error.
+    """
+    info = {"rows": 0, "nbytes": 0}
+    start = time.perf_counter()
+    try:
+        yield info
+    except BaseException:
+        record_upstream(upstream, target, op, time.perf_counter() - start, error=True, **info)
+        raise
+    record_upstream(upstream, target, op, time.perf_counter() - start, **info)
+
+
+# --- Sampling profiler ---
+
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds into a short ring buffer."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005, keep: float = 60.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Deque[Tuple[float, str]] = deque(maxlen=int(keep / interval))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples.append((time.perf_counter(), ";".join(reversed(stack))))
+
+    def folded(self, start: float, end: float) -> Dict[str, int]:
+        """Stacks sampled between `start` and `end` (perf_counter), counted."""
+        return dict(Counter(stack for t, stack in list(self.samples) if start <= t <= end))
+
+
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+class SlowRequestDumper:
+    """Writes the profiler's samples for requests slower than `threshold` seconds."""
+
+    def __init__(self, profiler: SamplingProfiler, threshold: float, directory: Path):
+        self.profiler = profiler
+        self.threshold = threshold
+        self.directory = Path(directory)
+
+    def __call__(self, route: str, start: float, end: float) -> Optional[Path]:
+        if end - start < self.threshold:
+            return None
+        stacks = self.profiler.folded(start, end)
+        if not stacks:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / (f"{time.strftime('%Y%m%dT%H%M%S')}-{_SLUG.sub('_', route).strip('_') or 'root'}"
+                                 f"-{int((end - start) * 1000)}ms.folded")
+        path.write_text("".join(f"{stack} {n}\n" for stack, n in sorted(stacks.items())))
+        print(f"Slow request {route} ({(end - start) * 1000:.0f} ms): profile -> {path}")
+        return path
+
+
+def profiler_from_env() -> Optional[SlowRequestDumper]:
+    """SlowRequestDumper for the calling (event-loop) thread when PROFILE_SLOW_MS is set."""
+    threshold_ms = os.getenv("PROFILE_SLOW_MS")
+    if not threshold_ms:
+        return None
+    interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+    profiler = SamplingProfiler(threading.get_ident(), interval)
+    profiler.start()
+    directory = Path(os.getenv("PROFILE_DIR", Path(__file__).resolve().parent / "profiles"))
+    return SlowRequestDumper(profiler, float(threshold_ms) / 1000, directory)
+
+
+# --- ASGI middleware ---
+
+class MetricsMiddleware:
+    """Per-route latency histogram for HTTP requests (WebSockets and lifespan pass through)."""
+
+    def __init__(self, app, registry: Registry = registry,
+                 on_request: Optional[Callable[[str, float, float], Any]] = None):
+        self.app = app
+        self.registry = registry
+        self.on_request = on_request
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.perf_counter()
+            # The router writes the matched route into the shared scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.observe("http_request_duration_seconds",
+                                  (("method", scope["method"]), ("route", route), ("status", status[0])),
+                                  end - start)
+            if self.on_request is not None:
+                self.on_request(route, start, end)
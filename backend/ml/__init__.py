@@ -0,0 +1,37 @@
+"""
+Model training artifacts and online scoring.
+
+    artifacts   save / load versioned fitted models with their feature list
+    dataset     validated, memory-mapped columnar training data with partitions
+    evaluation  parallel, cached hold-out + CV scoring and hyperparameter search
+    scoring     turn feature-matrix rows into qualification probabilities
+
+The names below are imported from their submodule on first access, so
+`python -m ml.dataset` runs the module once (not also as `ml.dataset`) and
+`from ml import Scorer` does not load the evaluation code.
+"""
+import importlib
+
+_EXPORTS = {
+    "ml.artifacts": ["Artifact", "artifact_dir", "list_artifacts", "load_artifact", "load_best", "save_artifact"],
+    "ml.dataset": ["Dataset", "SchemaError", "append_partition", "feature_key", "load_dataset",
+                   "normalize_column"],
+    "ml.evaluation": ["Candidate", "Results", "evaluate", "search_space", "top_features", "write_results"],
+    "ml.scoring": ["MIN_FEATURE_COVERAGE", "Scorer"],
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+
+def __getattr__(name: str):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
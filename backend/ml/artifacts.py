@@ -0,0 +1,108 @@
+"""
+Versioned model artifacts on disk.
+
+    artifacts/<name>/<version>/model.joblib   fitted estimator or pipeline
+    artifacts/<name>/<version>/meta.json      features, metrics, data hash
+
+Versions are `<UTC timestamp>-<data hash>`, so they sort by training time
+and two runs on the same data are easy to spot.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_ARTIFACT_DIR = Path(__file__).resolve().parent.parent / "artifacts"
+# Metric used to pick the served model among the latest version of each
+SELECTION_METRIC = "cv_mean_roc_auc"
+
+
+def artifact_dir() -> Path:
+    """MODEL_ARTIFACT_DIR, read on each call so a .env loaded after import applies."""
+    return Path(os.getenv("MODEL_ARTIFACT_DIR", DEFAULT_ARTIFACT_DIR))
+
+
+class Artifact(NamedTuple):
+    name: str
+    version: str
+    model: Any
+    features: List[str]
+    metrics: Dict[str, float]
+    data_hash: str
+    trained_at: str
+    path: Path
+
+    @property
+    def model_version(self) -> str:
+        return f"{self.name}@{self.version}"
+
+
+def data_hash(X: np.ndarray, y: Optional[np.ndarray] = None, features: Sequence[str] = ()) -> str:
+    """Content hash of the training data (values, labels and column names)."""
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(X, dtype=float).tobytes())
+    if y is not None:
+        h.update(np.ascontiguousarray(y).tobytes())
+    h.update("\x1f".join(features).encode())
+    return h.hexdigest()
+
+
+def save_artifact(model: Any, name: str, features: Sequence[str], metrics: Optional[Dict[str, float]] = None,
+                  data_hash: str = "", directory: Optional[Path] = None) -> Artifact:
+    import joblib
+
+    version = time.strftime("%Y%m%d%H%M%S", time.gmtime()) + (f"-{data_hash[:8]}" if data_hash else "")
+    path = Path(directory or artifact_dir()) / name / version
+    path.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, path / "model.joblib")
+    meta = {
+        "name": name,
+        "version": version,
+        "features": list(features),
+        "metrics": {k: float(v) for k, v in (metrics or {}).items()},
+        "data_hash": data_hash,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    (path / "meta.json").write_text(json.dumps(meta, indent=2))
+    return Artifact(name, version, model, meta["features"], meta["metrics"], data_hash, meta["trained_at"], path)
+
+
+def list_artifacts(directory: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Metadata of every saved artifact, oldest first."""
+    metas = []
+    for meta_path in sorted(Path(directory or artifact_dir()).glob("*/*/meta.json")):
+        meta = json.loads(meta_path.read_text())
+        meta["path"] = str(meta_path.parent)
+        metas.append(meta)
+    return sorted(metas, key=lambda m: (m["name"], m["version"]))
+
+
+def load_artifact(name: str, version: Optional[str] = None, directory: Optional[Path] = None) -> Artifact:
+    """Load one artifact; the latest version of `name` when `version` is None."""
+    import joblib
+
+    versions = [m for m in list_artifacts(directory) if m["name"] == name]
+    if version is not None:
+        versions = [m for m in versions if m["version"] == version]
+    if not versions:
+        raise FileNotFoundError(f"No artifact {name}{'@' + version if version else ''} "
+                                f"in {directory or artifact_dir()}")
+    meta = versions[-1]
+    path = Path(meta["path"])
+    return Artifact(meta["name"], meta["version"], joblib.load(path / "model.joblib"), meta["features"],
+                    meta["metrics"], meta["data_hash"], meta["trained_at"], path)
+
+
+def load_best(metric: str = SELECTION_METRIC, directory: Optional[Path] = None) -> Optional[Artifact]:
+    """Latest version of each model, then the one with the highest `metric`."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for meta in list_artifacts(directory):
+        latest[meta["name"]] = meta
+    if not latest:
+        return None
+    best = max(latest.values(), key=lambda m: m["metrics"].get(metric, float("-inf")))
+    return load_artifact(best["name"], best["version"], directory)
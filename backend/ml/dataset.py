@@ -0,0 +1,289 @@
+"""
+Columnar training dataset: validated once, stored as memory-mappable .npy.
+
+    datasets/<name>/manifest.json             schema, partitions, content hash
+    datasets/<name>/<partition>/features.npy  float64 (rows, features), NaN = missing
+    datasets/<name>/<partition>/label.npy     int8, -1 = unlabelled (e.g. upcoming qualifiers)
+    datasets/<name>/<partition>/keys.json     team per row
+    datasets/<name>/<partition>/seasons.json  tournament per row, e.g. "wc-2022"
+
+The CSV export is parsed and checked once at build time: column names are
+normalized (`PSxG/SoT` -> `psxg_per_sot`), values that are not numbers are
+reported instead of silently becoming 0, and the schema must match earlier
+partitions. A new tournament is appended as its own partition; existing
+files are never rewritten. Loading maps the arrays (`mmap_mode="r"`).
+
+Each row records its tournament: the CSV's `season` column when it has one
+(an export can stack several tournaments), else the partition's `season`,
+else the partition name. Tournament keys match odds_scraper.SOURCES.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_DATASET_DIR = Path(__file__).resolve().parent.parent / "datasets"
+DEFAULT_NAME = "qualify"
+KEY_COLUMN = "team"
+LABEL_COLUMN = "Qualify"
+SEASON_COLUMN = "season"
+# Not features: the key, the label, the tournament and a sheet artefact (a string of numbers)
+IGNORED_COLUMNS = {KEY_COLUMN, LABEL_COLUMN, SEASON_COLUMN, "# Pl"}
+
+_SYMBOLS = [("+/-", "_plus_minus_"), ("%", "_pct_"), ("/", "_per_"), (">", "_gt"), ("<", "_lt"),
+            ("#", "n_"), ("+", "_plus_")]
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+class SchemaError(ValueError):
+    """The CSV does not match the dataset schema, or holds values that are not numbers."""
+
+
+def normalize_column(name: str) -> str:
+    """Sheet header -> snake_case identifier ('PSxG/SoT' -> 'psxg_per_sot', 'Cmp%' -> 'cmp_pct')."""
+    text = name.strip().lower()
+    for symbol, word in _SYMBOLS:
+        text = text.replace(symbol, word)
+    return _NON_WORD.sub("_", text).strip("_")
+
+
+def feature_key(name: str) -> str:
+    """
+    Matching key for a feature name in any spelling: 'PSxG/SoT',
+    'psxg_per_sot' and 'PSxG per SoT' all give 'psxgpersot'.
+    """
+    return normalize_column(name).replace("_", "")
+
+
+def parse_number(text: str) -> float:
+    """'1,234' / '54.2%' / '' -> float (NaN for blank); raises ValueError otherwise."""
+    text = text.strip().replace(",", "").rstrip("%")
+    if not text:
+        return math.nan
+    return float(text)
+
+
+class Dataset(NamedTuple):
+    name: str
+    features: List[str]             # normalized names, column order of X
+    sources: List[str]              # original CSV headers, same order
+    X: np.ndarray                   # (rows, features) float64; memory-mapped for one partition
+    y: np.ndarray                   # (rows,) int8, -1 where unlabelled
+    keys: List[str]
+    partitions: List[str]
+    content_hash: str
+    seasons: List[str]              # tournament per row, same order as keys
+
+    def labelled(self) -> "Dataset":
+        """Rows with a label (training)."""
+        mask = self.y >= 0
+        if mask.all():
+            return self
+        return self._replace(X=self.X[mask], y=self.y[mask], keys=[k for k, m in zip(self.keys, mask) if m],
+                             seasons=[s for s, m in zip(self.seasons, mask) if m])
+
+    def frame(self):
+        """X as a pandas DataFrame with the normalized feature names (no copy)."""
+        import pandas as pd
+        return pd.DataFrame(self.X, columns=self.features, copy=False)
+
+
+# --- Build ---
+
+def read_csv(path: Path, schema: Optional[List[Dict[str, str]]] = None, season: Optional[str] = None
+             ) -> Tuple[List[Dict[str, str]], np.ndarray, np.ndarray, List[str], List[str]]:
+    """
+    Parse and validate a CSV export. Returns (schema, X, y, keys, seasons);
+    rows without a `season` value get `season`. With an existing `schema`,
+    columns must be a subset of it (missing ones are NaN).
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [r for r in reader if any(c.strip() for c in r)]
+    if KEY_COLUMN not in header:
+        raise SchemaError(f"{path}: no '{KEY_COLUMN}' column")
+
+    sources = [c for c in header if c not in IGNORED_COLUMNS]
+    names = [normalize_column(c) for c in sources]
+    clashes = {n for n in names if names.count(n) > 1}
+    if clashes:
+        raise SchemaError(f"{path}: columns normalize to the same name: "
+                          + ", ".join(f"{c!r}" for c, n in zip(sources, names) if n in clashes))
+    if schema is None:
+        schema = [{"name": n, "source": s, "dtype": "float64"} for n, s in zip(names, sources)]
+    known = {c["name"] for c in schema}
+    unknown = [s for n, s in zip(names, sources) if n not in known]
+    if unknown:
+        raise SchemaError(f"{path}: columns not in the dataset schema: {', '.join(unknown)}")
+
+    position = {n: header.index(s) for n, s in zip(names, sources)}
+    X = np.full((len(rows), len(schema)), np.nan)
+    # An unquoted "1,234" shifts every later cell of its row
+    errors = [f"row {r + 2}: {len(row)} cells, header has {len(header)}"
+              for r, row in enumerate(rows) if len(row) != len(header)]
+    for j, column in enumerate(schema):
+        i = position.get(column["name"])
+        if i is None:
+            continue
+        for r, row in enumerate(rows):
+            try:
+                X[r, j] = parse_number(row[i] if i < len(row) else "")
+            except ValueError:
+                errors.append(f"row {r + 2} {column['source']!r}: {row[i]!r}")
+
+    y = np.full(len(rows), -1, dtype=np.int8)
+    if LABEL_COLUMN in header:
+        i = header.index(LABEL_COLUMN)
+        for r, row in enumerate(rows):
+            value = row[i].strip() if i < len(row) else ""
+            if value in ("0", "1"):
+                y[r] = int(value)
+            elif value:
+                errors.append(f"row {r + 2} {LABEL_COLUMN!r}: {value!r} (expected 0, 1 or blank)")
+    if errors:
+        shown = "; ".join(errors[:20]) + (f"; ... {len(errors) - 20} more" if len(errors) > 20 else "")
+        raise SchemaError(f"{path}: {len(errors)} invalid values: {shown}")
+
+    seasons = [season] * len(rows)
+    if SEASON_COLUMN in header:
+        i = header.index(SEASON_COLUMN)
+        seasons = [(row[i].strip() if i < len(row) else "") or season for row in rows]
+    unknown_season = [r + 2 for r, s in enumerate(seasons) if not s]
+    if unknown_season:
+        raise SchemaError(f"{path}: no {SEASON_COLUMN!r} for rows "
+                          f"{', '.join(map(str, unknown_season[:20]))} (add the column or pass a season)")
+
+    keys = [row[header.index(KEY_COLUMN)].strip() for row in rows]
+    missing = [c["source"] for c in schema if c["name"] not in position]
+    if missing:
+        print(f"{path}: {len(missing)} schema columns absent, stored as missing: {', '.join(missing)}")
+    return schema, X, y, keys, seasons
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _content_hash(schema: List[Dict[str, str]], partitions: List[Dict[str, Any]]) -> str:
+    h = hashlib.sha256(json.dumps(schema, sort_keys=True).encode())
+    for p in partitions:
+        h.update(json.dumps([p["name"], p["files"]], sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def dataset_dir() -> Path:
+    """DATASET_DIR, or backend/datasets; looked up per call like the other ml paths."""
+    return Path(os.getenv("DATASET_DIR", DEFAULT_DATASET_DIR))
+
+
+def read_manifest(name: str = DEFAULT_NAME, directory: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    path = Path(directory or dataset_dir()) / name / "manifest.json"
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def append_partition(csv_path: Path, partition: str, name: str = DEFAULT_NAME,
+                     directory: Optional[Path] = None, replace: bool = False,
+                     season: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Validate `csv_path` and add it to dataset `name` as `partition`. Rows
+    without a `season` column value belong to `season` (default: the
+    partition name). Returns the new manifest.
+    """
+    if not re.fullmatch(r"[A-Za-z0-9_.-]+", partition):
+        raise ValueError(f"Invalid partition name: {partition!r}")
+    directory = Path(directory or dataset_dir())
+    root = directory / name
+    manifest = read_manifest(name, directory) or {"name": name, "schema": None, "partitions": []}
+    if any(p["name"] == partition for p in manifest["partitions"]) and not replace:
+        raise ValueError(f"Partition {partition!r} already exists in {name} (pass replace=True)")
+
+    schema, X, y, keys, seasons = read_csv(Path(csv_path), manifest["schema"], season or partition)
+    part_dir = root / partition
+    part_dir.mkdir(parents=True, exist_ok=True)
+    # Column-major so a feature is one contiguous slice of the mapped file
+    np.save(part_dir / "features.npy", np.asfortranarray(X))
+    np.save(part_dir / "label.npy", y)
+    (part_dir / "keys.json").write_text(json.dumps(keys))
+    (part_dir / "seasons.json").write_text(json.dumps(seasons))
+
+    files = {f: _sha256(part_dir / f) for f in ("features.npy", "label.npy", "keys.json", "seasons.json")}
+    entry = {"name": partition, "rows": len(keys), "labelled": int((y >= 0).sum()),
+             "seasons": {s: seasons.count(s) for s in dict.fromkeys(seasons)},
+             "source": Path(csv_path).name, "files": files}
+    partitions = [p for p in manifest["partitions"] if p["name"] != partition] + [entry]
+    manifest = {"name": name, "schema": schema, "key": KEY_COLUMN, "label": LABEL_COLUMN,
+                "partitions": partitions, "content_hash": _content_hash(schema, partitions)}
+    tmp = root / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(root / "manifest.json")
+    return manifest
+
+
+# --- Load ---
+
+def load_dataset(name: str = DEFAULT_NAME, directory: Optional[Path] = None,
+                 partitions: Optional[Sequence[str]] = None, verify: bool = False) -> Dataset:
+    """
+    Memory-map the dataset's arrays. With one partition X is the mapped file
+    itself; several are concatenated. `verify` re-hashes the files.
+    """
+    directory = Path(directory or dataset_dir())
+    manifest = read_manifest(name, directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No dataset {name} in {directory}")
+    root = directory / name
+    parts = [p for p in manifest["partitions"] if partitions is None or p["name"] in partitions]
+    if not parts:
+        raise ValueError(f"No partitions selected from {name}")
+    if verify:
+        for p in parts:
+            for f, digest in p["files"].items():
+                if _sha256(root / p["name"] / f) != digest:
+                    raise SchemaError(f"{name}/{p['name']}/{f} does not match its manifest hash")
+
+    Xs = [np.load(root / p["name"] / "features.npy", mmap_mode="r") for p in parts]
+    ys = [np.load(root / p["name"] / "label.npy", mmap_mode="r") for p in parts]
+    keys = [k for p in parts for k in json.loads((root / p["name"] / "keys.json").read_text())]
+    seasons = [s for p in parts for s in _read_seasons(root / p["name"], p)]
+    schema = manifest["schema"]
+    return Dataset(name, [c["name"] for c in schema], [c["source"] for c in schema],
+                   Xs[0] if len(Xs) == 1 else np.concatenate(Xs),
+                   ys[0] if len(ys) == 1 else np.concatenate(ys),
+                   keys, [p["name"] for p in parts], manifest["content_hash"], seasons)
+
+
+def _read_seasons(part_dir: Path, partition: Dict[str, Any]) -> List[str]:
+    # Partitions built before seasons were recorded are one tournament each
+    path = part_dir / "seasons.json"
+    if not path.exists():
+        return [partition["name"]] * partition["rows"]
+    return json.loads(path.read_text())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Build the columnar training dataset")
+    parser.add_argument("csv", type=Path)
+    parser.add_argument("--partition", required=True, help="e.g. wc-euro-2016-2024, wc-2026-quals")
+    parser.add_argument("--season", help="tournament of rows without a 'season' column value, e.g. euro-2020 "
+                                         "(default: the partition name)")
+    parser.add_argument("--name", default=DEFAULT_NAME)
+    parser.add_argument("--replace", action="store_true", help="overwrite an existing partition")
+    args = parser.parse_args(argv)
+    manifest = append_partition(args.csv, args.partition, args.name, replace=args.replace, season=args.season)
+    rows = sum(p["rows"] for p in manifest["partitions"])
+    print(f"{args.name}: {len(manifest['partitions'])} partitions, {rows} rows, "
+          f"{len(manifest['schema'])} features, content hash {manifest['content_hash'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
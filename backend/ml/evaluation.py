@@ -0,0 +1,235 @@
+"""
+Parallel, cached model evaluation.
+
+Every (model, parameters) candidate is scored on the same hold-out split and
+the same stratified CV folds. Each fit is an independent job run across
+processes with joblib, and its result (fitted estimator plus test-fold
+predictions) is cached on disk under a key made of the data hash, the
+candidate and the fold, so re-running with one more candidate only fits
+the new one.
+
+    results = evaluate(X, y, search_space(), search="grid")
+    results.table        one row per candidate, best CV ROC-AUC first
+    results.best_model   hold-out fit of the winner
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ml.artifacts import SELECTION_METRIC, artifact_dir, data_hash
+
+HOLDOUT = "holdout"
+
+
+def fold_cache_dir() -> Path:
+    """MODEL_CACHE_DIR (default: .folds under the artifact directory), read on each call."""
+    return Path(os.getenv("MODEL_CACHE_DIR", artifact_dir() / ".folds"))
+
+
+class Candidate(NamedTuple):
+    name: str
+    params: Dict[str, Any]
+
+    @property
+    def label(self) -> str:
+        return self.name + (json.dumps(self.params, sort_keys=True, default=str) if self.params else "")
+
+
+class FoldResult(NamedTuple):
+    model: Any
+    pred: np.ndarray
+    proba: np.ndarray
+    seconds: float
+
+
+class Results(NamedTuple):
+    table: Any                    # pandas.DataFrame indexed by candidate label
+    models: Dict[str, Any]        # label -> estimator fitted on the training split
+    best: Candidate
+
+    @property
+    def best_model(self) -> Any:
+        return self.models[self.best.label]
+
+
+def _logistic_regression(**params):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    return Pipeline([("scaler", StandardScaler()), ("clf", LogisticRegression(max_iter=2000, **params))])
+
+
+def _random_forest(**params):
+    from sklearn.ensemble import RandomForestClassifier
+    # One core per job: parallelism comes from running folds side by side
+    return RandomForestClassifier(random_state=42, n_jobs=1, **{"n_estimators": 300, **params})
+
+
+def _gradient_boosting(**params):
+    from sklearn.ensemble import GradientBoostingClassifier
+    return GradientBoostingClassifier(random_state=42, **params)
+
+
+ESTIMATORS: Dict[str, Callable[..., Any]] = {
+    "LogisticRegression": _logistic_regression,
+    "RandomForest": _random_forest,
+    "GradientBoosting": _gradient_boosting,
+}
+
+
+def search_space() -> Dict[str, Dict[str, List[Any]]]:
+    """Default hyperparameter grid per model (LogisticRegression params go to the classifier step)."""
+    return {
+        "LogisticRegression": {"C": [0.01, 0.1, 1.0, 10.0]},
+        "RandomForest": {"max_depth": [None, 4, 8], "min_samples_leaf": [1, 3]},
+        "GradientBoosting": {"n_estimators": [100, 300], "max_depth": [2, 3], "learning_rate": [0.05, 0.1]},
+    }
+
+
+def candidates(space: Dict[str, Dict[str, List[Any]]], search: str = "grid",
+               n_iter: int = 10, seed: int = 42) -> List[Candidate]:
+    """Expand a search space into candidates: every combination, or `n_iter` random draws per model."""
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+    if search not in ("grid", "random"):
+        raise ValueError(f"Unknown search: {search}")
+    out = []
+    for name, grid in space.items():
+        if name not in ESTIMATORS:
+            raise ValueError(f"Unknown model: {name}")
+        if search == "grid":
+            params = list(ParameterGrid(grid))
+        else:
+            size = len(ParameterGrid(grid))
+            params = list(ParameterSampler(grid, n_iter=min(n_iter, size), random_state=seed))
+        out.extend(Candidate(name, p) for p in params)
+    return out
+
+
+def splits(y: np.ndarray, cv: int = 5, test_size: float = 0.3,
+           seed: int = 42) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """The hold-out split followed by the CV folds, as (fold, train indices, test indices)."""
+    from sklearn.model_selection import StratifiedKFold, train_test_split
+
+    index = np.arange(len(y))
+    train, test = train_test_split(index, test_size=test_size, random_state=seed, stratify=y)
+    folds = [(HOLDOUT, train, test)]
+    # Same folds as cross_val_score(cv=5) for a classifier: stratified, unshuffled
+    folds += [(f"cv{i}", tr, te) for i, (tr, te) in enumerate(StratifiedKFold(cv).split(index, y))]
+    return folds
+
+
+def _cache_path(cache_dir: Path, fingerprint: str, candidate: Candidate, fold: str,
+                train: np.ndarray) -> Path:
+    key = hashlib.sha256("\x1f".join(
+        [fingerprint, candidate.label, fold, hashlib.sha256(train.tobytes()).hexdigest()]).encode())
+    return cache_dir / f"{candidate.name}-{fold}-{key.hexdigest()[:20]}.joblib"
+
+
+def fit_fold(candidate: Candidate, X, y, train: np.ndarray, test: np.ndarray,
+             path: Optional[Path] = None) -> FoldResult:
+    """Fit one candidate on one fold, reusing the cached result at `path` when there is one."""
+    import joblib
+
+    if path is not None and path.exists():
+        try:
+            return FoldResult(*joblib.load(path))
+        except Exception as e:
+            print(f"Ignoring unreadable fold cache {path.name}: {e}")
+    start = time.perf_counter()
+    model = ESTIMATORS[candidate.name](**candidate.params)
+    model.fit(X.iloc[train], y.iloc[train])
+    X_test = X.iloc[test]
+    result = FoldResult(model, model.predict(X_test), model.predict_proba(X_test)[:, 1],
+                        time.perf_counter() - start)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        joblib.dump(tuple(result), tmp)
+        tmp.replace(path)
+    return result
+
+
+def evaluate(X, y, space: Dict[str, Dict[str, List[Any]]], *, search: str = "grid", n_iter: int = 10,
+             cv: int = 5, test_size: float = 0.3, seed: int = 42, n_jobs: int = -1,
+             cache_dir: Optional[Path] = None, cache: bool = True,
+             metric: str = SELECTION_METRIC) -> Results:
+    """
+    Score every candidate on the hold-out split and `cv` folds, in parallel
+    across processes. Fits are cached under `cache_dir` (default
+    fold_cache_dir()) unless `cache` is False.
+    """
+    import pandas as pd
+    from joblib import Parallel, delayed
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    cands = candidates(space, search, n_iter, seed)
+    folds = splits(y.to_numpy(), cv, test_size, seed)
+    fingerprint = data_hash(X.to_numpy(), y.to_numpy(), list(X.columns))
+    jobs = [(c, fold, train, test) for c in cands for fold, train, test in folds]
+    cache_dir = Path(cache_dir or fold_cache_dir()) if cache else None
+
+    start = time.perf_counter()
+    fitted = Parallel(n_jobs=n_jobs)(
+        delayed(fit_fold)(c, X, y, train, test,
+                          _cache_path(cache_dir, fingerprint, c, fold, train) if cache_dir else None)
+        for c, fold, train, test in jobs)
+    print(f"Evaluated {len(cands)} candidates x {len(folds)} folds in {time.perf_counter() - start:.1f}s")
+
+    by_candidate: Dict[str, Dict[str, Tuple[FoldResult, np.ndarray]]] = {}
+    for (c, fold, _, test), result in zip(jobs, fitted):
+        by_candidate.setdefault(c.label, {})[fold] = (result, test)
+
+    rows, models = [], {}
+    for c in cands:
+        results = by_candidate[c.label]
+        holdout, test = results[HOLDOUT]
+        y_test = y.iloc[test]
+        cv_scores = np.array([roc_auc_score(y.iloc[te], r.proba)
+                              for fold, (r, te) in results.items() if fold != HOLDOUT])
+        models[c.label] = holdout.model
+        rows.append({
+            "candidate": c.label,
+            "model": c.name,
+            "params": json.dumps(c.params, sort_keys=True, default=str),
+            "test_accuracy": accuracy_score(y_test, holdout.pred),
+            "test_roc_auc": roc_auc_score(y_test, holdout.proba),
+            "cv_mean_roc_auc": cv_scores.mean(),
+            "cv_std_roc_auc": cv_scores.std(),
+            "fit_seconds": sum(r.seconds for r, _ in results.values()),
+        })
+
+    table = pd.DataFrame(rows).set_index("candidate").sort_values(metric, ascending=False, kind="stable")
+    best = next(c for c in cands if c.label == table.index[0])
+    return Results(table, models, best)
+
+
+def write_results(results: Results, directory: Optional[Path] = None) -> Path:
+    """Results table as CSV and JSON (one record per candidate) under `directory`."""
+    directory = Path(directory or artifact_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    results.table.to_csv(directory / "results.csv")
+    path = directory / "results.json"
+    path.write_text(results.table.reset_index().to_json(orient="records", indent=2))
+    return path
+
+
+def top_features(model: Any, features: Sequence[str], n: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    `top_features` rows ({feature_name, ranking}) from a fitted model's own
+    importances: `feature_importances_` for trees, |coef| for linear models.
+    """
+    estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+    if hasattr(estimator, "feature_importances_"):
+        scores = np.asarray(estimator.feature_importances_)
+    elif hasattr(estimator, "coef_"):
+        scores = np.abs(np.asarray(estimator.coef_)).reshape(-1, len(features)).max(axis=0)
+    else:
+        raise ValueError(f"{type(estimator).__name__} has no feature importances")
+    order = np.argsort(-scores, kind="stable")[:n]
+    return [{"feature_name": features[i], "ranking": rank} for rank, i in enumerate(order, start=1)]
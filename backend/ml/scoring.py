@@ -0,0 +1,90 @@
+"""
+Online scoring against the in-memory feature matrix.
+
+The model's training columns are mapped onto feature-matrix columns once.
+Probabilities for every team are then computed in one `predict_proba` call
+per matrix snapshot, so a request (one team or a batch) is an index lookup.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from feature_matrix import FeatureMatrix
+from ml.artifacts import Artifact
+from ml.dataset import feature_key
+
+# Below this share of (team, feature) values found in the stats tables, the
+# zeros standing in for the rest dominate and the probabilities mean little
+MIN_FEATURE_COVERAGE = 0.8
+
+
+def match_features(features: Sequence[str], columns: Sequence[str]) -> Dict[str, Optional[int]]:
+    """
+    Model feature -> feature-matrix column index (None when missing).
+    Exact column names win over normalized ones; earlier categories win ties.
+    """
+    exact: Dict[str, int] = {}
+    loose: Dict[str, int] = {}
+    for i, column in enumerate(columns):
+        name = column.split(".", 1)[-1]
+        exact.setdefault(name, i)
+        loose.setdefault(feature_key(name), i)
+    return {f: exact.get(f, loose.get(feature_key(f))) for f in features}
+
+
+class Scorer:
+    """Qualification probabilities from one artifact, cached per matrix snapshot."""
+
+    def __init__(self, artifact: Artifact):
+        self.artifact = artifact
+        classes = list(getattr(artifact.model, "classes_", [0, 1]))
+        self._positive = classes.index(1) if 1 in classes else len(classes) - 1
+        self._snapshot: Optional[FeatureMatrix] = None
+        self._probs = np.empty(0)
+        self.mapping: Dict[str, Optional[int]] = {}
+        self._coverage = 0.0
+
+    @property
+    def model_version(self) -> str:
+        return self.artifact.model_version
+
+    def design_matrix(self, matrix: FeatureMatrix) -> np.ndarray:
+        """Teams x model features, in training order. Missing values are 0, as in training."""
+        self.mapping = match_features(self.artifact.features, matrix.columns)
+        X = np.full((len(matrix.team_ids), len(self.artifact.features)), np.nan)
+        for j, feature in enumerate(self.artifact.features):
+            i = self.mapping[feature]
+            if i is not None:
+                X[:, j] = matrix.values[:, i]
+        self._coverage = float(np.mean(~np.isnan(X))) if X.size else 0.0
+        return np.nan_to_num(X, nan=0.0)
+
+    def _refresh(self, matrix: FeatureMatrix) -> None:
+        if matrix is not self._snapshot:
+            X = self.design_matrix(matrix)
+            if hasattr(self.artifact.model, "feature_names_in_"):
+                # Fitted on a DataFrame; pass the same column names back
+                import pandas as pd
+                X = pd.DataFrame(X, columns=self.artifact.model.feature_names_in_)
+            self._probs = self.artifact.model.predict_proba(X)[:, self._positive] if len(X) else np.empty(0)
+            self._snapshot = matrix
+
+    def predict(self, matrix: FeatureMatrix, team_ids: Sequence[int]) -> np.ndarray:
+        """Probabilities for `team_ids` (NaN for teams not in the matrix)."""
+        self._refresh(matrix)
+        rows = np.array([-1 if (i := matrix.row_index(t)) is None else i for t in team_ids], dtype=int)
+        out = self._probs[np.maximum(rows, 0)] if len(self._probs) else np.full(len(rows), np.nan)
+        return np.where(rows >= 0, out, np.nan)
+
+    def predict_all(self, matrix: FeatureMatrix) -> np.ndarray:
+        self._refresh(matrix)
+        return self._probs
+
+    def missing_features(self, matrix: FeatureMatrix) -> List[str]:
+        self._refresh(matrix)
+        return [f for f, i in self.mapping.items() if i is None]
+
+    def feature_coverage(self, matrix: FeatureMatrix) -> float:
+        """Share of the (team, feature) inputs the matrix has; the rest are scored as 0."""
+        self._refresh(matrix)
+        return self._coverage
@@ -0,0 +1,311 @@
+"""
+Historical odds scraper for sportsoddshistory.com group-stage pages.
+
+Pages for several competitions/seasons are fetched concurrently through one
+pooled `httpx.AsyncClient`, spaced by a shared rate limiter. Raw HTML is kept
+in an on-disk cache with its ETag / Last-Modified, so a re-run revalidates
+with conditional requests (a 304 costs no body) and `offline=True` parses
+straight from disk. Parsing stops at the one table that has the Team and
+odds-date columns instead of building a DataFrame for every table on the page.
+
+Scraped prices are history (backtest.py, model training) and go to their
+own table: the live `qualifying_odds` only holds the current tournament's
+prices, which the value-bet engine reads.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import httpx
+
+from repository import SupabaseRepository, chunked
+
+ODDS_TABLE = "historical_qualifying_odds"
+CONFLICT_KEY = "comp_id,season_id,team"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "odds"
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class OddsSource(NamedTuple):
+    key: str          # "<competition>-<season>", e.g. "euro-2024"
+    comp_id: int
+    season_id: int
+    url: str
+    column: str       # header text of the odds snapshot to keep, e.g. "Jun 14"
+
+
+SOURCES: Dict[str, OddsSource] = {s.key: s for s in [
+    OddsSource("euro-2024", 1, 2024,
+               "https://www.sportsoddshistory.com/soccer-uefa/?y=2024&sa=soccer&a=euro&b=two&o=r", "Jun 14"),
+    OddsSource("euro-2020", 1, 2020,
+               "https://www.sportsoddshistory.com/soccer-grpw/?y=2020&sa=soccer&a=euro&b=grpq&o=r", "Jun 11"),
+    OddsSource("wc-2022", 2, 2022,
+               "https://www.sportsoddshistory.com/soccer-grpw/?y=2022&sa=soccer&a=wc&b=grpq&o=r", "Nov 20"),
+]}
+
+
+def parse_sources(keys: Optional[str]) -> List[OddsSource]:
+    """Comma-separated source keys (all sources when empty)."""
+    if not keys:
+        return list(SOURCES.values())
+    unknown = [k for k in keys.split(",") if k.strip() not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown odds source(s): {', '.join(unknown)} (known: {', '.join(SOURCES)})")
+    return [SOURCES[k.strip()] for k in keys.split(",")]
+
+
+# --- Disk cache ---
+
+def cache_dir() -> Path:
+    """ODDS_CACHE_DIR, or .cache/odds next to this module."""
+    return Path(os.getenv("ODDS_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+class PageCache:
+    """`<sha1(url)>.html` plus `.json` validators (ETag, Last-Modified) per URL."""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory or cache_dir())
+
+    def _paths(self, url: str):
+        stem = self.directory / hashlib.sha1(url.encode()).hexdigest()
+        return stem.with_suffix(".html"), stem.with_suffix(".json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        html_path, meta_path = self._paths(url)
+        if not html_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        return dict(meta, html=html_path.read_text(encoding="utf-8"))
+
+    def put(self, url: str, html: str, headers: httpx.Headers) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        html_path, meta_path = self._paths(url)
+        html_path.write_text(html, encoding="utf-8")
+        self.touch(url, {"url": url, "etag": headers.get("etag"),
+                         "last_modified": headers.get("last-modified")})
+
+    def touch(self, url: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        _, meta_path = self._paths(url)
+        current = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        meta_path.write_text(json.dumps(dict(current, **(meta or {}), fetched_at=time.time())))
+
+
+# --- Fetching ---
+
+class RateLimiter:
+    """At most `rate` request starts per second, shared by all workers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def fetch_page(client: httpx.AsyncClient, limiter: RateLimiter, cache: PageCache, url: str, *,
+                     max_age: float = 0.0, max_retries: int = 3) -> str:
+    """
+    HTML for `url`: from cache when younger than `max_age` seconds, otherwise
+    revalidated with If-None-Match / If-Modified-Since (retrying 429/5xx and
+    network errors with jittered exponential backoff).
+    """
+    cached = cache.get(url)
+    if cached and time.time() - cached.get("fetched_at", 0) < max_age:
+        return cached["html"]
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    for attempt in range(1, max_retries + 1):
+        await limiter.wait()
+        try:
+            resp = await client.get(url, headers=headers)
+            if resp.status_code == 304 and cached:
+                cache.touch(url)
+                return cached["html"]
+            if resp.status_code == 200:
+                cache.put(url, resp.text, resp.headers)
+                return resp.text
+            print(f"[{url}] attempt {attempt}: HTTP {resp.status_code}")
+            if resp.status_code not in (429, 500, 502, 503, 504):
+                break
+        except httpx.HTTPError as e:
+            print(f"[{url}] attempt {attempt}: {e!r}")
+        if attempt < max_retries:
+            await asyncio.sleep(2 ** (attempt - 1) + random.random())
+
+    if cached:
+        print(f"[{url}] serving stale cached copy")
+        return cached["html"]
+    raise RuntimeError(f"Failed to fetch {url} after {max_retries} attempts")
+
+
+async def fetch_all(urls: Sequence[str], *, cache: Optional[PageCache] = None, concurrency: int = 4,
+                    rate: float = 2.0, max_age: float = 0.0, offline: bool = False,
+                    transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict[str, str]:
+    """{url: html} for every URL, fetched concurrently (or read from cache only when `offline`)."""
+    cache = cache or PageCache()
+    if offline:
+        pages = {url: cache.get(url) for url in urls}
+        missing = [url for url, page in pages.items() if page is None]
+        if missing:
+            raise RuntimeError(f"Not cached (run online once): {', '.join(missing)}")
+        return {url: page["html"] for url, page in pages.items()}
+
+    limiter = RateLimiter(rate)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=HEADERS, limits=limits, timeout=15.0, follow_redirects=True,
+                                 transport=transport) as client:
+        pages = await asyncio.gather(*(fetch_page(client, limiter, cache, url, max_age=max_age)
+                                       for url in urls))
+    return dict(zip(urls, pages))
+
+
+# --- Parsing ---
+
+class _StopParsing(Exception):
+    pass
+
+
+class _Table:
+    __slots__ = ("rows", "row", "cell", "span")
+
+    def __init__(self):
+        self.rows: List[List[str]] = []
+        self.row: Optional[List[str]] = None
+        self.cell: Optional[List[str]] = None
+        self.span = 1
+
+
+class _OddsTableParser(HTMLParser):
+    """
+    Collects the rows of each <table> (innermost first when nested) and stops
+    at the first one whose header has every label.
+    """
+
+    def __init__(self, labels: Sequence[str]):
+        super().__init__(convert_charrefs=True)
+        self.labels = labels
+        self.stack: List[_Table] = []
+        self.table: Optional[List[List[str]]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self.stack.append(_Table())
+        elif not self.stack:
+            return
+        elif tag == "tr":
+            self.stack[-1].row = []
+        elif tag in ("td", "th") and self.stack[-1].row is not None:
+            span = dict(attrs).get("colspan") or "1"
+            self.stack[-1].cell = []
+            self.stack[-1].span = int(span) if span.isdigit() else 1
+
+    def handle_endtag(self, tag):
+        if not self.stack:
+            return
+        t = self.stack[-1]
+        if tag in ("td", "th") and t.cell is not None:
+            t.row.extend([" ".join("".join(t.cell).split())] * t.span)
+            t.cell = None
+        elif tag == "tr" and t.row is not None:
+            t.rows.append(t.row)
+            t.row = None
+        elif tag == "table":
+            self.stack.pop()
+            header = " ".join(c for row in t.rows[:3] for c in row)
+            if all(label in header for label in self.labels):
+                self.table = t.rows
+                raise _StopParsing
+
+    def handle_data(self, data):
+        if self.stack and self.stack[-1].cell is not None:
+            self.stack[-1].cell.append(data)
+
+
+def clean_odds(text: str) -> Optional[float]:
+    """'+1,200*' -> 1200.0; None for blanks and dashes."""
+    text = text.replace(",", "").replace("*", "").strip()
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_odds(html: str, column: str, team_label: str = "Team") -> List[Dict[str, Any]]:
+    """[{team, odds}] from the first table whose header has `team_label` and `column`."""
+    parser = _OddsTableParser([team_label, column])
+    try:
+        parser.feed(html)
+        parser.close()
+    except _StopParsing:
+        pass
+    if parser.table is None:
+        raise ValueError(f"No table with '{team_label}' and '{column}' columns")
+
+    rows = parser.table
+    header_at = next(i for i, row in enumerate(rows) if any(column in c for c in row))
+    header = rows[header_at]
+    team_i = next((i for i, c in enumerate(header) if team_label in c), None)
+    if team_i is None:
+        team_i = next(i for row in rows[:header_at] for i, c in enumerate(row) if team_label in c)
+    odds_i = next(i for i, c in enumerate(header) if column in c)
+
+    out = []
+    for row in rows[header_at + 1:]:
+        if len(row) <= max(team_i, odds_i) or not row[team_i]:
+            continue
+        odds = clean_odds(row[odds_i])
+        if odds is not None:
+            out.append({"team": row[team_i], "odds": odds})
+    return out
+
+
+# --- Pipeline ---
+
+async def scrape(sources: Iterable[OddsSource], **fetch_options) -> List[Dict[str, Any]]:
+    """`historical_qualifying_odds` rows ({team, odds, comp_id, season_id}) for every source."""
+    sources = list(sources)
+    pages = await fetch_all([s.url for s in sources], **fetch_options)
+    rows = []
+    for source in sources:
+        parsed = parse_odds(pages[source.url], source.column)
+        print(f"{source.key}: {len(parsed)} teams ({source.column})")
+        rows.extend(dict(r, comp_id=source.comp_id, season_id=source.season_id) for r in parsed)
+    return rows
+
+
+async def write_odds(repo: SupabaseRepository, rows: List[Dict[str, Any]], *,
+                     table: str = ODDS_TABLE, batch_size: int = 500) -> List[Dict[str, Any]]:
+    """Bulk upsert on (comp_id, season_id, team); returns the stored rows (with ids)."""
+    # A page can list a team twice (e.g. a footnote row); keep the last price
+    unique = list({(r["comp_id"], r["season_id"], r["team"]): r for r in rows}.values())
+    written = []
+    for batch in chunked(unique, batch_size):
+        written.extend(await repo.upsert(table, batch, on_conflict=CONFLICT_KEY, returning=True))
+    return written
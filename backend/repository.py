@@ -0,0 +1,210 @@
+"""
+Async data-access layer over Supabase's PostgREST API.
+
+Pooled `httpx.AsyncClient`s are shared by every request, so connections are
+kept alive between calls instead of blocking a threadpool worker per query.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+# (operator, value) pairs, e.g. {"team_id": ("in", [1, 2]), "status": ("eq", "live")}
+Filter = Tuple[str, Any]
+Filters = Dict[str, Union[Filter, List[Filter]]]
+# (column, operator, value) alternatives, OR-ed together
+AnyOf = List[Tuple[str, str, Any]]
+# Called after every request: (table or "rpc/<fn>", HTTP method, seconds,
+# status code or 0 if it raised, rows returned, response bytes)
+Observer = Callable[[str, str, float, int, int, int], None]
+
+_OPERATORS = {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is", "in"}
+
+
+class RepositoryError(Exception):
+    """Raised when PostgREST answers with a non-2xx status."""
+
+    def __init__(self, table: str, status_code: int, message: str):
+        super().__init__(f"{table}: HTTP {status_code}: {message}")
+        self.table = table
+        self.status_code = status_code
+
+
+def _quote(value: Any) -> str:
+    # PostgREST needs strings containing reserved characters double-quoted
+    # inside in.(...) lists, e.g. in.("Costa Rica","Korea Republic").
+    text = str(value)
+    if any(ch in text for ch in ',.:()" '):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+def encode_filter(op: str, value: Any) -> str:
+    if op not in _OPERATORS:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    if op == "in":
+        return "in.(" + ",".join(_quote(v) for v in value) + ")"
+    if op == "is":
+        return f"is.{'null' if value is None else str(value).lower()}"
+    return f"{op}.{value}"
+
+
+def build_params(columns: str = "*", filters: Optional[Filters] = None,
+                 order: Optional[str] = None, desc: bool = False,
+                 limit: Optional[int] = None,
+                 any_of: Optional[AnyOf] = None) -> List[Tuple[str, str]]:
+    params = [("select", columns)]
+    for column, spec in (filters or {}).items():
+        for op, value in (spec if isinstance(spec, list) else [spec]):
+            params.append((column, encode_filter(op, value)))
+    if any_of:
+        params.append(("or", "(" + ",".join(
+            f"{_quote(column)}.{encode_filter(op, value)}" for column, op, value in any_of) + ")"))
+    if order:
+        params.append(("order", f"{order}.{'desc' if desc else 'asc'}"))
+    if limit is not None:
+        params.append(("limit", str(limit)))
+    return params
+
+
+class SupabaseRepository:
+    """Thin async client for the Supabase REST endpoint (`/rest/v1`) and the Auth user lookup."""
+
+    # httpcore rescans its whole pool (quadratically) every time a request
+    # enters or leaves it, so one big pool burns CPU under load. Spread the
+    # connections over several small pools instead.
+    SHARD_SIZE = 8
+
+    def __init__(self, url: str, key: str, *, max_connections: int = 64,
+                 timeout: float = 10.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 observer: Optional[Observer] = None,
+                 service_key: Optional[str] = None):
+        self.observer = observer
+        # Database functions that move money are not executable with the anon key
+        self._rpc_headers = {"apikey": service_key, "Authorization": f"Bearer {service_key}"} \
+            if service_key else None
+        self.base_url = url.rstrip("/") + "/rest/v1"
+        self.auth_url = url.rstrip("/") + "/auth/v1"
+        per_shard = min(max_connections, self.SHARD_SIZE)
+        n_shards = max(1, -(-max_connections // per_shard))
+        self._shards = [
+            httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "apikey": key,
+                    "Authorization": f"Bearer {key}",
+                    "Accept": "application/json",
+                },
+                limits=httpx.Limits(
+                    max_connections=per_shard,
+                    max_keepalive_connections=per_shard,
+                    keepalive_expiry=30.0,
+                ),
+                timeout=timeout,
+                transport=transport,
+            )
+            for _ in range(n_shards)
+        ]
+        # Requests beyond the pool capacity wait here rather than inside
+        # httpcore's queue, which is also rescanned on every state change.
+        self._slots = [asyncio.Semaphore(per_shard) for _ in self._shards]
+        self._inflight = [0] * n_shards
+
+    async def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        i = min(range(len(self._shards)), key=self._inflight.__getitem__)
+        self._inflight[i] += 1
+        try:
+            async with self._slots[i]:
+                return await self._shards[i].request(method, path, **kwargs)
+        finally:
+            self._inflight[i] -= 1
+
+    def _observe(self, target: str, method: str, seconds: float,
+                 resp: Optional[httpx.Response], rows: int = 0) -> None:
+        if self.observer is not None:
+            self.observer(target, method, seconds, resp.status_code if resp is not None else 0, rows,
+                          len(resp.content) if resp is not None else 0)
+
+    async def _call(self, target: str, method: str, path: str, **kwargs) -> Tuple[httpx.Response, float]:
+        """Send and raise on HTTP errors. Returns the response and its round-trip time."""
+        start = time.perf_counter()
+        try:
+            resp = await self._send(method, path, **kwargs)
+        except Exception:
+            self._observe(target, method, time.perf_counter() - start, None)
+            raise
+        elapsed = time.perf_counter() - start
+        if resp.status_code >= 400:
+            self._observe(target, method, elapsed, resp)
+            raise RepositoryError(target, resp.status_code, resp.text[:200])
+        return resp, elapsed
+
+    async def _request(self, method: str, table: str, *, params=None, json=None,
+                       prefer: Optional[str] = None) -> List[Dict[str, Any]]:
+        headers = {"Prefer": prefer} if prefer else None
+        resp, elapsed = await self._call(table, method, f"/{table}", params=params, json=json, headers=headers)
+        data = resp.json() if resp.content else []
+        rows = data if isinstance(data, list) else [data]
+        self._observe(table, method, elapsed, resp, len(rows))
+        return rows
+
+    async def select(self, table: str, columns: str = "*", *,
+                     filters: Optional[Filters] = None, order: Optional[str] = None,
+                     desc: bool = False, limit: Optional[int] = None,
+                     any_of: Optional[AnyOf] = None) -> List[Dict[str, Any]]:
+        params = build_params(columns, filters, order, desc, limit, any_of)
+        return await self._request("GET", table, params=params)
+
+    async def insert(self, table: str, rows: Union[Dict, Sequence[Dict]]) -> List[Dict[str, Any]]:
+        return await self._request("POST", table, json=rows,
+                                   prefer="return=representation")
+
+    async def upsert(self, table: str, rows: Sequence[Dict], *,
+                     on_conflict: Optional[str] = None,
+                     returning: bool = False) -> List[Dict[str, Any]]:
+        params = [("on_conflict", on_conflict)] if on_conflict else None
+        prefer = "resolution=merge-duplicates,return=" + ("representation" if returning else "minimal")
+        return await self._request("POST", table, params=params, json=list(rows), prefer=prefer)
+
+    async def update(self, table: str, values: Dict[str, Any], *,
+                     filters: Filters) -> List[Dict[str, Any]]:
+        params = build_params(filters=filters)[1:]
+        return await self._request("PATCH", table, params=params, json=values,
+                                   prefer="return=representation")
+
+    async def delete(self, table: str, *, filters: Filters) -> List[Dict[str, Any]]:
+        params = build_params(filters=filters)[1:]
+        return await self._request("DELETE", table, params=params,
+                                   prefer="return=representation")
+
+    async def rpc(self, function: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        resp, elapsed = await self._call(f"rpc/{function}", "POST", f"/rpc/{function}", json=args or {},
+                                         headers=self._rpc_headers)
+        data = resp.json() if resp.content else None
+        self._observe(f"rpc/{function}", "POST", elapsed, resp,
+                      len(data) if isinstance(data, list) else int(data is not None))
+        return data
+
+    async def auth_user(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """The Supabase Auth user an access token belongs to, or None if the token is not valid."""
+        try:
+            resp, elapsed = await self._call("auth/user", "GET", self.auth_url + "/user",
+                                             headers={"Authorization": f"Bearer {access_token}"})
+        except RepositoryError as e:
+            if e.status_code in (401, 403):
+                return None
+            raise
+        self._observe("auth/user", "GET", elapsed, resp, 1)
+        return resp.json()
+
+    async def aclose(self) -> None:
+        for client in self._shards:
+            await client.aclose()
+
+
+def chunked(rows: Sequence[Dict], size: int) -> Iterable[Sequence[Dict]]:
+    """Split `rows` into batches for bulk writes."""
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
@@ -0,0 +1,69 @@
+"""
+Bet placement and match settlement.
+
+Both are Postgres functions (`place_bet`, `settle_match` in sql/schema.sql)
+so the balance change and the bet rows commit together. Settlement grades all
+pending bets on a match in one UPDATE and credits winners with one more, and
+it only touches bets that are still pending, so retrying a result is safe.
+Clients cannot execute either function; the repository calls them with the
+service-role key (SUPABASE_SERVICE_ROLE_KEY).
+"""
+from typing import Any, Dict, NamedTuple, Optional
+
+from repository import RepositoryError, SupabaseRepository
+
+# Exception names raised by the SQL functions -> client-facing reasons
+REJECTIONS = {
+    "insufficient_funds": "Insufficient balance",
+    "match_not_open": "Betting is closed for this match",
+    "match_not_found": "Match not found",
+}
+
+
+class BetRejected(Exception):
+    """The database refused the operation for a business reason (not an outage)."""
+
+    def __init__(self, code: str):
+        super().__init__(REJECTIONS[code])
+        self.code = code
+
+
+class SettlementSummary(NamedTuple):
+    match_id: int
+    settled: int
+    won: int
+    lost: int
+    paid_out: float
+
+
+def _rejection(error: RepositoryError) -> Optional[str]:
+    text = str(error)
+    return next((code for code in REJECTIONS if code in text), None)
+
+
+async def place_bet(repo: SupabaseRepository, bet: Dict[str, Any]) -> Dict[str, Any]:
+    """Debit the stake and record the bet atomically. Returns the new bet row."""
+    try:
+        return await repo.rpc("place_bet", {f"p_{k}": v for k, v in bet.items()})
+    except RepositoryError as e:
+        code = _rejection(e)
+        if code:
+            raise BetRejected(code) from e
+        raise
+
+
+async def settle_match(repo: SupabaseRepository, match_id: int, score_team1: int,
+                       score_team2: int) -> SettlementSummary:
+    """Record the final score and settle the match's pending bets in one transaction."""
+    try:
+        rows = await repo.rpc("settle_match", {
+            "p_match_id": match_id, "p_score_team1": score_team1, "p_score_team2": score_team2,
+        })
+    except RepositoryError as e:
+        code = _rejection(e)
+        if code:
+            raise BetRejected(code) from e
+        raise
+    row = rows[0] if rows else {}
+    return SettlementSummary(match_id, int(row.get("settled") or 0), int(row.get("won") or 0),
+                             int(row.get("lost") or 0), float(row.get("paid_out") or 0))
@@ -0,0 +1,388 @@
+"""
+Monte Carlo simulation of the 48-team World Cup (2026 format).
+
+Twelve groups of four play a round robin. The top two of every group and
+the eight best third-placed teams go through to a 32-team knockout.
+Each simulated tournament does the following:
+- Samples a scoreline for every group match. Finished matches keep their score.
+- Ranks each group by points, goal difference, goals scored and then lots
+  (head-to-head is not modelled).
+- Ranks the twelve third-placed teams in the same way.
+- Plays out the bracket.
+
+Inputs:
+- `rates[i, j]`: expected goals of team i against team j, so that any two
+  teams can meet in the knockout.
+- Optionally, win/draw/loss probabilities per group fixture. These reweight
+  that fixture's scoreline distribution, so the goals still look like football.
+
+Everything is vectorized across simulations. A batch is a few
+(sims x matches) and (sims x teams) arrays. Scorelines are drawn from
+per-fixture alias tables, and each team's points / goals ranking key is one
+matrix product with the fixture incidence matrix. Batches are seeded from
+one SeedSequence by batch number, so a seed gives the same counts whatever
+the number of worker processes.
+"""
+import math
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+GROUPS = 12
+GROUP_SIZE = 4
+BEST_THIRDS = 8
+MAX_GOALS = 10          # scorelines are capped here; the Poisson tail is folded into the last cell
+BASE_GOALS = 1.3        # expected goals per team between equal sides
+GOAL_SCALE = 0.25       # log expected-goals change per unit of rating difference
+BATCH_SIZE = 20_000     # simulations per task; also the unit of seeding
+CELLS = (MAX_GOALS + 1) ** 2
+
+# Stages counted per team, in output order. "qualify" means reaching the round of 32,
+# the event `qualifying_odds` prices; "champion" is the `outright_winning_odds` event.
+STAGES = ("first", "second", "third", "qualify", "round_of_16", "quarterfinal", "semifinal", "final",
+          "champion")
+# value_bets market -> the stage whose probability it prices
+MARKET_STAGES = {"qualify": "qualify", "outright": "champion"}
+
+# Round of 32 in bracket order: consecutive pairs meet, then winners of consecutive
+# matches, and so on. "1A" is the winner of group A, "2A" the runner-up, and "3" the
+# next of the best third-placed teams. The official third-place allocation (a
+# 495-case table) is approximated by rotate_thirds. Group-stage probabilities do
+# not depend on the bracket.
+ROUND_OF_32 = (
+    "1A", "3", "2D", "2G", "1C", "2F", "1E", "3",
+    "1G", "3", "2K", "2L", "1H", "2J", "1K", "3",
+    "1B", "3", "2E", "2I", "1F", "2C", "1D", "3",
+    "1I", "3", "2A", "2B", "1J", "2H", "1L", "3",
+)
+
+
+class Fixture(NamedTuple):
+    home: int                                          # team position in Tournament.team_ids
+    away: int
+    probs: Optional[Tuple[float, float, float]] = None  # home win, draw, away win
+    score: Optional[Tuple[int, int]] = None            # finished: fixed result
+
+
+class Tournament(NamedTuple):
+    team_ids: np.ndarray        # (teams,)
+    group_names: List[str]      # 'A'..'L'
+    groups: np.ndarray          # (GROUPS, GROUP_SIZE) team positions
+    fixtures: List[Fixture]     # group stage
+    rates: np.ndarray           # (teams, teams) expected goals of row team against column team
+
+
+class Prepared(NamedTuple):
+    """Tournament compiled to the arrays a batch needs (small; pickled to each worker)."""
+    # Alias tables of every fixture's scoreline distribution, flattened: fixture m owns
+    # cells [m * CELLS, (m + 1) * CELLS) and aliases point into the same flat index
+    accept: np.ndarray          # (matches * CELLS,) float32
+    alias: np.ndarray           # (matches * CELLS,) int16
+    home_key: np.ndarray        # (matches * CELLS,) a cell's contribution to the home side's ranking key
+    away_key: np.ndarray
+    home: np.ndarray            # (matches, teams) float32 incidence
+    away: np.ndarray
+    groups: np.ndarray
+    advance: np.ndarray         # (teams, teams) P(row team beats column team in a knockout match)
+    slots: List[Tuple[int, int]]  # ROUND_OF_32 as (finish 0/1/2, group)
+    third_slot_groups: np.ndarray
+
+
+class SimulationResult(NamedTuple):
+    team_ids: np.ndarray
+    n_sims: int
+    seed: int
+    counts: np.ndarray          # (len(STAGES), teams)
+    points: np.ndarray          # (teams,) total group points over all simulations
+
+    def probabilities(self) -> Dict[str, np.ndarray]:
+        return {stage: self.counts[i] / self.n_sims for i, stage in enumerate(STAGES)}
+
+    def std_error(self) -> float:
+        """Largest binomial standard error of any reported probability."""
+        p = self.counts / self.n_sims
+        return float(np.sqrt(p * (1 - p) / self.n_sims).max())
+
+    def rows(self) -> List[Dict[str, Any]]:
+        probs = self.probabilities()
+        return [{"team_id": int(t),
+                 **{stage: round(float(probs[stage][i]), 4) for stage in STAGES},
+                 "expected_points": round(float(self.points[i] / self.n_sims), 3)}
+                for i, t in enumerate(self.team_ids.tolist())]
+
+
+# --- Match model ---
+
+def goal_rates(ratings: np.ndarray, base: float = BASE_GOALS, scale: float = GOAL_SCALE) -> np.ndarray:
+    """Team ratings (log-odds scale) -> expected goals of every team against every other."""
+    ratings = np.asarray(ratings, dtype=float)
+    return base * np.exp(scale * (ratings[:, None] - ratings[None, :]))
+
+
+def poisson_pmf(rates: np.ndarray) -> np.ndarray:
+    """P(goals = 0..MAX_GOALS) for each rate (trailing axis); the tail is folded into MAX_GOALS."""
+    goals = np.arange(MAX_GOALS + 1)
+    log_factorial = np.array([math.lgamma(g + 1) for g in goals])
+    rates = np.asarray(rates, dtype=float)[..., None]
+    pmf = np.exp(goals * np.log(rates) - rates - log_factorial)
+    pmf[..., -1] += np.clip(1 - pmf.sum(axis=-1), 0.0, None)
+    return pmf
+
+
+def scoreline_pmf(home_rate: float, away_rate: float) -> np.ndarray:
+    """Independent-Poisson scoreline probabilities, (MAX_GOALS + 1)^2 cells, home goals major."""
+    return np.outer(poisson_pmf(home_rate), poisson_pmf(away_rate))
+
+
+def outcome_masks() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Home win / draw / away win cells of a scoreline grid."""
+    h, a = np.indices((MAX_GOALS + 1, MAX_GOALS + 1))
+    return h > a, h == a, h < a
+
+
+def reweight(pmf: np.ndarray, probs: Sequence[float]) -> np.ndarray:
+    """Scale the home-win / draw / away-win regions of `pmf` to `probs` (renormalized)."""
+    target = np.asarray(probs, dtype=float)
+    if target.shape != (3,) or (target < 0).any() or target.sum() <= 0:
+        raise ValueError(f"Outcome probabilities must be three non-negative numbers, got {probs}")
+    target = target / target.sum()
+    out = pmf.copy()
+    for mask, p in zip(outcome_masks(), target):
+        mass = out[mask].sum()
+        if mass > 0:
+            out[mask] *= p / mass
+    return out / out.sum()
+
+
+def knockout_advance(rates: np.ndarray) -> np.ndarray:
+    """
+    P(i beats j) in a knockout match: win in 90 minutes, or draw and take
+    extra time / penalties in proportion to the two sides' win chances.
+    """
+    goals = poisson_pmf(rates)                     # (i, j, goals of i against j)
+    against = goals.transpose(1, 0, 2)             # goals of j against i
+    win, draw, _ = (np.einsum("ijh,ija,ha->ij", goals, against, mask.astype(float)) for mask in outcome_masks())
+    loss = 1 - win - draw
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(win + loss > 0, win / (win + loss), 0.5)
+    return win + draw * share
+
+
+def alias_table(pmf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Walker/Vose alias table: draw a cell k uniformly, keep it with
+    probability accept[k], else take alias[k]. O(1) per sample.
+    """
+    k = len(pmf)
+    scaled = pmf * k / pmf.sum()
+    accept, alias = np.ones(k), np.arange(k)
+    small = [i for i in range(k) if scaled[i] < 1]
+    large = [i for i in range(k) if scaled[i] >= 1]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        accept[s], alias[s] = scaled[s], l
+        scaled[l] -= 1 - scaled[s]
+        (small if scaled[l] < 1 else large).append(l)
+    return accept, alias
+
+
+def ranking_key(goals_for: np.ndarray, goals_against: np.ndarray) -> np.ndarray:
+    """
+    One match's contribution to a team's sortable group key: points, then goal
+    difference (>= -30 over three matches), then goals scored (<= 30). Linear in
+    the result, so a team's key is the sum over its fixtures (+ 5,000 offset).
+    """
+    margin = goals_for - goals_against
+    return 10_000 * (3 * (margin > 0) + (margin == 0)) + 100 * margin + goals_for
+
+
+def prepare(tournament: Tournament) -> Prepared:
+    n, matches = len(tournament.team_ids), len(tournament.fixtures)
+    if matches * CELLS > np.iinfo(np.int16).max:
+        raise ValueError(f"Too many fixtures to simulate: {matches}")
+    accept = np.empty((matches, CELLS), dtype=np.float32)
+    alias = np.empty((matches, CELLS), dtype=np.int16)
+    home = np.zeros((matches, n), dtype=np.float32)
+    away = np.zeros((matches, n), dtype=np.float32)
+    for m, f in enumerate(tournament.fixtures):
+        if f.score is not None:
+            pmf = np.zeros((MAX_GOALS + 1, MAX_GOALS + 1))
+            pmf[min(f.score[0], MAX_GOALS), min(f.score[1], MAX_GOALS)] = 1.0
+        else:
+            pmf = scoreline_pmf(tournament.rates[f.home, f.away], tournament.rates[f.away, f.home])
+            if f.probs is not None:
+                pmf = reweight(pmf, f.probs)
+        table, aliases = alias_table(pmf.ravel())
+        accept[m], alias[m] = table, aliases + m * CELLS
+        home[m, f.home] = away[m, f.away] = 1.0
+    h, a = np.divmod(np.arange(CELLS), MAX_GOALS + 1)
+    home_key = np.tile(ranking_key(h, a), matches).astype(np.float32)
+    away_key = np.tile(ranking_key(a, h), matches).astype(np.float32)
+
+    letters = {name: g for g, name in enumerate(tournament.group_names)}
+    slots = [(2, -1) if s == "3" else (int(s[0]) - 1, letters[s[1]]) for s in ROUND_OF_32]
+    # A third-place slot's opponent is the group winner next to it
+    third_slot_groups = np.array([slots[k ^ 1][1] for k, s in enumerate(ROUND_OF_32) if s == "3"])
+    return Prepared(accept.ravel(), alias.ravel(), home_key, away_key, home, away, np.asarray(tournament.groups), knockout_advance(tournament.rates),
+                    slots, third_slot_groups)
+
+
+# --- Simulation ---
+
+def rotate_thirds(best_groups: np.ndarray, slot_groups: np.ndarray) -> np.ndarray:
+    """
+    Column order for the ranked thirds (sims, BEST_THIRDS) into the third-place
+    slots: the rotation that pairs the fewest thirds with their own group
+    winner (ties: smallest shift).
+    """
+    k = best_groups.shape[1]
+    shifts = (np.arange(k)[None, :] + np.arange(k)[:, None]) % k          # (shift, slot)
+    clashes = (best_groups[:, shifts] == slot_groups[None, None, :]).sum(axis=2)
+    return shifts[clashes.argmin(axis=1)]
+
+
+def simulate_batch(prepared: Prepared, n: int, seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """`n` tournaments -> (stage counts (len(STAGES), teams), total points per team)."""
+    rng = np.random.default_rng(seed)
+    matches, teams = prepared.home.shape
+    counts = np.zeros((len(STAGES), teams), dtype=np.int64)
+
+    # Alias sampling: a uniform cell per fixture, kept or swapped for its alias
+    cell = rng.integers(0, CELLS, size=(n, matches), dtype=np.int16)
+    cell += (np.arange(matches) * CELLS).astype(np.int16)
+    cell = np.where(rng.random((n, matches), dtype=np.float32) < prepared.accept[cell], cell, prepared.alias[cell])
+    # float32 is exact here (keys stay below 2^24); lots need the float64 headroom
+    key = (prepared.home_key[cell] @ prepared.home + prepared.away_key[cell] @ prepared.away).astype(float)
+    key += 5_000
+    points = np.floor(key / 10_000)
+    key += rng.random((n, teams))
+
+    order = np.argsort(-key[:, prepared.groups], axis=2, kind="stable")
+    finish = np.take_along_axis(np.broadcast_to(prepared.groups, order.shape), order, axis=2)  # (n, G, 4)
+    for place in range(3):
+        counts[place] = np.bincount(finish[:, :, place].ravel(), minlength=teams)
+
+    thirds = finish[:, :, 2]
+    best_groups = np.argsort(-np.take_along_axis(key, thirds, axis=1), axis=1, kind="stable")[:, :BEST_THIRDS]
+    best_groups = np.take_along_axis(best_groups, rotate_thirds(best_groups, prepared.third_slot_groups), axis=1)
+    best = np.take_along_axis(thirds, best_groups, axis=1)
+
+    bracket = np.empty((n, len(prepared.slots)), dtype=np.int64)
+    third = 0
+    for k, (place, group) in enumerate(prepared.slots):
+        if place == 2:
+            bracket[:, k] = best[:, third]
+            third += 1
+        else:
+            bracket[:, k] = finish[:, group, place]
+    stage = STAGES.index("qualify")
+    counts[stage] = np.bincount(bracket.ravel(), minlength=teams)
+    while bracket.shape[1] > 1:
+        a, b = bracket[:, 0::2], bracket[:, 1::2]
+        bracket = np.where(rng.random(a.shape) < prepared.advance[a, b], a, b)
+        stage += 1
+        counts[stage] = np.bincount(bracket.ravel(), minlength=teams)
+    return counts, points.sum(axis=0)
+
+
+def simulate(tournament: Tournament, n_sims: int = 100_000, *, seed: int = 2026,
+             batch_size: int = BATCH_SIZE, n_jobs: int = 1) -> SimulationResult:
+    """
+    Run `n_sims` tournaments in batches of `batch_size`, spread over `n_jobs`
+    processes (joblib; -1 = all cores). Deterministic for a given seed and
+    batch size.
+    """
+    if n_sims < 1:
+        raise ValueError("n_sims must be positive")
+    prepared = prepare(tournament)
+    sizes = [min(batch_size, n_sims - start) for start in range(0, n_sims, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if n_jobs == 1 or len(sizes) == 1:
+        results = [simulate_batch(prepared, size, s) for size, s in zip(sizes, seeds)]
+    else:
+        from joblib import Parallel, delayed
+        results = Parallel(n_jobs=n_jobs)(delayed(simulate_batch)(prepared, size, s)
+                                          for size, s in zip(sizes, seeds))
+    return SimulationResult(np.asarray(tournament.team_ids), n_sims, seed,
+                            sum(c for c, _ in results), sum(p for _, p in results))
+
+
+# --- Building from the database ---
+
+_GROUP = re.compile(r"^(?:group\s+)?([a-z])$", re.IGNORECASE)
+
+
+def group_letter(value: Optional[str]) -> Optional[str]:
+    """'A' / 'Group A' / 'group a' -> 'A'; None otherwise."""
+    match = _GROUP.match((value or "").strip())
+    return match.group(1).upper() if match else None
+
+
+def ratings_from_probabilities(probs: Dict[int, float], team_ids: Iterable[int]) -> np.ndarray:
+    """
+    Ratings from per-team model probabilities (e.g. the qualification
+    model): their log-odds. Teams without one get the mean rating.
+    """
+    team_ids = list(team_ids)
+    known = {t: float(np.clip(p, 0.01, 0.99)) for t, p in probs.items() if p == p}
+    logits = {t: math.log(p / (1 - p)) for t, p in known.items()}
+    mean = float(np.mean(list(logits.values()))) if logits else 0.0
+    return np.array([logits.get(t, mean) for t in team_ids])
+
+
+def build_tournament(teams: List[Dict[str, Any]], matches: List[Dict[str, Any]], ratings: np.ndarray,
+                     match_probs: Optional[Dict[Tuple[int, int], Tuple[float, float, float]]] = None
+                     ) -> Tournament:
+    """
+    Groups from `teams.group_name`, group fixtures from `matches` (finished
+    ones with a score are fixed), plus any round-robin pairing not yet in
+    `matches`. `ratings` follows `teams` order. `match_probs` maps
+    (team1_id, team2_id) to (team1 win, draw, team2 win).
+    """
+    by_group: Dict[str, List[int]] = {}
+    for row in teams:
+        letter = group_letter(row.get("group_name"))
+        if letter:
+            by_group.setdefault(letter, []).append(row["id"])
+    sizes = {g: len(ids) for g, ids in by_group.items()}
+    if len(by_group) != GROUPS or any(s != GROUP_SIZE for s in sizes.values()):
+        raise ValueError(f"Expected {GROUPS} groups of {GROUP_SIZE} teams in teams.group_name, got "
+                         + (", ".join(f"{g}: {s}" for g, s in sorted(sizes.items())) or "none"))
+
+    names = sorted(by_group)
+    team_ids = np.array([t for g in names for t in sorted(by_group[g])], dtype=np.int64)
+    position = {int(t): i for i, t in enumerate(team_ids.tolist())}
+    groups = np.arange(len(team_ids)).reshape(GROUPS, GROUP_SIZE)
+    group_of = {i: g for g in range(GROUPS) for i in groups[g].tolist()}
+    rating_by_id = {row["id"]: r for row, r in zip(teams, np.asarray(ratings, dtype=float))}
+    rates = goal_rates(np.array([rating_by_id[t] for t in team_ids.tolist()]))
+    match_probs = match_probs or {}
+
+    def probs_for(home: int, away: int) -> Optional[Tuple[float, float, float]]:
+        ids = (int(team_ids[home]), int(team_ids[away]))
+        if ids in match_probs:
+            return match_probs[ids]
+        flipped = match_probs.get(ids[::-1])
+        return (flipped[2], flipped[1], flipped[0]) if flipped else None
+
+    fixtures, seen = [], set()
+    for m in matches:
+        home, away = position.get(m.get("team1_id")), position.get(m.get("team2_id"))
+        stage = (m.get("stage") or "").lower()
+        if home is None or away is None or group_of[home] != group_of[away] or (stage and "group" not in stage):
+            continue
+        pair = frozenset((home, away))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        finished = m.get("status") == "finished" and m.get("score_team1") is not None \
+            and m.get("score_team2") is not None
+        fixtures.append(Fixture(home, away, probs_for(home, away),
+                                (int(m["score_team1"]), int(m["score_team2"])) if finished else None))
+    for members in groups.tolist():
+        for i, home in enumerate(members):
+            for away in members[i + 1:]:
+                if frozenset((home, away)) not in seen:
+                    fixtures.append(Fixture(home, away, probs_for(home, away)))
+    return Tournament(team_ids, names, groups, fixtures, rates)
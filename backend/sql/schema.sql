@@ -55,3 +55,171 @@ CREATE TABLE public.users (
 );
 
 
+
+-- Bet placement and settlement, called through PostgREST as /rpc/place_bet
+-- and /rpc/settle_match. Each runs in one transaction, so the bet rows and the
+-- balances they move never disagree.
+
+CREATE INDEX IF NOT EXISTS bets_pending_match_idx
+  ON public.bets (match_id) WHERE result = 'pending';
+
+CREATE OR REPLACE FUNCTION public.place_bet(
+  p_user_id uuid, p_match_id bigint, p_bet_type text, p_bet_on text,
+  p_odds numeric, p_amount numeric
+) RETURNS public.bets
+LANGUAGE plpgsql AS $$
+DECLARE
+  placed public.bets;
+BEGIN
+  PERFORM 1 FROM public.matches WHERE id = p_match_id AND status = 'upcoming';
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'match_not_open';
+  END IF;
+
+  -- Conditional debit: the row lock serializes concurrent bets by one user
+  UPDATE public.users SET balance = balance - p_amount
+   WHERE id = p_user_id AND balance >= p_amount;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'insufficient_funds';
+  END IF;
+
+  INSERT INTO public.bets (user_id, match_id, bet_type, bet_on, odds, amount)
+  VALUES (p_user_id, p_match_id, p_bet_type, p_bet_on, p_odds, p_amount)
+  RETURNING * INTO placed;
+  RETURN placed;
+END $$;
+
+-- Settles every pending team_winner bet on a match in one set-based pass.
+-- bet_on may name the winning team by name, country code or id, or 'draw'.
+-- Only rows still 'pending' are touched, so a retried call pays nothing twice.
+-- Odds are decimal: a won bet credits amount * odds (the stake was debited
+-- when the bet was placed). Other bet types stay pending for manual review.
+CREATE OR REPLACE FUNCTION public.settle_match(
+  p_match_id bigint, p_score_team1 integer, p_score_team2 integer
+) RETURNS TABLE (settled bigint, won bigint, lost bigint, paid_out numeric)
+LANGUAGE plpgsql AS $$
+DECLARE
+  m public.matches;
+  winner text[];
+BEGIN
+  -- Concurrent settlements of the same match queue up here
+  SELECT * INTO m FROM public.matches WHERE id = p_match_id FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'match_not_found';
+  END IF;
+
+  UPDATE public.matches
+     SET score_team1 = p_score_team1, score_team2 = p_score_team2, status = 'finished'
+   WHERE id = p_match_id;
+
+  IF p_score_team1 = p_score_team2 THEN
+    winner := ARRAY['draw'];
+  ELSE
+    SELECT ARRAY[lower(t.name), lower(t.country_code), t.id::text] INTO winner
+      FROM public.teams t
+     WHERE t.id = CASE WHEN p_score_team1 > p_score_team2 THEN m.team1_id ELSE m.team2_id END;
+  END IF;
+
+  RETURN QUERY
+  WITH graded AS (
+    UPDATE public.bets b
+       SET result = CASE WHEN lower(trim(b.bet_on)) = ANY (winner) THEN 'won' ELSE 'lost' END
+     WHERE b.match_id = p_match_id AND b.result = 'pending' AND b.bet_type = 'team_winner'
+    RETURNING b.user_id, b.result, b.amount * b.odds AS payout
+  ), credited AS (
+    UPDATE public.users u
+       SET balance = u.balance + w.total
+      FROM (SELECT g.user_id, sum(g.payout) AS total
+              FROM graded g WHERE g.result = 'won' GROUP BY g.user_id) w
+     WHERE u.id = w.user_id
+    RETURNING u.id
+  )
+  SELECT count(*),
+         count(*) FILTER (WHERE g.result = 'won'),
+         count(*) FILTER (WHERE g.result = 'lost'),
+         coalesce(sum(g.payout) FILTER (WHERE g.result = 'won'), 0)
+    FROM graded g;
+END $$;
+
+-- Only the API may run these: it checks the bettor's token and the admin key
+-- first. Supabase grants EXECUTE to every client role by default, which would
+-- let anyone with the public anon key settle a match through /rest/v1/rpc.
+REVOKE EXECUTE ON FUNCTION public.place_bet(uuid, bigint, text, text, numeric, numeric)
+  FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.settle_match(bigint, integer, integer)
+  FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.place_bet(uuid, bigint, text, text, numeric, numeric) TO service_role;
+GRANT EXECUTE ON FUNCTION public.settle_match(bigint, integer, integer) TO service_role;
+
+-- Model output consumed by the value-bet engine (backend/value_bets.py).
+-- market: 'qualify' | 'outright'
+CREATE TABLE IF NOT EXISTS public.model_probabilities (
+  team_id bigint NOT NULL,
+  market text NOT NULL,
+  probability numeric NOT NULL CHECK (probability >= 0 AND probability <= 1),
+  model_version text,
+  updated_at timestamp with time zone NOT NULL DEFAULT now(),
+  CONSTRAINT model_probabilities_pkey PRIMARY KEY (team_id, market),
+  CONSTRAINT model_probabilities_team_id_fkey FOREIGN KEY (team_id) REFERENCES public.teams(id)
+);
+
+-- Engine-maintained picks, one row per (market, team); served ranked by /valuebets.
+-- The table predates the engine, so its columns are added in place.
+CREATE TABLE IF NOT EXISTS public.valuebets (
+  id bigint GENERATED ALWAYS AS IDENTITY NOT NULL,
+  CONSTRAINT valuebets_pkey PRIMARY KEY (id)
+);
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS market_key text;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS team_id bigint;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS match text;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS market text;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS pick text;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS current_odds text;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS fair_odds integer;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS implied_prob numeric;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS fair_prob numeric;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS model_prob numeric;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS edge numeric;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS ev numeric;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS kelly numeric;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS rank integer;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS model_version text;
+ALTER TABLE public.valuebets ADD COLUMN IF NOT EXISTS updated_at timestamp with time zone NOT NULL DEFAULT now();
+-- Hand-entered picks keep a NULL market_key, which never collides in this index;
+-- the engine neither updates nor deletes them.
+CREATE UNIQUE INDEX IF NOT EXISTS valuebets_market_key_team_id_key ON public.valuebets (market_key, team_id);
+
+-- The engine prices one competition and season per market (value_bets.MARKETS).
+-- Outright prices on file are for the 2026 World Cup (comp_id 2).
+ALTER TABLE public.outright_winning_odds ADD COLUMN IF NOT EXISTS comp_id integer;
+ALTER TABLE public.outright_winning_odds ADD COLUMN IF NOT EXISTS season_id integer;
+UPDATE public.outright_winning_odds SET comp_id = 2, season_id = 2026 WHERE comp_id IS NULL;
+
+-- Feature ranking read by /top_features and the chat prompt. Written by the
+-- permutation-importance stage of MachineLearningModels (backend/ml/importance.py).
+CREATE TABLE IF NOT EXISTS public.top_features (
+  id bigint GENERATED ALWAYS AS IDENTITY NOT NULL,
+  feature_name text NOT NULL,
+  ranking integer NOT NULL,
+  CONSTRAINT top_features_pkey PRIMARY KEY (id)
+);
+ALTER TABLE public.top_features ADD COLUMN IF NOT EXISTS importance numeric;
+ALTER TABLE public.top_features ADD COLUMN IF NOT EXISTS model_version text;
+ALTER TABLE public.top_features ADD COLUMN IF NOT EXISTS updated_at timestamp with time zone NOT NULL DEFAULT now();
+CREATE UNIQUE INDEX IF NOT EXISTS top_features_feature_name_key ON public.top_features (feature_name);
+
+-- Scraped past-tournament odds (backend/odds_scraper.py), upserted on
+-- (comp_id, season_id, team). Kept out of qualifying_odds, which holds the
+-- current prices the value-bet engine reads.
+CREATE TABLE IF NOT EXISTS public.historical_qualifying_odds (
+  id bigint GENERATED ALWAYS AS IDENTITY NOT NULL,
+  team text NOT NULL,
+  odds numeric NOT NULL,
+  comp_id integer NOT NULL,
+  season_id integer NOT NULL,
+  CONSTRAINT historical_qualifying_odds_pkey PRIMARY KEY (id),
+  CONSTRAINT historical_qualifying_odds_comp_season_team_key UNIQUE (comp_id, season_id, team)
+);
+
+-- API-Football fixture id; backend/fixtures_ingest.py upserts matches on it.
+CREATE UNIQUE INDEX IF NOT EXISTS matches_api_ref_key ON public.matches (api_ref);
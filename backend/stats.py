@@ -0,0 +1,78 @@
+"""
+Lookups over the four "2026 WC Quals ... Stats" tables.
+
+Each requested table is queried once, with a set filter covering every
+requested team by ID and by name. Multi-team, multi-category reads are
+served from the in-memory matrix in `feature_matrix`.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from repository import SupabaseRepository
+from team_index import TeamIndex
+
+
+class StatsTable(NamedTuple):
+    table: str
+    id_column: Optional[str]  # None when the table has no team_id column
+    name_column: str
+
+
+# The source sheets were imported with different key columns. This mapping is
+# the one place that knows which table is keyed how.
+STATS_TABLES: Dict[str, StatsTable] = {
+    "standard": StatsTable("2026 WC Quals Standard Stats", "team_id", "Squad"),
+    "shooting": StatsTable("2026 WC Quals Shooting Stats", "team_id", "Squad"),
+    "passing": StatsTable("2026 WC Quals Passing Stats", None, "team"),
+    "goalkeeping": StatsTable("2026 WC Quals Goalkeeping Stats", "team_id", "Squad"),
+}
+
+
+def parse_categories(categories: Optional[str]) -> List[str]:
+    """Comma-separated category list; empty means all. Raises ValueError on unknowns."""
+    if not categories:
+        return list(STATS_TABLES)
+    wanted = [c.strip().lower() for c in categories.split(",") if c.strip()]
+    unknown = [c for c in wanted if c not in STATS_TABLES]
+    if unknown:
+        raise ValueError(f"Invalid category {', '.join(unknown)}. Available: {', '.join(STATS_TABLES)}")
+    return list(dict.fromkeys(wanted))
+
+
+def resolve_teams(index: TeamIndex, team_ids: Sequence[int] = (),
+                  names: Sequence[str] = ()) -> List[dict]:
+    """Known teams for the given IDs and free-text names (aliases allowed)."""
+    teams: Dict[int, dict] = {}
+    for team_id in team_ids:
+        if team_id in index.teams:
+            teams[team_id] = index.teams[team_id]
+    for name in names:
+        team = index.resolve(name)
+        if team:
+            teams[team["id"]] = team
+    return list(teams.values())
+
+
+def _match_row(row: dict, spec: StatsTable, index: TeamIndex, ids: set) -> Optional[int]:
+    if spec.id_column and row.get(spec.id_column) in ids:
+        return row[spec.id_column]
+    name = row.get(spec.name_column)
+    team = index.resolve(str(name)) if name else None
+    return team["id"] if team and team["id"] in ids else None
+
+
+async def fetch_table(repo: SupabaseRepository, spec: StatsTable, index: TeamIndex,
+                      teams: List[dict]) -> Dict[int, dict]:
+    """One query for every team in `teams`; returns {team_id: row}."""
+    ids = {t["id"] for t in teams}
+    names = [n for t in teams for n in index.spellings(t["id"])]
+    any_of = [(spec.name_column, "in", names)]
+    if spec.id_column:
+        any_of.insert(0, (spec.id_column, "in", sorted(ids)))
+    rows = await repo.select(spec.table, any_of=any_of)
+
+    by_team: Dict[int, dict] = {}
+    for row in rows:
+        team_id = _match_row(row, spec, index, ids)
+        if team_id is not None and team_id not in by_team:
+            by_team[team_id] = row
+    return by_team
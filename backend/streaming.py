@@ -0,0 +1,39 @@
+"""
+Server-Sent Events helpers for streaming responses.
+"""
+import json
+import time
+from typing import Any, AsyncIterator, Optional
+
+# Disable proxy buffering (nginx) so events reach the browser as they are sent.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
+
+
+async def sse_stream(chunks: AsyncIterator[str], label: str = "Stream",
+                     started: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Wrap text chunks as SSE events and finish with a `done` event carrying
+    time-to-first-token and total time, measured from `started`
+    (a `time.perf_counter()` value; defaults to when streaming begins).
+    """
+    started = time.perf_counter() if started is None else started
+    ttft = None
+    try:
+        async for text in chunks:
+            if ttft is None:
+                ttft = (time.perf_counter() - started) * 1000
+            yield sse_event({"text": text})
+    except Exception as e:
+        print(f"{label} error: {e}")
+        yield sse_event({"detail": "AI Service Unavailable"}, event="error")
+        return
+
+    total = (time.perf_counter() - started) * 1000
+    ttft = total if ttft is None else ttft
+    print(f"{label}: ttft={ttft:.0f}ms total={total:.0f}ms")
+    yield sse_event({"ttft_ms": round(ttft, 1), "total_ms": round(total, 1)}, event="done")
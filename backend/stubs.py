@@ -0,0 +1,293 @@
+"""
+Local stand-ins for Supabase and Gemini (BACKEND_CLIENTS=stub, see deps.py).
+
+`PostgrestStub` is an httpx transport that answers the subset of the
+PostgREST protocol `SupabaseRepository` speaks, over in-memory tables:
+- select, filters, `or=(...)`, order and limit
+- insert and upsert (`on_conflict`, merge-duplicates)
+- update and delete
+- the Auth user lookup, where an access token `stub:<user id>` signs in
+  as that user
+The real repository, its connection pools and its metrics all stay in the
+loop, so a load test exercises the same code as production minus the
+network. RPCs are only served if registered. `StubGemini` returns a canned
+answer, in chunks when streamed.
+
+Tables start from STUB_DATA (a JSON file of {table: [rows]}) or a generated
+48-team tournament. STUB_LATENCY_MS adds a fixed delay per call to
+emulate the upstream round trip.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import httpx
+
+from stats import STATS_TABLES
+
+Tables = Dict[str, List[Dict[str, Any]]]
+
+GROUP_LETTERS = "ABCDEFGHIJKL"
+STUB_TOKEN_PREFIX = "stub:"
+
+
+def _latency() -> float:
+    return float(os.getenv("STUB_LATENCY_MS", "0")) / 1000
+
+
+# --- Data ---
+
+def demo_tables(seed: int = 2026) -> Tables:
+    """A 48-team, 12-group tournament with fixtures, odds and stats rows."""
+    rnd = random.Random(seed)
+    teams = [{"id": i + 1, "name": f"Team {g}{k + 1}", "country_code": f"{g}{k + 1:02d}", "group_name": g}
+             for i, (g, k) in enumerate((g, k) for g in GROUP_LETTERS for k in range(4))]
+    matches, match_id = [], 0
+    for g in range(len(GROUP_LETTERS)):
+        members = teams[4 * g:4 * g + 4]
+        for day, pairs in enumerate((((0, 1), (2, 3)), ((0, 2), (1, 3)), ((0, 3), (1, 2)))):
+            for a, b in pairs:
+                match_id += 1
+                matches.append({"id": match_id, "team1_id": members[a]["id"], "team2_id": members[b]["id"],
+                                "match_date": f"2026-06-{11 + 4 * day + g % 4:02d}T19:00:00+00:00",
+                                "venue": "Stub Stadium", "stage": f"Group {GROUP_LETTERS[g]}",
+                                "status": "upcoming", "score_team1": None, "score_team2": None,
+                                "api_ref": f"stub-{match_id}"})
+    strength = {t["id"]: rnd.gauss(0, 1) for t in teams}
+    # American odds: favourites below -100, the rest above +100
+    qualifying = [{"id": t["id"], "team": t["name"], "comp_id": 2, "season_id": 2026,
+                   "odds": round(-100 - 200 * s if s > 0 else 100 - 200 * s)}
+                  for t, s in ((t, strength[t["id"]]) for t in teams)]
+    outright = [{"id": t["id"], "team": t["name"], "comp_id": 2, "season_id": 2026,
+                 "odds": int(500 * 2 ** (2 - strength[t["id"]]))}
+                for t in teams]
+    tables: Tables = {
+        "teams": teams,
+        "matches": matches,
+        "match_cards": [],
+        "qualifying_odds": qualifying,
+        "outright_winning_odds": outright,
+        "valuebets": [],
+        "model_probabilities": [],
+        "top_features": [{"id": 1, "feature_name": "SoT/90", "ranking": 1},
+                         {"id": 2, "feature_name": "GA90", "ranking": 2}],
+        "bets": [],
+        "users": [],
+    }
+    for category, spec in STATS_TABLES.items():
+        rows = []
+        for t in teams:
+            row = {spec.name_column: t["name"], "Gls": rnd.randint(5, 30), "SoT/90": round(rnd.uniform(2, 7), 2),
+                   "Cmp%": round(rnd.uniform(70, 90), 1), "GA90": round(rnd.uniform(0.3, 2), 2)}
+            if spec.id_column:
+                row[spec.id_column] = t["id"]
+            rows.append(row)
+        tables[spec.table] = rows
+    return tables
+
+
+def load_tables() -> Tables:
+    path = os.getenv("STUB_DATA")
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    return demo_tables()
+
+
+# --- PostgREST ---
+
+_IN = re.compile(r'"((?:[^"\\]|\\.)*)"|([^,]+)')
+
+
+def _coerce(text: str, like: Any) -> Any:
+    """Filter value -> the type of the column's value, so 10 > 9 compares numerically."""
+    if isinstance(like, bool):
+        return text.lower() == "true"
+    if isinstance(like, (int, float)):
+        try:
+            return float(text)
+        except ValueError:
+            return text
+    return text
+
+
+def _matches(value: Any, expr: str) -> bool:
+    op, _, arg = expr.partition(".")
+    if op == "is":
+        return value is None if arg == "null" else value is (arg == "true")
+    if op == "in":
+        items = [m.group(1).replace('\\"', '"') if m.group(1) is not None else m.group(2)
+                 for m in _IN.finditer(arg[1:-1])]
+        return any(value == _coerce(i, value) for i in items)
+    if value is None:
+        return False
+    if op in ("like", "ilike"):
+        pattern = "^" + re.escape(arg).replace("\\*", ".*").replace("%", ".*") + "$"
+        return re.match(pattern, str(value), re.IGNORECASE if op == "ilike" else 0) is not None
+    other = _coerce(arg, value)
+    try:
+        return {"eq": value == other, "neq": value != other, "gt": value > other, "gte": value >= other,
+                "lt": value < other, "lte": value <= other}[op]
+    except TypeError:
+        return False
+
+
+def _split_or(text: str) -> List[Tuple[str, str]]:
+    """'(a.eq.1,"b c".in.(x,y))' -> [('a', 'eq.1'), ('b c', 'in.(x,y)')]."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in text[1:-1]:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in "()":
+            depth += 1 if ch == "(" else -1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+    out = []
+    for part in parts:
+        if part.startswith('"'):
+            column, _, expr = part[1:].partition('".')
+        else:
+            column, _, expr = part.partition(".")
+        out.append((column, expr))
+    return out
+
+
+class PostgrestStub(httpx.AsyncBaseTransport):
+    def __init__(self, tables: Optional[Tables] = None,
+                 rpcs: Optional[Dict[str, Callable[[Tables, Dict[str, Any]], Any]]] = None,
+                 latency: Optional[float] = None):
+        self.tables = tables if tables is not None else load_tables()
+        self.rpcs = rpcs or {}
+        self.latency = _latency() if latency is None else latency
+        self._ids = {t: max((r.get("id") or 0 for r in rows if isinstance(r.get("id"), int)), default=0)
+                     for t, rows in self.tables.items()}
+
+    def _next_id(self, table: str) -> int:
+        self._ids[table] = self._ids.get(table, 0) + 1
+        return self._ids[table]
+
+    def _where(self, rows: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        for key, expr in params:
+            if key == "or":
+                alternatives = _split_or(expr)
+                rows = [r for r in rows if any(_matches(r.get(c), e) for c, e in alternatives)]
+            elif key not in ("select", "order", "limit", "on_conflict"):
+                rows = [r for r in rows if _matches(r.get(key), expr)]
+        return rows
+
+    def _select(self, rows: List[Dict[str, Any]], params: Dict[str, str]) -> List[Dict[str, Any]]:
+        if "order" in params:
+            column, _, direction = params["order"].rpartition(".")
+            present = [r for r in rows if r.get(column) is not None]
+            rows = sorted(present, key=lambda r: r[column], reverse=direction == "desc") + \
+                [r for r in rows if r.get(column) is None]
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        columns = params.get("select", "*")
+        if columns != "*":
+            names = [c.strip().strip('"') for c in columns.split(",")]
+            rows = [{c: r.get(c) for c in names} for r in rows]
+        return rows
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if request.url.path.endswith("/auth/v1/user"):
+            token = request.headers.get("Authorization", "").partition("Bearer ")[2]
+            if not token.startswith(STUB_TOKEN_PREFIX):
+                return httpx.Response(401, json={"msg": "invalid JWT"})
+            return httpx.Response(200, json={"id": token[len(STUB_TOKEN_PREFIX):], "role": "authenticated"})
+        path = unquote(request.url.path).split("/rest/v1/", 1)[-1]
+        pairs = [(k, v) for k, v in request.url.params.multi_items()]
+        params = dict(pairs)
+        body = json.loads(request.content) if request.content else None
+        prefer = request.headers.get("Prefer", "")
+
+        if path.startswith("rpc/"):
+            handler = self.rpcs.get(path[4:])
+            if handler is None:
+                return httpx.Response(404, json={"message": f"Could not find the function {path[4:]}"})
+            try:
+                return httpx.Response(200, json=handler(self.tables, body or {}))
+            except ValueError as e:
+                return httpx.Response(400, json={"code": "P0001", "message": str(e)})
+
+        if path not in self.tables and request.method != "POST":
+            return httpx.Response(404, json={"message": f'relation "public.{path}" does not exist'})
+        table = self.tables.setdefault(path, [])
+
+        if request.method == "GET":
+            return httpx.Response(200, json=self._select(self._where(table, pairs), params))
+        if request.method == "POST":
+            rows = body if isinstance(body, list) else [body]
+            keys = params.get("on_conflict", "id").split(",")
+            written = []
+            for row in rows:
+                existing = None
+                if "merge-duplicates" in prefer:
+                    existing = next((r for r in table if all(r.get(k) == row.get(k) for k in keys)), None)
+                if existing is not None:
+                    existing.update(row)
+                    written.append(existing)
+                else:
+                    new = {"id": self._next_id(path), **row}
+                    table.append(new)
+                    written.append(new)
+            if "return=representation" in prefer:
+                return httpx.Response(201, json=written)
+            return httpx.Response(201)
+        if request.method == "PATCH":
+            hits = self._where(table, pairs)
+            for r in hits:
+                r.update(body or {})
+            return httpx.Response(200, json=hits)
+        if request.method == "DELETE":
+            hits = self._where(table, pairs)
+            gone = {id(r) for r in hits}
+            self.tables[path] = [r for r in table if id(r) not in gone]
+            return httpx.Response(200, json=hits)
+        return httpx.Response(405, json={"message": f"Method {request.method} not allowed"})
+
+
+# --- Gemini ---
+
+class _StubModels:
+    def __init__(self, latency: float, chunks: int = 8):
+        self.latency = latency
+        self.chunks = chunks
+
+    @staticmethod
+    def _answer(contents: str) -> str:
+        return (f"[stub] Answer drawn from {len(contents)} characters of context. "
+                "Live model output is replaced by this text in stub mode.")
+
+    async def generate_content(self, model: str, contents: str):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text=self._answer(contents))
+
+    async def generate_content_stream(self, model: str, contents: str):
+        text = self._answer(contents)
+        size = -(-len(text) // self.chunks)
+
+        async def chunks():
+            for i in range(0, len(text), size):
+                await asyncio.sleep(self.latency / self.chunks)
+                yield SimpleNamespace(text=text[i:i + size])
+
+        return chunks()
+
+
+class StubGemini:
+    """Quacks like `genai.Client` for the calls api.py makes (`client.aio.models.*`)."""
+
+    def __init__(self, latency: Optional[float] = None):
+        self.aio = SimpleNamespace(models=_StubModels(_latency() if latency is None else latency))
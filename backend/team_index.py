@@ -0,0 +1,201 @@
+"""
+Team-entity index for free-text chat queries.
+
+Team names and aliases are compiled into one word-level Aho-Corasick
+automaton, so detecting every team mentioned in a query is a single linear
+pass over its words instead of a substring test per team. The index is built once from the
+`teams` table and swapped atomically when it is refreshed in the background.
+"""
+import asyncio
+import re
+import unicodedata
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Equivalent spellings. Whichever entry of a group exists in `teams` becomes
+# the canonical team; the others resolve to it.
+ALIAS_GROUPS = [
+    ["United States", "USA", "US", "USMNT", "United States of America"],
+    ["Korea Republic", "South Korea", "Korea"],
+    ["IR Iran", "Iran"],
+    ["Côte d'Ivoire", "Ivory Coast"],
+    ["Türkiye", "Turkey"],
+    ["Czechia", "Czech Republic"],
+    ["Netherlands", "Holland"],
+    ["Bosnia and Herzegovina", "Bosnia"],
+    ["Cabo Verde", "Cape Verde"],
+    ["Curaçao", "Curacao"],
+    ["Congo DR", "DR Congo"],
+    ["Republic of Ireland", "Ireland"],
+    ["England", "Three Lions"],
+    ["Saudi Arabia", "KSA"],
+]
+
+# Aliases this short are only matched as upper-case tokens ("US", "KSA"),
+# so words such as "us" or "can" in ordinary text don't trigger them.
+_SHORT = 3
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CODE = re.compile(r"\b[A-Z]{2,3}\b")
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Lower-cased, accent-free words of `text`, punctuation dropped."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return tuple(_WORD.findall(text.lower()))
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over word sequences (matches are whole words)."""
+
+    def __init__(self, patterns: Dict[Tuple[str, ...], int]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]  # (pattern length, value)
+        for pattern, value in patterns.items():
+            self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern: Tuple[str, ...], value: int) -> None:
+        node = 0
+        for word in pattern:
+            nxt = self._goto[node].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), value))
+
+    def _link(self) -> None:
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for word, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and word not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(word, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, words: Tuple[str, ...]) -> List[Tuple[int, int, int]]:
+        """All matches in `words` as (start, end, value) word offsets."""
+        matches = []
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, word in enumerate(words):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for length, value in out[node]:
+                matches.append((i + 1 - length, i + 1, value))
+        return matches
+
+
+class TeamIndex:
+    """Immutable snapshot of team names, codes and aliases."""
+
+    def __init__(self, teams: Iterable[dict]):
+        teams = list(teams)
+        self.teams: Dict[int, dict] = {t["id"]: {"id": t["id"], "name": t["name"]} for t in teams}
+        by_name = {tokenize(t["name"]): t_id for t_id, t in self.teams.items()}
+
+        words: Dict[Tuple[str, ...], int] = dict(by_name)
+        self._spellings: Dict[int, List[str]] = {t_id: [t["name"]] for t_id, t in self.teams.items()}
+        self._codes: Dict[str, int] = {}
+        for t in teams:
+            if t.get("country_code"):
+                self._codes[t["country_code"].upper()] = t["id"]
+        for group in ALIAS_GROUPS:
+            team_id = next((by_name[tokenize(a)] for a in group if tokenize(a) in by_name), None)
+            if team_id is None:
+                continue
+            for alias in group:
+                if len(alias) <= _SHORT and alias.isupper():
+                    self._codes.setdefault(alias, team_id)
+                else:
+                    words.setdefault(tokenize(alias), team_id)
+                if alias not in self._spellings[team_id]:
+                    self._spellings[team_id].append(alias)
+        self._matcher = AhoCorasick(words)
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def spellings(self, team_id: int) -> List[str]:
+        """The team's stored name followed by its known aliases, codes included ('USA')."""
+        return self._spellings.get(team_id, [])
+
+    def resolve(self, name: str) -> Optional[dict]:
+        """The team a free-text name refers to (exact name, alias or code)."""
+        found = self.detect(name)
+        return found[0] if found else None
+
+    def detect(self, query: str) -> List[dict]:
+        """Teams mentioned in `query`, in order of first mention."""
+        words = tokenize(query)
+        found = self._matcher.find(words)
+        # Leftmost-longest: "Northern Ireland" shouldn't also yield "Ireland".
+        found.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        hits: List[Tuple[int, int]] = []
+        covered = -1
+        for start, end, team_id in found:
+            if start >= covered:
+                hits.append((start, team_id))
+                covered = end
+        # Upper-case codes are checked on the raw text; their offsets are
+        # only used for ordering, so ranking them after word hits is fine.
+        for m in _CODE.finditer(query):
+            team_id = self._codes.get(m.group())
+            if team_id is not None:
+                hits.append((len(words) + m.start(), team_id))
+
+        seen, result = set(), []
+        for _, team_id in sorted(hits):
+            if team_id not in seen:
+                seen.add(team_id)
+                result.append(self.teams[team_id])
+        return result
+
+
+class TeamIndexHolder:
+    """Loads the index once, then refreshes it periodically in the background."""
+
+    def __init__(self, loader: Callable[[], Awaitable[List[dict]]], refresh_interval: float = 900.0):
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self.index: Optional[TeamIndex] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> TeamIndex:
+        rows = await self._loader()
+        self.index = TeamIndex(rows or [])
+        return self.index
+
+    async def get(self) -> TeamIndex:
+        if self.index is None:
+            async with self._lock:
+                if self.index is None:
+                    await self.refresh()
+        return self.index
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Team index refresh failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,26 @@
+"""
+Tests run against the local stand-ins (BACKEND_CLIENTS=stub), so no
+credentials or network are needed:
+
+    cd backend && python -m pytest
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("BACKEND_CLIENTS", "stub")
+os.environ.setdefault("WARMUP", "0")
+os.environ.setdefault("STUB_LATENCY_MS", "0")
+
+ADMIN_KEY = "test-admin-key"
+
+
+@pytest.fixture
+def admin_headers(monkeypatch):
+    """Configures an admin key and returns the headers the operator endpoints need."""
+    import deps
+    monkeypatch.setattr(deps, "_settings", deps.settings()._replace(admin_api_key=ADMIN_KEY))
+    return {"X-Admin-Key": ADMIN_KEY}
@@ -0,0 +1,69 @@
+"""Backtest history: tournaments come from the dataset's season column, odds from the saved pages."""
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pytest
+
+import backtest
+import odds_scraper
+from ml.dataset import append_partition
+from ml.evaluation import Candidate
+
+BACKEND = Path(__file__).resolve().parent.parent
+ODDS_PAGES = Path(__file__).parent / "fixtures" / "odds"
+CANDIDATE = Candidate("LogisticRegression", {"C": 1.0})
+
+# Euro 2020 teams on the saved page, with a few of the export's columns
+EURO_2020 = """team,goals,possession_pct,GA,Qualify
+Italy,2.6,53.1,0.4,1
+Turkey,0.3,44.0,2.7,0
+Wales,1.0,41.2,1.0,1
+Belgium,2.3,54.9,0.3,1
+Finland,0.3,37.5,1.0,0
+"""
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATASET_DIR", str(tmp_path / "datasets"))
+    append_partition(BACKEND / "Dataset_to_import_to_ML_Models", "wc-euro", directory=tmp_path / "datasets")
+    return tmp_path / "datasets"
+
+
+@pytest.fixture
+def odds_pages(tmp_path, monkeypatch):
+    monkeypatch.setenv("ODDS_CACHE_DIR", str(tmp_path / "odds"))
+    cache = odds_scraper.PageCache()
+    for key, source in odds_scraper.SOURCES.items():
+        cache.put(source.url, (ODDS_PAGES / f"{key.replace('-', '_')}.html").read_text(), httpx.Headers())
+
+
+def test_seasons_come_from_the_dataset(dataset_dir):
+    data, seasons = backtest.labelled_seasons()
+
+    assert len(seasons) == len(data.keys) == 56
+    assert dict(zip(*np.unique(seasons, return_counts=True))) == {"euro-2024": 24, "wc-2022": 32}
+
+
+def test_a_euro_2020_partition_is_replayed_first(dataset_dir, odds_pages, tmp_path):
+    (tmp_path / "euro2020.csv").write_text(EURO_2020)
+    append_partition(tmp_path / "euro2020.csv", "euro-2020", directory=dataset_dir)
+
+    history = backtest.load_history(candidate=CANDIDATE, offline=True)
+
+    assert history.snapshots == ["euro-2020", "wc-2022", "euro-2024"]
+    per_snapshot = dict(zip(history.snapshots, np.diff(history.bounds).tolist()))
+    assert per_snapshot == {"euro-2020": 5, "wc-2022": 6, "euro-2024": 5}
+    lo, hi = history.bounds[:2]
+    assert sorted(history.teams[lo:hi]) == ["Belgium", "Finland", "Italy", "Turkey", "Wales"]
+    assert history.outcome[lo:hi].tolist() == [1, 0, 1, 1, 0]   # page order: Italy ... Finland
+    assert ((history.model >= 0) & (history.model <= 1)).all()
+
+
+def test_seasons_without_an_odds_source_are_rejected(dataset_dir, tmp_path):
+    (tmp_path / "old.csv").write_text(EURO_2020)
+    append_partition(tmp_path / "old.csv", "euro-2016-export", directory=dataset_dir)
+
+    with pytest.raises(ValueError, match="No odds source for euro-2016-export"):
+        backtest.load_history(candidate=CANDIDATE, offline=True)
@@ -0,0 +1,113 @@
+"""Who may place bets, read them and settle matches."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import deps
+from repository import SupabaseRepository
+from stubs import PostgrestStub, demo_tables
+
+USER = "7d1e4c2a-0000-4000-8000-000000000001"
+OTHER = "7d1e4c2a-0000-4000-8000-000000000002"
+ADMIN_KEY = "test-admin-key"
+
+
+def place_bet(tables, args):
+    return {"id": 1, **{k[len("p_"):]: v for k, v in args.items()}, "result": "pending"}
+
+
+def settle_match(tables, args):
+    return [{"match_id": args["p_match_id"], "settled": 0, "won": 0, "lost": 0, "paid_out": 0}]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(deps, "_settings", deps.settings()._replace(admin_api_key=ADMIN_KEY))
+    tables = demo_tables()
+    tables["bets"] = [{"id": i, **bet(user), "result": "pending"} for i, user in enumerate([USER, OTHER, USER], 1)]
+    stub = PostgrestStub(tables, rpcs={"place_bet": place_bet, "settle_match": settle_match}, latency=0)
+    deps.repo.override(SupabaseRepository("http://stub.local", "stub", transport=stub))
+    with TestClient(api.app) as c:
+        yield c
+
+
+def bet(user_id=USER):
+    return {"user_id": user_id, "match_id": 1, "bet_type": "team_winner", "bet_on": "Mexico",
+            "odds": 2.1, "amount": 10}
+
+
+def signed_in(user_id=USER):
+    return {"Authorization": f"Bearer stub:{user_id}"}
+
+
+def test_bet_needs_a_signed_in_user(client):
+    resp = client.post("/bets", json=bet())
+    assert resp.status_code == 401
+    assert resp.headers["www-authenticate"] == "Bearer"
+
+    assert client.post("/bets", json=bet(), headers={"Authorization": "Bearer forged"}).status_code == 401
+
+
+def test_bet_for_another_user_is_forbidden(client):
+    assert client.post("/bets", json=bet(OTHER), headers=signed_in(USER)).status_code == 403
+
+
+def test_bettor_can_place_their_own_bet(client):
+    resp = client.post("/bets", json=bet(), headers=signed_in(USER))
+    assert resp.status_code == 201
+    assert resp.json()["user_id"] == USER
+
+
+def test_results_need_the_admin_key(client):
+    result = {"match_id": 1, "score_team1": 2, "score_team2": 1}
+
+    assert client.post("/results", json=result).status_code == 401
+    assert client.post("/results", json=result, headers={"X-Admin-Key": "guess"}).status_code == 401
+    # A signed-in bettor is not an operator
+    assert client.post("/results", json=result, headers=signed_in()).status_code == 401
+
+    resp = client.post("/results", json=result, headers={"X-Admin-Key": ADMIN_KEY})
+    assert resp.status_code == 200
+    assert resp.json()["match_id"] == 1
+
+
+def test_results_are_closed_without_a_configured_key(client, monkeypatch):
+    monkeypatch.setattr(deps, "_settings", deps.settings()._replace(admin_api_key=""))
+    resp = client.post("/results", json={"match_id": 1, "score_team1": 0, "score_team2": 0},
+                       headers={"X-Admin-Key": ""})
+    assert resp.status_code == 403
+
+
+def test_user_bets_are_the_signed_in_users_own(client):
+    assert client.get("/user_bets").status_code == 401
+    # The user is taken from the token, not from a query parameter
+    resp = client.get("/user_bets", params={"user_id": OTHER}, headers=signed_in(USER))
+
+    assert resp.status_code == 200
+    assert [b["id"] for b in resp.json()] == [1, 3]
+    assert [b["id"] for b in client.get("/user_bets", headers=signed_in(OTHER)).json()] == [2]
+
+
+def test_betting_functions_run_with_the_service_key():
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers["apikey"], request.headers["authorization"]))
+        return httpx.Response(200, json=[])
+
+    async def run():
+        repo = SupabaseRepository("http://db.local", "anon", service_key="service",
+                                  transport=httpx.MockTransport(handler))
+        try:
+            await repo.select("bets")
+            await repo.rpc("settle_match", {"p_match_id": 1})
+        finally:
+            await repo.aclose()
+
+    asyncio.run(run())
+
+    assert seen == [("/rest/v1/bets", "anon", "Bearer anon"),
+                    ("/rest/v1/rpc/settle_match", "service", "Bearer service")]
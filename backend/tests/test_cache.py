@@ -0,0 +1,107 @@
+"""Read-through cache: TTLs, LRU bounds, tag invalidation and shared loads."""
+import asyncio
+import threading
+import time
+
+from cache import TTLCache
+
+
+def test_hit_after_miss_and_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttls={"teams": 10.0, "valuebets": 2.0})
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get_or_load("k", load, tags=["teams", "valuebets"]) == 1
+    assert cache.get_or_load("k", load, tags=["teams", "valuebets"]) == 1
+    now[0] += 2.0   # the shortest TTL of the entry's tables applies
+    assert cache.get_or_load("k", load, tags=["teams", "valuebets"]) == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert cache.ttl_for(["unknown"]) == cache.default_ttl
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.get_or_load("a", lambda: "A")
+    cache.get_or_load("b", lambda: "B")
+    cache.get_or_load("a", lambda: "stale")   # a is now the most recent
+    cache.get_or_load("c", lambda: "C")
+
+    assert cache.get_or_load("a", lambda: "reloaded") == "A"
+    assert cache.get_or_load("b", lambda: "reloaded") == "reloaded"
+    assert cache.evictions == 2
+
+
+def test_invalidate_drops_tagged_entries_and_bumps_the_version():
+    cache = TTLCache()
+    cache.get_or_load("teams", lambda: 1, tags=["teams"])
+    cache.get_or_load("cards", lambda: 2, tags=["matches", "teams"])
+    cache.get_or_load("odds", lambda: 3, tags=["qualifying_odds"])
+
+    assert cache.invalidate("teams") == 2
+    assert cache.version("teams") == 1 and cache.version("matches") == 0
+    assert cache.stats()["size"] == 1
+    assert cache.get_or_load("odds", lambda: "reloaded") == 3
+
+
+def test_a_write_during_a_load_is_not_cached_over():
+    cache = TTLCache()
+
+    def load():
+        cache.invalidate("matches")   # a write lands while the old rows are in flight
+        return "old rows"
+
+    assert cache.get_or_load("matches", load, tags=["matches"]) == "old rows"
+    assert cache.get_or_load("matches", lambda: "new rows", tags=["matches"]) == "new rows"
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "rows"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", load)))
+               for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == ["rows"] * 4
+    assert len(calls) == 1
+
+
+def test_async_loads_are_shared_and_store_if_skips_caching():
+    cache = TTLCache()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return list(range(len(calls) - 1))
+
+    async def run():
+        # The first load returns [], which store_if rejects, so one waiter loads again
+        shared = await asyncio.gather(*(cache.get_or_load_async("k", load, store_if=bool) for _ in range(3)))
+        return shared, [await cache.get_or_load_async("k", load, store_if=bool) for _ in range(2)]
+
+    shared, after = asyncio.run(run())
+
+    assert shared == [[], [0], [0]]
+    assert after == [[0], [0]]
+    assert len(calls) == 2
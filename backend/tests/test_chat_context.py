@@ -0,0 +1,50 @@
+"""Chat context sources: concurrency, per-source timeouts and the shared deadline."""
+import asyncio
+import time
+
+from chat_context import ContextSource, Deadline, SourceTiming, format_timings, gather_sources
+
+
+def source(name, value=None, delay=0.0, error=None):
+    async def fetch():
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return value
+    return ContextSource(name, fetch)
+
+
+def test_slow_and_failing_sources_are_left_out():
+    sources = [source("teams", [{"id": 1}]), source("odds", [], delay=0.01),
+               source("stats", [{"Gls": 3}], delay=1.0), source("matches", error=RuntimeError("down"))]
+
+    async def run():
+        start = time.perf_counter()
+        out = await gather_sources(sources, Deadline(5.0), timeout=0.1)
+        return out, time.perf_counter() - start
+
+    (results, timings), elapsed = asyncio.run(run())
+
+    assert results == {"teams": [{"id": 1}], "odds": [], "stats": None, "matches": None}
+    assert {t.name: t.status for t in timings} == {"teams": "ok", "odds": "empty", "stats": "timeout",
+                                                   "matches": "error"}
+    assert elapsed < 0.5   # sources run side by side, each capped by the timeout
+
+
+def test_the_deadline_caps_the_timeout_and_skips_when_spent():
+    async def run():
+        short = await gather_sources([source("stats", 1, delay=1.0)], Deadline(0.05), timeout=5.0)
+        spent = await gather_sources([source("teams", 1)], Deadline(0.0))
+        return short, spent
+
+    (short, _), (spent, spent_timings) = asyncio.run(run())
+
+    assert short == {"stats": None}
+    assert spent == {"teams": None}
+    assert spent_timings == [SourceTiming("teams", 0.0, "skipped")]
+
+
+def test_format_timings_lists_the_slowest_first():
+    timings = [SourceTiming("teams", 2.4, "ok"), SourceTiming("stats", 101.0, "timeout")]
+
+    assert format_timings(timings) == "stats=101ms(timeout), teams=2ms(ok)"
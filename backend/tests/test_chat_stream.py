@@ -0,0 +1,146 @@
+"""/chat/stream driven by a fake answer generator in place of Gemini."""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+def parse_sse(body: str):
+    """[(event, data)] from an SSE body; event is None for plain data messages."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = None, None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+
+class FakeAnswer:
+    """Stands in for `gemini_stream`: yields `chunks`, then optionally fails."""
+
+    def __init__(self, chunks, fail_after=None, delay=0.0):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.delay = delay
+        self.prompts = []
+        self.sent = 0
+        self.closed = False
+
+    async def __call__(self, contents: str):
+        self.prompts.append(contents)
+        try:
+            for i, text in enumerate(self.chunks):
+                if i == self.fail_after:
+                    raise RuntimeError("upstream went away")
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                self.sent += 1
+                yield text
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def fake_answer(monkeypatch):
+    def install(*args, **kwargs):
+        fake = FakeAnswer(*args, **kwargs)
+        monkeypatch.setattr(api, "answer_stream", fake)
+        return fake
+    return install
+
+
+@pytest.fixture
+def client():
+    with TestClient(api.app) as c:
+        yield c
+
+
+def test_stream_emits_token_events_then_done(client, fake_answer):
+    fake = fake_answer(["Argentina ", "should ", "qualify."])
+
+    resp = client.post("/chat/stream", json={"query": "Will Argentina qualify?"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.headers["x-accel-buffering"] == "no"
+    events = parse_sse(resp.text)
+    assert events[:3] == [(None, {"text": "Argentina "}), (None, {"text": "should "}),
+                          (None, {"text": "qualify."})]
+    event, data = events[-1]
+    assert event == "done"
+    assert set(data) == {"ttft_ms", "total_ms"}
+    assert 0 <= data["ttft_ms"] <= data["total_ms"]
+    assert len(events) == 4
+    # The prompt carries the assembled context and the user's question
+    assert "User: will argentina qualify?" in fake.prompts[0]
+    assert fake.closed
+
+
+def test_stream_without_chunks_still_finishes(client, fake_answer):
+    fake_answer([])
+
+    events = parse_sse(client.post("/chat/stream", json={"query": "hello"}).text)
+
+    assert [e for e, _ in events] == ["done"]
+    assert events[0][1]["ttft_ms"] == events[0][1]["total_ms"]
+
+
+def test_error_midway_ends_with_error_event(client, fake_answer):
+    fake = fake_answer(["partial ", "never sent"], fail_after=1)
+
+    resp = client.post("/chat/stream", json={"query": "who wins the tournament"})
+
+    assert resp.status_code == 200   # headers were already sent
+    events = parse_sse(resp.text)
+    assert events == [(None, {"text": "partial "}), ("error", {"detail": "AI Service Unavailable"})]
+    assert fake.closed
+
+
+def test_invalid_request_is_rejected_before_streaming(client, fake_answer):
+    fake = fake_answer(["unused"])
+
+    assert client.post("/chat/stream", json={"query": ""}).status_code == 422
+    assert fake.prompts == []
+
+
+def test_client_disconnect_stops_the_generator(fake_answer):
+    fake = fake_answer([f"chunk {i} " for i in range(1000)], delay=0.005)
+
+    async def run():
+        first_chunk = asyncio.Event()
+        sent = []
+        body = json.dumps({"query": "hello"}).encode()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await first_chunk.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body" and b"chunk" in message.get("body", b""):
+                first_chunk.set()
+
+        scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+                 "method": "POST", "scheme": "http", "path": "/chat/stream", "raw_path": b"/chat/stream",
+                 "root_path": "", "query_string": b"", "headers": [(b"content-type", b"application/json")],
+                 "client": ("test", 1), "server": ("test", 80)}
+        await asyncio.wait_for(api.app(scope, receive, send), timeout=5)
+        return sent
+
+    sent = asyncio.run(run())
+
+    assert sent[0]["status"] == 200
+    assert fake.closed
+    assert 0 < fake.sent < len(fake.chunks)
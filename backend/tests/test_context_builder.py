@@ -0,0 +1,67 @@
+"""Prompt context: column ranking, compact rows and the token budget."""
+from pathlib import Path
+
+import pandas as pd
+
+from context_builder import Section, build_context, estimate_tokens, format_report, rank_columns, render_rows
+from ml.dataset import append_partition, load_dataset
+from ml.importance import aggregate, top_feature_rows
+
+BACKEND = Path(__file__).resolve().parent.parent
+STATS_COLUMNS = ["Squad", "Gls", "Save%", "PSxG/SoT", "Cmp%", "G+A", "long_passes_>30m", "PSxG+/-", "xG"]
+
+
+def test_stats_headers_match_normalized_feature_names():
+    columns = ["Squad", "Gls", "PSxG/SoT", "Cmp%", "long_passes_>30m", "Save%", "G+A", "xG"]
+
+    ranked = rank_columns(columns, ["psxg_per_sot", "save_pct", "g_plus_a", "long_passes_gt30m"], limit=4)
+
+    assert ranked == ["Squad", "PSxG/SoT", "Save%", "G+A", "long_passes_>30m"]
+
+
+def test_top_features_round_trip_to_stats_headers(tmp_path):
+    append_partition(BACKEND / "Dataset_to_import_to_ML_Models", "wc-euro", directory=tmp_path)
+    dataset = load_dataset(directory=tmp_path)
+    source = dict(zip(dataset.sources, dataset.features))
+    order = ["PSxG/SoT", "Cmp%", "long_passes_>30m", "PSxG+/-"]
+    importance = pd.Series(0.0, index=dataset.features)
+    importance[[source[h] for h in order]] = [0.4, 0.3, 0.2, 0.1]
+
+    rows = top_feature_rows(aggregate({"m1": importance, "m2": importance}), "m1", n=len(order))
+    ranked = rank_columns(STATS_COLUMNS, [r["feature_name"] for r in rows], limit=len(order))
+
+    assert [r["feature_name"] for r in rows] == [source[h] for h in order]
+    assert ranked == ["Squad"] + order
+
+
+def test_rows_render_as_a_compact_table():
+    rows = [{"Squad": "Mexico", "xG": 1.23456, "note": "a|b\nc"}, {"Squad": "Canada", "xG": None}]
+
+    assert render_rows(rows, ["Squad", "xG", "note"]) == ["Squad|xG|note", "Mexico|1.235|a/b c", "Canada||"]
+
+
+def test_stats_sections_drop_bookkeeping_and_cap_columns():
+    row = {"id": 1, "created_at": "2025-01-01", "Squad": "Mexico", **{f"c{i}": i for i in range(15)}}
+
+    built = build_context("Q", [Section("stats", "Stats", 0, [row])], features=["c14"])
+
+    header = built.text.splitlines()[2]
+    assert header.split("|") == ["Squad", "c14"] + [f"c{i}" for i in range(11)]
+
+
+def test_sections_fill_the_budget_by_priority():
+    matches = Section("matches", "Matches", 1, [{"team": f"Team {i}", "goals": i} for i in range(40)],
+                      columns=["team", "goals"])
+    odds = Section("odds", "Odds", 0, text="Mexico +150")
+    notes = Section("notes", "Notes", 2, text="x" * 400)
+
+    built = build_context("Header", [matches, odds, notes], budget=80)
+
+    assert [(r.name, r.status) for r in built.report] == \
+        [("odds", "full"), ("matches", "truncated"), ("notes", "dropped")]
+    kept = built.report[1].rows
+    assert 0 < kept < 40 and f"(+{40 - kept} more rows omitted)" in built.text
+    # Output keeps the caller's order, and the estimate stays within budget
+    assert built.text.index("Matches:") < built.text.index("Odds:")
+    assert built.tokens == estimate_tokens(built.text) <= 80
+    assert format_report(built).startswith(f"~{built.tokens} tokens: odds=")
@@ -0,0 +1,85 @@
+"""Training dataset build: validation, partitions and the tournament of each row."""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ml.dataset import SchemaError, append_partition, load_dataset, read_manifest
+
+BACKEND = Path(__file__).resolve().parent.parent
+EXPORT = BACKEND / "Dataset_to_import_to_ML_Models"
+
+
+def write_csv(path: Path, header, rows) -> Path:
+    path.write_text("\n".join(",".join(map(str, r)) for r in [header, *rows]) + "\n")
+    return path
+
+
+def test_checked_in_export_records_each_rows_tournament(tmp_path):
+    append_partition(EXPORT, "wc-euro", directory=tmp_path)
+
+    data = load_dataset(directory=tmp_path)
+
+    assert read_manifest(directory=tmp_path)["partitions"][0]["seasons"] == {"wc-2022": 32, "euro-2024": 24}
+    assert data.seasons[data.keys.index("Wales")] == "wc-2022"
+    assert data.seasons[data.keys.index("Albania")] == "euro-2024"
+    assert "season" not in data.features
+
+
+def test_rows_without_a_season_column_take_the_partitions(tmp_path):
+    header = ["team", "Gls", "Qualify"]
+    write_csv(tmp_path / "euro2020.csv", header, [["Italy", 2.6, 1], ["Turkey", 0.3, 0]])
+    write_csv(tmp_path / "quals.csv", header, [["Mexico", 1.5, ""]])
+
+    append_partition(tmp_path / "euro2020.csv", "euro-2020-export", directory=tmp_path, season="euro-2020")
+    append_partition(tmp_path / "quals.csv", "wc-2026-quals", directory=tmp_path)
+    data = load_dataset(directory=tmp_path)
+
+    assert data.seasons == ["euro-2020", "euro-2020", "wc-2026-quals"]
+    # Unlabelled rows are dropped with their season
+    assert data.labelled().seasons == ["euro-2020", "euro-2020"]
+    assert np.array_equal(data.labelled().y, [1, 0])
+
+
+def test_blank_season_cell_falls_back_to_the_partition_season(tmp_path):
+    write_csv(tmp_path / "mixed.csv", ["team", "Gls", "Qualify", "season"],
+              [["Italy", 2.6, 1, "euro-2020"], ["Qatar", 0.3, 0, ""]])
+
+    append_partition(tmp_path / "mixed.csv", "mixed", directory=tmp_path, season="wc-2022")
+
+    assert load_dataset(directory=tmp_path).seasons == ["euro-2020", "wc-2022"]
+
+
+def test_partitions_built_before_seasons_were_recorded(tmp_path):
+    write_csv(tmp_path / "old.csv", ["team", "Gls", "Qualify"], [["Spain", 1.0, 1]])
+    append_partition(tmp_path / "old.csv", "wc-2022", directory=tmp_path)
+    manifest_path = tmp_path / "qualify" / "manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    (tmp_path / "qualify" / "wc-2022" / "seasons.json").unlink()
+    del manifest["partitions"][0]["files"]["seasons.json"]
+    manifest_path.write_text(json.dumps(manifest))
+
+    assert load_dataset(directory=tmp_path, verify=True).seasons == ["wc-2022"]
+
+
+def test_invalid_values_are_reported(tmp_path):
+    write_csv(tmp_path / "bad.csv", ["team", "Gls", "Qualify"], [["Spain", "n/a", 1], ["Italy", 1.0, 2]])
+
+    with pytest.raises(SchemaError, match="2 invalid values"):
+        append_partition(tmp_path / "bad.csv", "bad", directory=tmp_path)
+
+
+def test_module_runs_without_a_runpy_warning(tmp_path):
+    csv_path = write_csv(tmp_path / "one.csv", ["team", "Gls", "Qualify"], [["Spain", 1.0, 1]])
+
+    result = subprocess.run([sys.executable, "-W", "error::RuntimeWarning", "-m", "ml.dataset", str(csv_path),
+                             "--partition", "euro-2024"],
+                            cwd=BACKEND, env={"DATASET_DIR": str(tmp_path), "PATH": ""},
+                            capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ""
+    assert "qualify: 1 partitions, 1 rows, 1 features" in result.stdout
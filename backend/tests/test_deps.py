@@ -0,0 +1,70 @@
+"""Client providers, settings and the app lifespan."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import api
+import deps
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_lifespan_can_restart():
+    for _ in range(2):
+        with TestClient(api.app) as client:
+            assert client.get("/teams", params={"limit": 1}).status_code == 200
+        assert not deps.repo.built   # closed and dropped on shutdown
+
+
+def test_override_replaces_the_client():
+    sentinel = object()
+    provider = deps.Provider("fake", lambda: sentinel)
+    assert provider.get() is sentinel
+    other = object()
+    provider.override(other)
+    assert provider.get() is other
+    provider.override(None)
+    assert provider.get() is sentinel
+
+
+def test_importing_the_app_reads_no_environment_files():
+    script = (
+        "import dotenv\n"
+        "calls = []\n"
+        "dotenv.load_dotenv = lambda *a, **k: calls.append(1)\n"
+        "import api, deps\n"
+        "assert calls == [], 'load_dotenv ran at import'\n"
+        "deps.settings()\n"
+        "assert calls == [1]\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_values_from_env_files_apply_after_import(tmp_path):
+    # A .env is loaded by deps.settings(), after every module has been imported
+    env_file = {"CHAT_CONTEXT_TOKENS": "123", "CHAT_CONTEXT_BUDGET": "0.5", "CHAT_SOURCE_TIMEOUT": "0.25",
+                "MODEL_ARTIFACT_DIR": str(tmp_path / "artifacts"), "MODEL_CACHE_DIR": str(tmp_path / "folds"),
+                "DATASET_DIR": str(tmp_path / "datasets"), "ODDS_CACHE_DIR": str(tmp_path / "odds"),
+                "API_FOOTBALL_CACHE_DIR": str(tmp_path / "api_football"), "BACKTEST_DIR": str(tmp_path / "bt")}
+    script = (
+        "import os, dotenv\n"
+        f"dotenv.load_dotenv = lambda *a, **k: os.environ.update({env_file!r})\n"
+        "import api, backtest, deps, fixtures_ingest, odds_scraper\n"
+        "from ml import artifacts, dataset, evaluation\n"
+        "s = deps.settings()\n"
+        "print(s.chat_context_tokens, s.chat_context_budget, s.chat_source_timeout)\n"
+        "for d in (artifacts.artifact_dir(), evaluation.fold_cache_dir(), dataset.dataset_dir(),\n"
+        "          odds_scraper.PageCache().directory, fixtures_ingest.ResponseCache().directory,\n"
+        "          backtest.backtest_dir()):\n"
+        "    print(d.name)\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k not in env_file}
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split("\n")[:-1] == ["123 0.5 0.25", "artifacts", "folds", "datasets", "odds",
+                                              "api_football", "bt"]
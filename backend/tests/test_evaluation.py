@@ -0,0 +1,96 @@
+"""Model evaluation: candidates, shared splits, fold caching and feature importances."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml import evaluation
+from ml.evaluation import HOLDOUT, Candidate, candidates, evaluate, splits, top_features, write_results
+
+SPACE = {"LogisticRegression": {"C": [0.1, 1.0]}}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(80, 3)), columns=["xg", "noise", "possession_pct"])
+    y = pd.Series((X["xg"] + 0.5 * X["possession_pct"] + rng.normal(scale=0.5, size=80) > 0).astype(int))
+    return X, y
+
+
+def test_candidates_grid_and_random():
+    grid = candidates({"RandomForest": {"max_depth": [None, 4], "min_samples_leaf": [1, 3]}})
+    drawn = candidates(evaluation.search_space(), search="random", n_iter=3)
+
+    assert len(grid) == 4 and grid[0] == Candidate("RandomForest", {"max_depth": None, "min_samples_leaf": 1})
+    assert [c.name for c in drawn] == ["LogisticRegression"] * 3 + ["RandomForest"] * 3 + ["GradientBoosting"] * 3
+    assert Candidate("LogisticRegression", {"C": 1.0}).label == 'LogisticRegression{"C": 1.0}'
+    with pytest.raises(ValueError, match="Unknown model: SVM"):
+        candidates({"SVM": {}})
+    with pytest.raises(ValueError, match="Unknown search: bayes"):
+        candidates(SPACE, search="bayes")
+
+
+def test_splits_are_the_holdout_then_stratified_folds():
+    y = np.array([0, 1] * 20)
+
+    folds = splits(y, cv=4, test_size=0.25)
+
+    assert [f for f, _, _ in folds] == [HOLDOUT, "cv0", "cv1", "cv2", "cv3"]
+    _, train, test = folds[0]
+    assert len(test) == 10 and not set(train) & set(test) and y[test].mean() == 0.5
+    assert sorted(np.concatenate([te for _, _, te in folds[1:]]).tolist()) == list(range(40))
+
+
+def test_evaluate_ranks_candidates_and_reuses_cached_fits(data, tmp_path, monkeypatch):
+    X, y = data
+
+    results = evaluate(X, y, SPACE, cv=3, n_jobs=1, cache_dir=tmp_path)
+
+    assert list(results.table.columns) == ["model", "params", "test_accuracy", "test_roc_auc",
+                                           "cv_mean_roc_auc", "cv_std_roc_auc", "fit_seconds"]
+    assert results.table["cv_mean_roc_auc"].is_monotonic_decreasing
+    assert results.best.label == results.table.index[0]
+    assert results.best_model is results.models[results.best.label]
+    assert len(list(tmp_path.glob("*.joblib"))) == 2 * 4
+
+    # A second run with one more candidate fits only the new one
+    fitted = []
+    real = evaluation.ESTIMATORS["LogisticRegression"]
+    monkeypatch.setitem(evaluation.ESTIMATORS, "LogisticRegression", lambda **p: fitted.append(p) or real(**p))
+    again = evaluate(X, y, {"LogisticRegression": {"C": [0.1, 1.0, 10.0]}}, cv=3, n_jobs=1, cache_dir=tmp_path)
+
+    assert fitted == [{"C": 10.0}] * 4
+    pd.testing.assert_series_equal(again.table.loc[results.table.index, "test_roc_auc"],
+                                   results.table["test_roc_auc"])
+
+
+def test_evaluate_without_cache_writes_nothing(data, tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_CACHE_DIR", str(tmp_path / "folds"))
+
+    evaluate(*data, SPACE, cv=3, n_jobs=1, cache=False)
+
+    assert not (tmp_path / "folds").exists()
+
+
+def test_write_results(data, tmp_path):
+    results = evaluate(*data, SPACE, cv=3, n_jobs=1, cache=False)
+
+    path = write_results(results, tmp_path)
+
+    records = json.loads(path.read_text())
+    assert [r["candidate"] for r in records] == list(results.table.index)
+    assert (tmp_path / "results.csv").exists()
+
+
+def test_top_features_from_coefficients_and_importances(data):
+    X, y = data
+    linear = evaluation.ESTIMATORS["LogisticRegression"]().fit(X, y)
+    forest = evaluation.ESTIMATORS["RandomForest"](n_estimators=50).fit(X, y)
+
+    assert top_features(linear, list(X.columns), n=2) == [{"feature_name": "xg", "ranking": 1},
+                                                         {"feature_name": "possession_pct", "ranking": 2}]
+    assert top_features(forest, list(X.columns))[0] == {"feature_name": "xg", "ranking": 1}
+    with pytest.raises(ValueError, match="has no feature importances"):
+        top_features(object(), ["xg"])
@@ -0,0 +1,105 @@
+"""Team x feature matrix: joining the stats tables, selecting from it and keeping it current."""
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api
+from feature_matrix import FeatureMatrix, FeatureMatrixStore, build_block
+from stats import STATS_TABLES
+from team_index import TeamIndex
+
+TEAMS = [{"id": 1, "name": "Mexico"}, {"id": 2, "name": "Canada"}, {"id": 3, "name": "United States"}]
+INDEX = TeamIndex(TEAMS)
+SHOOTING = STATS_TABLES["shooting"]   # keyed by team_id, named by Squad
+PASSING = STATS_TABLES["passing"]     # no team_id column
+
+
+def matrix():
+    shooting = build_block(SHOOTING, [
+        {"team_id": 1, "Squad": "Mexico", "Gls": 12, "SoT/90": "4.5", "Min": "n/a"},
+        {"team_id": 3, "Squad": "United States", "Gls": 9, "SoT/90": None},
+    ], INDEX, [1, 2, 3])
+    passing = build_block(PASSING, [{"team": "USA", "Cmp%": "81.5%", "Att": "1,234"}], INDEX, [1, 2, 3])
+    return FeatureMatrix(TEAMS, {"shooting": shooting, "passing": passing})
+
+
+def test_blocks_join_on_team_id_or_name():
+    m = matrix()
+
+    assert m.columns == ["shooting.Gls", "shooting.SoT/90", "passing.Cmp%", "passing.Att"]
+    assert m.features(1, "shooting") == {"Gls": 12.0, "SoT/90": 4.5}   # the text-only Min is dropped
+    # "USA" resolves through the alias table; percent signs and separators are parsed
+    assert m.features(3, "passing") == {"Cmp%": 81.5, "Att": 1234.0}
+    assert m.features(3, "shooting") == {"Gls": 9.0, "SoT/90": None}
+    assert m.features(2, "shooting") is None
+
+
+def test_select_by_team_and_column():
+    m = matrix()
+
+    out = m.select([3, 1], ["shooting.Gls", "passing"])
+
+    assert np.array_equal(out, [[9.0, 81.5, 1234.0], [12.0, np.nan, np.nan]], equal_nan=True)
+
+
+def test_select_unknown_or_no_teams():
+    m = matrix()
+
+    assert np.isnan(m.select([999, 1])[0]).all()
+    assert m.select([]).shape == (0, 4)
+    assert m.select([], ["shooting"]).shape == (0, 2)
+    assert FeatureMatrix([], {}).select([1]).shape == (1, 0)
+
+
+def test_with_block_replaces_one_category():
+    m = matrix()
+    passing = build_block(PASSING, [{"team": "Canada", "Cmp%": 77.0}], INDEX, [1, 2, 3])
+
+    updated = m.with_block("passing", passing)
+
+    assert updated.features(2, "passing") == {"Cmp%": 77.0}
+    assert updated.features(1, "shooting") == m.features(1, "shooting")
+    assert m.features(2, "passing") is None
+
+
+def test_store_rebuilds_only_stale_tables():
+    versions = {}
+    fetched = []
+    rows = {spec.table: [] for spec in STATS_TABLES.values()}
+    rows[SHOOTING.table] = [{"team_id": 1, "Squad": "Mexico", "Gls": 3}]
+
+    async def fetch(table):
+        fetched.append(table)
+        return rows[table]
+
+    async def index():
+        return INDEX
+
+    async def run():
+        store = FeatureMatrixStore(fetch, index, version=lambda t: versions.get(t, 0))
+        first = await store.get()
+        assert await store.get() is first
+        rows[SHOOTING.table] = [{"team_id": 1, "Squad": "Mexico", "Gls": 4}]
+        versions[SHOOTING.table] = 1
+        return first, await store.get()
+
+    first, second = asyncio.run(run())
+
+    assert first.features(1, "shooting") == {"Gls": 3.0}
+    assert second.features(1, "shooting") == {"Gls": 4.0}
+    assert fetched == [spec.table for spec in STATS_TABLES.values()] + [SHOOTING.table]
+
+
+def test_features_endpoint_with_unknown_teams():
+    with TestClient(api.app) as client:
+        by_name = client.get("/features", params={"teams": "Atlantis"})
+        by_id = client.get("/features", params={"team_ids": "999", "columns": "shooting"})
+        known = client.get("/features", params={"team_ids": "999,1"})
+
+    assert by_name.status_code == 200
+    assert by_name.json()["teams"] == []
+    assert by_id.status_code == 200
+    assert by_id.json() == {"columns": [c for c in known.json()["columns"] if c.startswith("shooting.")],
+                            "teams": []}
+    assert [t["team_id"] for t in known.json()["teams"]] == [1]
@@ -0,0 +1,199 @@
+"""API-Football fixtures: mapping a saved /fixtures response and loading it into teams and matches."""
+import asyncio
+import copy
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import fixtures_ingest
+from fixtures_ingest import ResponseCache, classify_stage, fetch_fixtures, ingest, match_row, opponents_by_round
+from team_index import TeamIndex
+
+# 2022 World Cup, /fixtures?league=1&season=2022, trimmed to a dozen fixtures
+PAYLOAD = json.loads((Path(__file__).parent / "fixtures" / "api_football" /
+                      "fixtures_league1_season2022.json").read_text())
+FIXTURES = PAYLOAD["response"]
+KNOWN_TEAMS = ["Qatar", "Ecuador", "Senegal", "Netherlands", "United States", "England",
+               "Argentina", "France", "Croatia"]   # no Morocco
+
+
+def fixture(round_name: str, home: str) -> dict:
+    return next(f for f in FIXTURES if f["league"]["round"] == round_name and f["teams"]["home"]["name"] == home)
+
+
+class FakeRepository:
+    """In-memory `insert` / `upsert` with PostgREST's returning and on_conflict behaviour."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = []
+
+    def _store(self, table, row):
+        rows = self.tables.setdefault(table, [])
+        new = {"id": max((r["id"] for r in rows), default=0) + 1, **row}
+        rows.append(new)
+        return new
+
+    async def insert(self, table, rows):
+        self.calls.append(("insert", table, len(rows)))
+        return [dict(self._store(table, r)) for r in rows]
+
+    async def upsert(self, table, rows, *, on_conflict=None, returning=False):
+        self.calls.append(("upsert", table, len(rows)))
+        written = []
+        for row in rows:
+            existing = next((r for r in self.tables.setdefault(table, []) if r[on_conflict] == row[on_conflict]), None)
+            if existing is not None:
+                existing.update(row)
+            else:
+                existing = self._store(table, row)
+            written.append(dict(existing))
+        return written if returning else []
+
+
+def new_repo():
+    return FakeRepository({"teams": [{"id": i, "name": n} for i, n in enumerate(KNOWN_TEAMS, 1)]})
+
+
+def run_ingest(repo, fixtures=FIXTURES, **kwargs):
+    return asyncio.run(ingest(repo, TeamIndex(repo.tables["teams"]), fixtures, **kwargs))
+
+
+# --- Mapping ---
+
+@pytest.mark.parametrize("round_name, stage", [
+    ("Group Stage - 1", "Group"), ("Group Stage - 3", "Group"),
+    ("Round of 32", "RO32"), ("Round of 16", "RO16"),
+    ("Quarter-finals", "Quarterfinals"), ("Semi-finals", "Semifinals"), ("Final", "Final"),
+    ("3rd Place Final", None), ("Third place play-off", None), ("", None), (None, None),
+])
+def test_classify_stage(round_name, stage):
+    assert classify_stage(round_name) == stage
+
+
+def test_every_saved_round_is_classified():
+    rounds = {f["league"]["round"] for f in FIXTURES}
+    assert {r: classify_stage(r) for r in rounds} == {
+        "Group Stage - 1": "Group", "Group Stage - 2": "Group", "Group Stage - 3": "Group",
+        "Round of 16": "RO16", "Quarter-finals": "Quarterfinals", "Semi-finals": "Semifinals",
+        "3rd Place Final": None, "Final": "Final",
+    }
+
+
+def test_match_row_for_a_finished_group_match():
+    ids = {"Qatar": 1, "Ecuador": 2}
+    assert match_row(fixture("Group Stage - 1", "Qatar"), ids) == {
+        "api_ref": "855734", "team1_id": 1, "team2_id": 2,
+        "match_date": "2022-11-20T16:00:00+00:00",
+        "score_team1": 0, "score_team2": 2, "status": "finished",
+        "stage": "Group", "venue": "Al Bayt Stadium, Al Khor",
+    }
+
+
+def test_match_row_after_penalties_keeps_the_regulation_score():
+    row = match_row(fixture("Final", "Argentina"), {"Argentina": 7, "France": 8})
+    assert (row["score_team1"], row["score_team2"], row["status"], row["stage"]) == (3, 3, "finished", "Final")
+
+
+def test_match_row_unclassified_round_keeps_its_name():
+    assert match_row(fixture("3rd Place Final", "Croatia"), {"Croatia": 9, "Morocco": 10})["stage"] == \
+        "3rd Place Final"
+
+
+@pytest.mark.parametrize("short, status", [("NS", "upcoming"), ("TBD", "upcoming"), ("HT", "live"),
+                                           ("AET", "finished"), ("???", "upcoming")])
+def test_match_row_status_and_scores(short, status):
+    f = copy.deepcopy(fixture("Group Stage - 2", "Qatar"))
+    f["fixture"]["status"]["short"] = short
+    row = match_row(f, {"Qatar": 1, "Senegal": 3})
+    assert row["status"] == status
+    assert (row["score_team1"], row["score_team2"]) == ((None, None) if status == "upcoming" else (1, 3))
+
+
+def test_opponents_by_round():
+    rounds = opponents_by_round(FIXTURES)
+
+    assert rounds["Netherlands"] == {"Group": ["Senegal", "Ecuador", "Qatar"], "RO16": "USA",
+                                     "Quarterfinals": "Argentina"}
+    assert rounds["Argentina"] == {"Group": [], "Quarterfinals": "Netherlands", "Semifinals": "Croatia",
+                                   "Final": "France"}
+    # The third-place match is not a stage
+    assert rounds["Croatia"] == {"Group": [], "Semifinals": "Argentina"}
+    assert "Morocco" not in rounds
+
+
+def test_opponents_are_ordered_by_date_not_payload_order():
+    assert opponents_by_round(reversed(FIXTURES))["Qatar"]["Group"] == ["Ecuador", "Senegal", "Netherlands"]
+
+
+# --- Fetching and loading ---
+
+def test_fetch_fixtures_offline_reads_the_cached_response(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("fixtures", {"league": fixtures_ingest.WORLD_CUP, "season": 2022}, PAYLOAD)
+
+    fixtures = asyncio.run(fetch_fixtures(fixtures_ingest.WORLD_CUP, 2022, cache=cache, offline=True))
+
+    assert [f["fixture"]["id"] for f in fixtures] == [f["fixture"]["id"] for f in FIXTURES]
+    with pytest.raises(fixtures_ingest.IngestError, match="not cached"):
+        asyncio.run(fetch_fixtures(fixtures_ingest.WORLD_CUP, 2018, cache=cache, offline=True))
+
+
+def test_ingest_creates_unknown_teams_and_upserts_matches():
+    repo = new_repo()
+
+    result = run_ingest(repo)
+
+    assert [t["name"] for t in result["teams_created"]] == ["Morocco"]
+    assert result["fixtures"] == len(result["matches"]) == len(repo.tables["matches"]) == 12
+    by_ref = {m["api_ref"]: m for m in repo.tables["matches"]}
+    # "USA" resolves to the existing United States row through the alias table
+    assert by_ref["977577"]["team2_id"] == KNOWN_TEAMS.index("United States") + 1
+    assert by_ref["979137"]["team2_id"] == result["teams_created"][0]["id"]
+
+
+def test_ingest_is_idempotent_and_picks_up_changes():
+    repo = new_repo()
+    run_ingest(repo)
+    first = copy.deepcopy(repo.tables)
+
+    rerun = run_ingest(repo)
+    assert rerun["teams_created"] == []
+    assert repo.tables == first
+
+    changed = copy.deepcopy(FIXTURES)
+    final = next(f for f in changed if f["fixture"]["id"] == 979139)
+    final["fixture"]["status"]["short"], final["goals"] = "2H", {"home": 2, "away": 0}
+    run_ingest(repo, changed)
+
+    assert len(repo.tables["matches"]) == 12
+    row = next(m for m in repo.tables["matches"] if m["api_ref"] == "979139")
+    assert (row["status"], row["score_team1"], row["score_team2"]) == ("live", 2, 0)
+    assert row["id"] == next(m for m in first["matches"] if m["api_ref"] == "979139")["id"]
+
+
+def test_ingest_without_creating_teams_skips_their_fixtures():
+    repo = new_repo()
+
+    result = run_ingest(repo, create_teams=False)
+
+    assert result["teams_created"] == []
+    assert len(repo.tables["matches"]) == 11
+    assert "979137" not in {m["api_ref"] for m in repo.tables["matches"]}
+    assert ("insert", "teams", 1) not in repo.calls
+
+
+def test_ingest_endpoint_needs_the_admin_key(tmp_path, monkeypatch, admin_headers):
+    monkeypatch.setenv("API_FOOTBALL_CACHE_DIR", str(tmp_path))
+    ResponseCache(tmp_path).put("fixtures", {"league": fixtures_ingest.WORLD_CUP, "season": 2022}, PAYLOAD)
+    params = {"season": 2022, "offline": True}
+
+    with TestClient(api.app) as client:
+        assert client.post("/matches/ingest", params=params).status_code == 401
+        resp = client.post("/matches/ingest", params=params, headers=admin_headers)
+
+    assert resp.status_code == 200
+    assert resp.json()["fixtures"] == 12
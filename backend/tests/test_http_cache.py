@@ -0,0 +1,76 @@
+"""ETags, 304s and pre-compressed bodies on the polled list endpoints."""
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import deps
+from http_cache import COMPRESS_MIN_SIZE, encode, etag_matches
+from repository import SupabaseRepository
+from stubs import PostgrestStub
+
+
+def test_etag_is_stable_and_content_addressed():
+    body = encode([{"id": 1, "status": "live"}])
+
+    assert body.body == b'[{"id":1,"status":"live"}]'
+    assert body.etag == encode([{"id": 1, "status": "live"}]).etag != encode([{"id": 1}]).etag
+    assert body.etag.startswith('"') and body.etag.endswith('"')
+    assert gzip.decompress(body.gzipped()) == body.body
+    assert body.gzipped() is body.gzipped()
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"old", "abc"', True),
+    ('"abcd"', False),
+])
+def test_if_none_match_uses_weak_comparison(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+@pytest.fixture
+def client():
+    api.cache.invalidate("matches", "match_cards")
+    deps.repo.override(SupabaseRepository("http://stub.local", "stub", transport=PostgrestStub(latency=0)))
+    with TestClient(api.app) as c:
+        yield c
+
+
+def test_a_current_copy_gets_a_304_with_the_page_headers(client):
+    first = client.get("/matches", params={"limit": 5})
+    again = client.get("/matches", params={"limit": 5}, headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"] == "5"
+
+
+def test_a_write_changes_the_etag(client):
+    before = client.get("/matches", params={"status": "finished"})
+    created = client.post("/matches", json={"team1_id": 1, "team2_id": 2, "match_date": "2026-06-11T19:00:00Z",
+                                            "venue": "Estadio Azteca", "stage": "Group A", "status": "finished"})
+    after = client.get("/matches", params={"status": "finished"}, headers={"If-None-Match": before.headers["ETag"]})
+
+    assert created.status_code == 201
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert created.json()["id"] in [m["id"] for m in after.json()]
+
+
+def test_large_bodies_are_gzipped_small_ones_are_not(client):
+    full = client.get("/matches", headers={"Accept-Encoding": "gzip"})
+    small = client.get("/matches", params={"limit": 1, "fields": "status"}, headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/matches", headers={"Accept-Encoding": "identity"})
+
+    assert len(plain.content) >= COMPRESS_MIN_SIZE
+    assert full.headers["Content-Encoding"] == "gzip" and full.json() == plain.json()
+    assert "Content-Encoding" not in small.headers and "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in full.headers["Vary"]
+    assert full.headers["ETag"] == plain.headers["ETag"]
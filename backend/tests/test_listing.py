@@ -0,0 +1,115 @@
+"""Keyset pagination on the list endpoints."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from listing import CURSOR_HEADER, MAX_PAGE_SIZE, fetch_page, parse_fields
+
+
+def select_from(rows):
+    calls = []
+
+    async def select(table, columns="*", *, filters=None, order=None, limit=None, any_of=None):
+        calls.append({"filters": filters, "limit": limit})
+        out = sorted(rows, key=lambda r: r[order])
+        for op, value in (filters or {}).get(order, []):
+            compare = {"gt": int.__gt__, "lt": int.__lt__}[op]
+            out = [r for r in out if compare(r[order], int(value))]
+        return out[:limit] if limit is not None else out
+
+    return select, calls
+
+
+def test_no_limit_or_cursor_returns_every_row():
+    rows = [{"id": i} for i in range(1, 1201)]
+    select, calls = select_from(rows)
+
+    page = asyncio.run(fetch_page(select, "matches"))
+
+    assert len(page.rows) == 1200 and page.next_cursor is None
+    assert calls[0]["limit"] is None
+
+
+def test_limit_pages_with_a_cursor():
+    select, _ = select_from([{"id": i} for i in range(1, 8)])
+
+    first = asyncio.run(fetch_page(select, "matches", limit=3))
+    second = asyncio.run(fetch_page(select, "matches", limit=3, after=first.next_cursor))
+    last = asyncio.run(fetch_page(select, "matches", limit=3, after=second.next_cursor))
+
+    assert [r["id"] for r in first.rows + second.rows + last.rows] == list(range(1, 8))
+    assert (first.next_cursor, second.next_cursor, last.next_cursor) == ("3", "6", None)
+
+
+def test_cursor_without_limit_uses_the_default_page_size():
+    select, calls = select_from([{"id": i} for i in range(1, 1201)])
+
+    page = asyncio.run(fetch_page(select, "matches", after="100"))
+
+    assert len(page.rows) == 500 and page.next_cursor == "600"
+    assert calls[0]["limit"] == 501
+
+
+def test_a_full_last_page_has_no_cursor():
+    select, _ = select_from([{"id": i} for i in range(1, 7)])
+
+    first = asyncio.run(fetch_page(select, "matches", limit=3))
+    last = asyncio.run(fetch_page(select, "matches", limit=3, after=first.next_cursor))
+
+    assert [r["id"] for r in last.rows] == [4, 5, 6] and last.next_cursor is None
+    assert asyncio.run(fetch_page(select, "matches", limit=3, after="6")) == ([], None)
+
+
+def test_cursor_is_added_to_an_existing_key_filter():
+    select, calls = select_from([{"id": i} for i in range(1, 11)])
+
+    page = asyncio.run(fetch_page(select, "matches", limit=2, after="3", filters={"id": ("lt", 7)}))
+
+    assert [r["id"] for r in page.rows] == [4, 5] and page.next_cursor == "5"
+    assert calls[0]["filters"] == {"id": [("lt", 7), ("gt", "3")]}
+
+
+def test_parse_fields():
+    assert parse_fields(None) == "*"
+    assert parse_fields("status, team1_id,status") == "id,status,team1_id"
+    assert parse_fields("Squad,SoT%,Per 90 Gls", key="team_id") == 'team_id,Squad,"SoT%","Per 90 Gls"'
+    with pytest.raises(ValueError, match="Invalid field id;drop"):
+        parse_fields("id;drop,status")
+
+
+def test_endpoint_is_unbounded_by_default():
+    with TestClient(api.app) as client:
+        everything = client.get("/matches")
+        paged = client.get("/matches", params={"limit": 10})
+
+    assert everything.status_code == 200
+    assert CURSOR_HEADER not in everything.headers
+    assert len(everything.json()) == 72    # every stub fixture
+    assert len(paged.json()) == 10 and paged.headers[CURSOR_HEADER] == "10"
+
+
+def test_endpoint_pages_through_every_row_once():
+    ids, after = [], None
+    with TestClient(api.app) as client:
+        while True:
+            params = {"limit": 25, "fields": "status", **({"after": after} if after else {})}
+            resp = client.get("/matches", params=params)
+            ids += [r["id"] for r in resp.json()]
+            assert all(set(r) == {"id", "status"} for r in resp.json())
+            after = resp.headers.get(CURSOR_HEADER)
+            if after is None:
+                break
+
+    assert len(ids) == len(set(ids)) == 72
+
+
+def test_endpoint_rejects_bad_fields_and_limits():
+    with TestClient(api.app) as client:
+        bad_fields = client.get("/matches", params={"fields": "id);drop"})
+        too_big = client.get("/matches", params={"limit": MAX_PAGE_SIZE + 1})
+        zero = client.get("/matches", params={"limit": 0})
+
+    assert bad_fields.status_code == 400 and bad_fields.json()["detail"] == "Invalid field id);drop"
+    assert too_big.status_code == zero.status_code == 422
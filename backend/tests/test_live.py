@@ -0,0 +1,180 @@
+"""Live updates: the hub and change feed in-process, then the /live WebSocket."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from live import ChangeFeed, LiveHub, parse_topics
+
+
+def drain(sub):
+    return asyncio.run(sub.next_batch(window=0))
+
+
+def test_feed_publishes_only_changed_fields():
+    hub = LiveHub()
+    feed = ChangeFeed(hub)
+    sub = hub.subscribe(["match:1"])
+
+    feed.rows_changed("matches", [{"id": 1, "status": "upcoming", "score_team1": None}])
+    assert drain(sub) == [{"topic": "match:1", "type": "upsert", "key": 1,
+                           "changes": {"id": 1, "status": "upcoming", "score_team1": None}}]
+
+    assert feed.rows_changed("matches", [{"id": 1, "status": "upcoming"}]) == 0
+    feed.rows_changed("matches", [{"id": 1, "status": "live", "score_team1": 0}])
+    assert drain(sub) == [{"topic": "match:1", "type": "update", "key": 1,
+                           "changes": {"status": "live", "score_team1": 0}}]
+
+
+def test_updates_to_one_row_coalesce_into_one_event():
+    hub = LiveHub()
+    feed = ChangeFeed(hub)
+    sub = hub.subscribe(["matches"])
+
+    feed.rows_changed("matches", [{"id": 7, "status": "upcoming"}])
+    feed.rows_changed("matches", [{"id": 7, "status": "live", "score_team1": 0}])
+    feed.rows_changed("matches", [{"id": 7, "score_team1": 1}])
+    feed.rows_changed("matches", [{"id": 8, "status": "upcoming"}])
+
+    batch = drain(sub)
+    assert batch == [
+        {"topic": "matches", "type": "upsert", "key": 7,
+         "changes": {"id": 7, "status": "live", "score_team1": 1}},
+        {"topic": "matches", "type": "upsert", "key": 8, "changes": {"id": 8, "status": "upcoming"}},
+    ]
+    assert sub.coalesced == 2
+
+
+def test_delete_replaces_pending_update():
+    hub = LiveHub()
+    feed = ChangeFeed(hub)
+    sub = hub.subscribe(["valuebets"])
+
+    feed.rows_changed("valuebets", [{"id": "qualify:3", "ev": 0.1}])
+    feed.rows_deleted("valuebets", ["qualify:3"])
+
+    assert drain(sub) == [{"topic": "valuebets", "type": "delete", "key": "qualify:3"}]
+    assert len(feed) == 0
+
+
+def test_falling_behind_max_pending_becomes_one_resync():
+    hub = LiveHub(max_pending=3)
+    feed = ChangeFeed(hub)
+    slow = hub.subscribe(["matches", "odds"])
+
+    feed.rows_changed("qualifying_odds", [{"id": 1, "odds": 150}])
+    feed.rows_changed("matches", [{"id": i, "status": "live"} for i in range(1, 6)])
+    # Further changes to the topic are absorbed by the queued resync
+    feed.rows_changed("matches", [{"id": 1, "status": "finished"}])
+
+    batch = drain(slow)
+    assert {"topic": "matches", "type": "resync"} in batch
+    assert [e for e in batch if e["topic"] == "matches"] == [{"topic": "matches", "type": "resync"}]
+    assert [e["key"] for e in batch if e["topic"] == "odds"] == [1]
+    assert slow.resyncs == 1
+
+    # After the resync the subscriber gets deltas again
+    feed.rows_changed("matches", [{"id": 2, "status": "finished"}])
+    assert drain(slow) == [{"topic": "matches", "type": "update", "key": 2, "changes": {"status": "finished"}}]
+
+
+def test_unsubscribe_and_close_stop_delivery():
+    hub = LiveHub()
+    feed = ChangeFeed(hub)
+    sub = hub.subscribe(["matches", "valuebets"])
+
+    sub.unsubscribe("matches")
+    feed.rows_changed("matches", [{"id": 1, "status": "live"}])
+    feed.rows_changed("valuebets", [{"id": "qualify:1", "ev": 0.2}])
+    assert [e["topic"] for e in drain(sub)] == ["valuebets"]
+    assert hub.stats()["topics"] == {"valuebets": 1}
+
+    sub.close()
+    assert hub.publish("valuebets", "update", "qualify:1", {"ev": 0.3}) == 0
+    assert hub.stats()["subscribers"] == 0
+    assert drain(sub) is None
+
+
+def test_feed_forgets_least_recent_rows_past_max_rows():
+    hub = LiveHub()
+    feed = ChangeFeed(hub, max_rows=3)
+    sub = hub.subscribe(["matches"])
+
+    feed.rows_changed("matches", [{"id": i, "status": "upcoming"} for i in range(1, 5)])
+    assert len(feed) == 3 and feed.evicted == 1
+    drain(sub)
+
+    # Row 1 was forgotten: its next change is a full upsert, not a diff
+    feed.rows_changed("matches", [{"id": 1, "status": "live"}])
+    assert drain(sub) == [{"topic": "matches", "type": "upsert", "key": 1,
+                           "changes": {"id": 1, "status": "live"}}]
+
+
+def test_tables_without_topics_are_not_tracked():
+    feed = ChangeFeed(LiveHub())
+    assert feed.rows_changed("model_probabilities", [{"id": 1, "probability": 0.5}]) == 0
+    assert len(feed) == 0
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("matches, match:3", ["matches", "match:3"]),
+    (["valuebets", "odds"], ["valuebets", "odds"]),
+    (None, []),
+    ("", []),
+])
+def test_parse_topics_accepts_strings_and_lists(value, expected):
+    assert parse_topics(value) == expected
+
+
+@pytest.mark.parametrize("value", ["teams", ["matches", 3], ["match:x"]])
+def test_parse_topics_rejects_bad_topics(value):
+    with pytest.raises(ValueError):
+        parse_topics(value)
+
+
+# --- WebSocket ---
+
+@pytest.fixture
+def client():
+    with TestClient(api.app) as c:
+        yield c
+
+
+def topics(client):
+    return client.portal.call(lambda: api.hub.stats()["topics"])
+
+
+def roundtrip(ws):
+    """Commands are handled in order, so once a bad frame is answered the ones before it are applied."""
+    ws.send_text("not json")
+    return ws.receive_json()
+
+
+def test_socket_answers_a_malformed_frame_and_keeps_the_subscription(client):
+    with client.websocket_connect("/live?topics=matches") as ws:
+        assert roundtrip(ws) == {"error": "Expecting value: line 1 column 1 (char 0)"}
+        ws.send_text('["matches"]')
+        assert ws.receive_json() == {"error": "Expected a JSON object"}
+        ws.send_json({"subscribe": ["teams"]})
+        assert "Unknown topic teams" in ws.receive_json()["error"]
+
+        client.portal.call(api.changes.rows_changed, "matches", [{"id": 99001, "status": "live"}])
+        assert ws.receive_json() == {"events": [
+            {"topic": "matches", "type": "upsert", "key": 99001, "changes": {"id": 99001, "status": "live"}}]}
+
+
+def test_socket_subscribe_and_unsubscribe_accept_strings(client):
+    with client.websocket_connect("/live") as ws:
+        ws.send_json({"subscribe": "matches,valuebets"})
+        roundtrip(ws)
+        assert topics(client) == {"matches": 1, "valuebets": 1}
+
+        ws.send_json({"unsubscribe": "matches"})
+        roundtrip(ws)
+        assert topics(client) == {"valuebets": 1}
+
+        ws.send_json({"unsubscribe": ["valuebets"], "subscribe": ["odds"]})
+        roundtrip(ws)
+        assert topics(client) == {"odds": 1}
+    assert client.portal.call(lambda: api.hub.stats()["subscribers"]) == 0
@@ -0,0 +1,105 @@
+"""Prometheus exposition, upstream timing and the slow-request profiler dump."""
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import metrics
+from metrics import BUCKETS, Registry, SlowRequestDumper
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    registry.describe("latency_seconds", "Request latency.")
+    labels = (("route", '/a"b'),)
+    for value in (0.001, 0.003, 0.003, 60.0):
+        registry.observe("latency_seconds", labels, value)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP latency_seconds Request latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.001"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.005"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="30.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a\\"b"} 60.007000' in lines
+    assert 'latency_seconds_count{route="/a\\"b"} 4' in lines
+    assert sum(line.startswith("latency_seconds_bucket") for line in lines) == len(BUCKETS) + 1
+
+
+def test_counters_and_collectors():
+    registry = Registry()
+    registry.inc("rows_total", (("table", "teams"),), 48)
+    registry.inc("rows_total", (("table", "teams"),), 2)
+    registry.add_collector(lambda: {"cache_size": 12})
+    registry.add_collector(lambda: 1 / 0)   # a failing collector doesn't break the scrape
+
+    text = registry.render()
+
+    assert 'rows_total{table="teams"} 50\n' in text
+    assert "# TYPE cache_size gauge\ncache_size 12\n" in text
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    fresh = Registry()
+    monkeypatch.setattr(metrics, "registry", fresh)
+    return fresh
+
+
+def test_supabase_observer_counts_errors(registry):
+    metrics.supabase_observer("teams", "GET", 0.01, 200, 48, 4096)
+    metrics.supabase_observer("teams", "GET", 0.02, 503, 0, 10)
+    metrics.supabase_observer("teams", "GET", 0.03, 0, 0, 0)   # raised before a response
+
+    labels = (("upstream", "supabase"), ("target", "teams"), ("op", "GET"))
+    assert registry.histograms["upstream_request_duration_seconds"][labels].count == 3
+    assert registry.counters["upstream_rows_total"][labels] == 48
+    assert registry.counters["upstream_response_bytes_total"][labels] == 4106
+    assert registry.counters["upstream_errors_total"][labels] == 2
+
+
+def test_timed_records_an_escaping_exception_as_an_error(registry):
+    with metrics.timed("gemini", "generate", "POST") as info:
+        info["nbytes"] = 512
+    with pytest.raises(TimeoutError):
+        with metrics.timed("gemini", "generate", "POST"):
+            raise TimeoutError
+
+    labels = (("upstream", "gemini"), ("target", "generate"), ("op", "POST"))
+    assert registry.histograms["upstream_request_duration_seconds"][labels].count == 2
+    assert registry.counters["upstream_response_bytes_total"][labels] == 512
+    assert registry.counters["upstream_errors_total"][labels] == 1
+
+
+class FakeProfiler:
+    def __init__(self, stacks):
+        self.stacks = stacks
+
+    def folded(self, start, end):
+        return self.stacks
+
+
+def test_slow_requests_dump_folded_stacks(tmp_path):
+    dumper = SlowRequestDumper(FakeProfiler({"main;handler": 3, "main;idle": 1}), 0.5, tmp_path / "profiles")
+
+    assert dumper("/features/{team_id}", 10.0, 10.2) is None   # under the threshold
+    path = dumper("/features/{team_id}", 10.0, 10.75)
+
+    assert re.fullmatch(r"\d{8}T\d{6}-features_team_id-750ms\.folded", path.name)
+    assert path.read_text() == "main;handler 3\nmain;idle 1\n"
+    assert SlowRequestDumper(FakeProfiler({}), 0.5, tmp_path)("/", 0.0, 1.0) is None
+
+
+def test_routes_are_labelled_by_template():
+    with TestClient(api.app) as client:
+        client.get("/features/1")
+        client.get("/features/2")
+        client.get("/no-such-route")
+        text = client.get("/metrics").text
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/features/{team_id}",status="200"}' in text
+    assert 'route="/features/1"' not in text
+    assert re.search(r'http_request_duration_seconds_count\{method="GET",route="unmatched",status="404"\} \d+', text)
+    assert 'upstream_request_duration_seconds_count{upstream="supabase",target="teams",op="GET"}' in text
@@ -0,0 +1,153 @@
+"""Odds scraper: parsing saved pages, source selection, and where the history is written."""
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import odds_scraper
+from odds_scraper import PageCache, SOURCES, clean_odds, parse_odds, parse_sources, scrape, write_odds
+from repository import SupabaseRepository
+from stubs import PostgrestStub
+
+FIXTURES = Path(__file__).parent / "fixtures" / "odds"
+
+
+def page(key: str) -> str:
+    return (FIXTURES / f"{key.replace('-', '_')}.html").read_text(encoding="utf-8")
+
+
+def cache_pages(directory: Path, pages: dict) -> PageCache:
+    cache = PageCache(directory)
+    for key, html in pages.items():
+        cache.put(SOURCES[key].url, html, httpx.Headers())
+    return cache
+
+
+# --- Parsing ---
+
+def test_two_row_header_with_team_above_the_dates():
+    assert parse_odds(page("euro-2024"), "Jun 14") == [
+        {"team": "Germany", "odds": -2500.0},
+        {"team": "Switzerland", "odds": -300.0},
+        {"team": "Scotland", "odds": 120.0},
+        {"team": "Hungary", "odds": 115.0},
+        {"team": "Spain", "odds": -1600.0},
+    ]   # Albania has no Jun 14 price; the footnote row is not a team
+
+
+def test_table_nested_in_the_page_layout():
+    rows = parse_odds(page("euro-2020"), "Jun 11")
+    assert [r["team"] for r in rows] == ["Italy", "Turkey", "Wales", "Belgium", "Finland", "Finland"]
+    assert rows[0]["odds"] == -900.0 and rows[-1]["odds"] == 250.0
+
+
+def test_skips_tables_without_the_odds_column():
+    rows = parse_odds(page("wc-2022"), "Nov 20")
+    assert len(rows) == 6
+    assert rows[-1] == {"team": "Cameroon", "odds": 1400.0}
+
+
+def test_missing_column_is_an_error():
+    with pytest.raises(ValueError, match="Jun 21"):
+        parse_odds(page("euro-2024"), "Jun 21")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("+1,200", 1200.0), ("-2,500", -2500.0), ("+120*", 120.0), (" 105 ", 105.0),
+    ("", None), ("-", None), ("OFF", None),
+])
+def test_clean_odds(text, expected):
+    assert clean_odds(text) == expected
+
+
+def test_parse_sources():
+    assert parse_sources(None) == list(SOURCES.values())
+    assert parse_sources("") == list(SOURCES.values())
+    assert [s.key for s in parse_sources("wc-2022, euro-2020")] == ["wc-2022", "euro-2020"]
+    with pytest.raises(ValueError, match="euro-2016"):
+        parse_sources("euro-2024,euro-2016")
+
+
+# --- Pipeline ---
+
+def test_offline_scrape_tags_rows_with_their_source(tmp_path):
+    cache = cache_pages(tmp_path, {k: page(k) for k in SOURCES})
+
+    rows = asyncio.run(scrape(SOURCES.values(), offline=True, cache=cache))
+
+    by_source = {}
+    for r in rows:
+        by_source.setdefault((r["comp_id"], r["season_id"]), []).append(r["team"])
+    assert {k: len(v) for k, v in by_source.items()} == {(1, 2024): 5, (1, 2020): 6, (2, 2022): 6}
+
+
+def test_offline_scrape_needs_cached_pages(tmp_path):
+    with pytest.raises(RuntimeError, match="Not cached"):
+        asyncio.run(scrape([SOURCES["wc-2022"]], offline=True, cache=PageCache(tmp_path)))
+
+
+def test_write_odds_upserts_history_once_per_team(tmp_path):
+    cache = cache_pages(tmp_path, {"euro-2020": page("euro-2020")})
+
+    async def run():
+        stub = PostgrestStub({}, latency=0)
+        repo = SupabaseRepository("http://stub.local", "stub", transport=stub)
+        rows = await scrape([SOURCES["euro-2020"]], offline=True, cache=cache)
+        try:
+            first = await write_odds(repo, rows)
+            await write_odds(repo, rows)
+        finally:
+            await repo.aclose()
+        return first, stub.tables
+
+    first, tables = asyncio.run(run())
+
+    assert set(tables) == {odds_scraper.ODDS_TABLE}
+    stored = tables[odds_scraper.ODDS_TABLE]
+    assert len(first) == len(stored) == 5
+    assert next(r for r in stored if r["team"] == "Finland")["odds"] == 250.0
+
+
+def test_scrape_endpoint_needs_the_admin_key(tmp_path, monkeypatch, admin_headers):
+    monkeypatch.setenv("ODDS_CACHE_DIR", str(tmp_path))
+    cache_pages(tmp_path, {"wc-2022": page("wc-2022")})
+    params = {"sources": "wc-2022", "offline": True}
+
+    with TestClient(api.app) as client:
+        assert client.post("/qualifying_odds/scrape", params=params).status_code == 401
+        assert client.post("/qualifying_odds/scrape", params=params,
+                           headers={"X-Admin-Key": "guess"}).status_code == 401
+        resp = client.post("/qualifying_odds/scrape", params=params, headers=admin_headers)
+
+    assert resp.json() == {"sources": ["wc-2022"], "rows": 6}
+
+
+def test_scraped_history_stays_out_of_live_odds_and_value_bets(tmp_path, monkeypatch, admin_headers):
+    # A past tournament listing a team from the 2026 field at a long price
+    monkeypatch.setenv("ODDS_CACHE_DIR", str(tmp_path))
+    cache_pages(tmp_path, {"euro-2024": page("euro-2024").replace("Scotland", "Team A1")})
+
+    with TestClient(api.app) as client:
+        client.portal.call(api.repo.insert, "model_probabilities",
+                           {"team_id": 1, "market": "qualify", "probability": 0.99})
+        assert client.post("/valuebets/refresh", params={"markets": "qualify"},
+                           headers=admin_headers).status_code == 200
+        before = client.get("/valuebets").json()
+        live_odds = client.get("/qualifying_odds", params={"team": "Team A1"}).json()
+
+        resp = client.post("/qualifying_odds/scrape", params={"sources": "euro-2024", "offline": True},
+                           headers=admin_headers)
+        assert resp.json() == {"sources": ["euro-2024"], "rows": 5}
+
+        client.post("/valuebets/refresh", params={"markets": "qualify"}, headers=admin_headers)
+        assert client.get("/qualifying_odds", params={"team": "Team A1"}).json() == live_odds
+        assert client.get("/valuebets").json() == before
+        history = client.portal.call(api.repo.select, odds_scraper.ODDS_TABLE)
+
+    pick = next(r for r in before if r["team_id"] == 1)
+    assert pick["current_odds"] != "+120"
+    assert {"team": "Team A1", "odds": 120.0, "comp_id": 1, "season_id": 2024}.items() <= \
+        next(r for r in history if r["team"] == "Team A1").items()
@@ -0,0 +1,116 @@
+"""PostgREST client: query encoding, write headers, errors and the request observer."""
+import asyncio
+
+import httpx
+import pytest
+
+from repository import RepositoryError, SupabaseRepository, build_params, chunked, encode_filter
+
+
+def test_filters_are_encoded_for_postgrest():
+    assert encode_filter("in", ["Costa Rica", "Mexico", 'Say "hi"']) == 'in.("Costa Rica",Mexico,"Say \\"hi\\"")'
+    assert encode_filter("is", None) == "is.null"
+    assert encode_filter("is", True) == "is.true"
+    assert encode_filter("gte", 3) == "gte.3"
+    with pytest.raises(ValueError, match="Unsupported filter operator: regex"):
+        encode_filter("regex", ".*")
+
+
+def test_build_params():
+    params = build_params("id,name", {"status": ("eq", "live"), "id": [("gt", 1), ("lt", 9)]},
+                          order="kickoff", desc=True, limit=5,
+                          any_of=[("team1_id", "eq", 3), ("team2_id", "eq", 3)])
+
+    assert params == [("select", "id,name"), ("status", "eq.live"), ("id", "gt.1"), ("id", "lt.9"),
+                      ("or", "(team1_id.eq.3,team2_id.eq.3)"), ("order", "kickoff.desc"), ("limit", "5")]
+
+
+def run_against(handler, calls, max_connections=64):
+    """Run `calls(repo)` against a MockTransport, recording what the observer saw."""
+    observed = []
+
+    async def run():
+        repo = SupabaseRepository("http://db.local/", "anon", max_connections=max_connections,
+                                  transport=httpx.MockTransport(handler),
+                                  observer=lambda *args: observed.append(args[:2] + args[3:5]))
+        try:
+            return await calls(repo)
+        finally:
+            await repo.aclose()
+
+    return asyncio.run(run()), observed
+
+
+def test_writes_send_the_prefer_header():
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path, str(request.url.query, "ascii"),
+                         request.headers.get("Prefer")))
+        return httpx.Response(200, json=[{"id": 1}])
+
+    async def calls(repo):
+        await repo.upsert("valuebets", [{"id": 1}], on_conflict="market_key")
+        await repo.update("matches", {"status": "live"}, filters={"id": ("eq", 1)})
+        await repo.delete("valuebets", filters={"id": ("in", [1, 2])})
+        return await repo.insert("bets", {"id": 1})
+
+    rows, observed = run_against(handler, calls)
+
+    assert rows == [{"id": 1}]
+    assert requests == [
+        ("POST", "/rest/v1/valuebets", "on_conflict=market_key", "resolution=merge-duplicates,return=minimal"),
+        ("PATCH", "/rest/v1/matches", "id=eq.1", "return=representation"),
+        ("DELETE", "/rest/v1/valuebets", "id=in.%281%2C2%29", "return=representation"),
+        ("POST", "/rest/v1/bets", "", "return=representation"),
+    ]
+    assert [o[:2] for o in observed] == [("valuebets", "POST"), ("matches", "PATCH"),
+                                         ("valuebets", "DELETE"), ("bets", "POST")]
+
+
+def test_errors_raise_and_are_observed():
+    def handler(request):
+        if request.url.path.endswith("/auth/v1/user"):
+            return httpx.Response(401, json={"msg": "invalid JWT"})
+        return httpx.Response(404, text="relation does not exist")
+
+    async def calls(repo):
+        with pytest.raises(RepositoryError) as err:
+            await repo.select("missing")
+        return err.value, await repo.auth_user("expired")
+
+    (error, user), observed = run_against(handler, calls)
+
+    assert error.table == "missing" and error.status_code == 404
+    assert str(error) == "missing: HTTP 404: relation does not exist"
+    assert user is None   # a rejected token is not an error
+    assert observed == [("missing", "GET", 404, 0), ("auth/user", "GET", 401, 0)]
+
+
+def test_rpc_and_empty_bodies():
+    def handler(request):
+        if request.url.path.endswith("/rpc/settle_match"):
+            return httpx.Response(200, json=3)
+        return httpx.Response(201)
+
+    async def calls(repo):
+        return await repo.rpc("settle_match", {"p_match_id": 1}), await repo.upsert("teams", [])
+
+    (settled, upserted), observed = run_against(handler, calls)
+
+    assert settled == 3 and upserted == []
+    assert observed == [("rpc/settle_match", "POST", 200, 1), ("teams", "POST", 201, 0)]
+
+
+def test_connections_are_spread_over_small_pools():
+    async def calls(repo):
+        return len(repo._shards), [s._value for s in repo._slots]
+
+    (shards, slots), _ = run_against(lambda r: httpx.Response(200, json=[]), calls, max_connections=20)
+
+    assert shards == 3 and slots == [8, 8, 8]
+
+
+def test_chunked():
+    rows = [{"id": i} for i in range(5)]
+    assert [len(c) for c in chunked(rows, 2)] == [2, 2, 1]
@@ -0,0 +1,88 @@
+"""Serving the qualification model: feature mapping, scoring and publishing."""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.linear_model import LogisticRegression
+
+import api
+import deps
+from feature_matrix import FeatureMatrix, build_block
+from ml.artifacts import Artifact
+from ml.scoring import Scorer, match_features
+from repository import SupabaseRepository
+from stats import STATS_TABLES
+from stubs import PostgrestStub
+from team_index import TeamIndex
+
+TEAMS = [{"id": 1, "name": "Mexico"}, {"id": 2, "name": "Canada"}, {"id": 3, "name": "Haiti"}]
+
+
+def artifact(features, tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, len(features)))
+    model = LogisticRegression().fit(X, (X[:, 0] > 0).astype(int))
+    return Artifact("logreg", "20260101000000", model, list(features), {}, "", "2026-01-01T00:00:00Z", tmp_path)
+
+
+def matrix(rows):
+    index = TeamIndex(TEAMS)
+    return FeatureMatrix(TEAMS, {"shooting": build_block(STATS_TABLES["shooting"], rows, index, [1, 2, 3])})
+
+
+def test_features_match_exact_then_normalized_names():
+    columns = ["standard.Gls", "shooting.PSxG/SoT", "shooting.Gls", "passing.Cmp%"]
+
+    assert match_features(["Gls", "psxg_per_sot", "cmp_pct", "xA"], columns) == {
+        "Gls": 0, "psxg_per_sot": 1, "cmp_pct": 3, "xA": None}
+
+
+def test_scores_teams_in_matrix_order(tmp_path):
+    m = matrix([{"team_id": 1, "Squad": "Mexico", "Gls": 2.0, "SoT": 1.0},
+                {"team_id": 2, "Squad": "Canada", "Gls": -2.0, "SoT": 1.0}])
+    scorer = Scorer(artifact(["Gls", "SoT", "xA"], tmp_path))
+
+    probs = scorer.predict(m, [2, 1, 99])
+
+    assert probs[1] > 0.5 > probs[0]
+    assert np.isnan(probs[2])
+    assert scorer.missing_features(m) == ["xA"]
+    assert np.allclose(scorer.predict_all(m)[:2], probs[[1, 0]])
+    # 4 of 9 inputs: xA is missing for everyone, Haiti has no row at all
+    assert scorer.feature_coverage(m) == pytest.approx(4 / 9)
+
+
+@pytest.fixture
+def served(request, tmp_path, monkeypatch):
+    # Default: features the stub stats tables carry in every category
+    features = getattr(request, "param", ["Gls", "SoT/90", "Cmp%"])
+    monkeypatch.setattr(api, "load_best", lambda: artifact(features, tmp_path))
+    deps.repo.override(SupabaseRepository("http://stub.local", "stub", transport=PostgrestStub(latency=0)))
+    with TestClient(api.app) as client:
+        yield client
+
+
+def test_publish_needs_the_admin_key(served, admin_headers):
+    assert served.post("/predictions/qualify/publish").status_code == 401
+
+    resp = served.post("/predictions/qualify/publish", headers=admin_headers)
+
+    assert resp.status_code == 200
+    published = served.portal.call(api.repo.select, "model_probabilities")
+    assert resp.json()["teams"] == len(published) >= 48
+    assert {r["model_version"] for r in published} == {resp.json()["model_version"]}
+
+
+@pytest.mark.parametrize("served", [["Gls", "xG", "xA", "PSxG"]], indirect=True)
+def test_publish_refuses_a_model_the_stats_tables_mostly_lack(served, admin_headers):
+    coverage = served.get("/model").json()["feature_coverage"]
+    assert 0 < coverage <= 0.25   # only Gls, and only for teams with stats rows
+
+    resp = served.post("/predictions/qualify/publish", headers=admin_headers)
+
+    assert resp.status_code == 409
+    assert resp.json()["detail"].endswith("missing features: xG, xA, PSxG")
+    assert served.portal.call(api.repo.select, "model_probabilities") == []
+
+    forced = served.post("/predictions/qualify/publish", params={"min_coverage": 0}, headers=admin_headers)
+    assert forced.status_code == 200
+    assert forced.json()["feature_coverage"] == coverage
@@ -0,0 +1,111 @@
+"""Tournament simulation: match model, bracket invariants, determinism and publishing."""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import deps
+from repository import SupabaseRepository
+from simulation import (GROUPS, STAGES, alias_table, build_tournament, outcome_masks, reweight,
+                        scoreline_pmf, simulate)
+from stubs import PostgrestStub, demo_tables
+
+TABLES = demo_tables()
+TEAMS, MATCHES = TABLES["teams"], TABLES["matches"]
+# Stage -> teams reaching it in every simulated tournament
+PER_TOURNAMENT = {"first": 12, "second": 12, "third": 12, "qualify": 32, "round_of_16": 16,
+                  "quarterfinal": 8, "semifinal": 4, "final": 2, "champion": 1}
+
+
+def tournament(matches=MATCHES, ratings=None, match_probs=None):
+    ratings = np.zeros(len(TEAMS)) if ratings is None else ratings
+    return build_tournament(TEAMS, matches, ratings, match_probs)
+
+
+def test_reweight_hits_the_target_outcome_probabilities():
+    pmf = reweight(scoreline_pmf(1.8, 0.9), (0.2, 0.5, 0.3))
+
+    assert [pmf[mask].sum() for mask in outcome_masks()] == pytest.approx([0.2, 0.5, 0.3])
+    with pytest.raises(ValueError):
+        reweight(pmf, (0, 0, 0))
+
+
+def test_alias_table_reproduces_the_distribution():
+    pmf = scoreline_pmf(1.3, 1.1).ravel()
+    accept, alias = alias_table(pmf)
+
+    # Cell k keeps accept[k] / K of the mass and hands the rest to alias[k]
+    mass = accept / len(pmf)
+    np.add.at(mass, alias, (1 - accept) / len(pmf))
+    assert mass == pytest.approx(pmf / pmf.sum())
+
+
+def test_build_tournament_needs_twelve_groups_of_four():
+    with pytest.raises(ValueError, match="Expected 12 groups"):
+        build_tournament(TEAMS[:-1], MATCHES, np.zeros(len(TEAMS) - 1))
+
+    t = tournament()
+    assert t.group_names == [chr(ord("A") + g) for g in range(GROUPS)]
+    assert len(t.fixtures) == GROUPS * 6
+
+
+def test_every_tournament_fills_every_stage():
+    result = simulate(tournament(ratings=np.linspace(-1, 1, len(TEAMS))), 3_000, seed=7, batch_size=1_000)
+
+    assert {s: int(result.counts[i].sum()) for i, s in enumerate(STAGES)} == \
+        {s: n * 3_000 for s, n in PER_TOURNAMENT.items()}
+    probs = result.probabilities()
+    # Group winners qualify; the strongest team is the likeliest champion
+    assert (probs["qualify"] >= probs["first"]).all()
+    assert probs["champion"].argmax() == int(np.argmax(np.linspace(-1, 1, len(TEAMS))))
+
+
+def test_finished_matches_keep_their_score():
+    # Group A: team 1 wins every match, team 2 beats 3 and 4, team 3 beats 4
+    ids = [t["id"] for t in TEAMS if t["group_name"] == "A"]
+    rank = {t: i for i, t in enumerate(ids)}
+    finished = [dict(m, status="finished", score_team1=1 if rank[m["team1_id"]] < rank[m["team2_id"]] else 0,
+                     score_team2=0 if rank[m["team1_id"]] < rank[m["team2_id"]] else 1)
+                if m["team1_id"] in rank else m for m in MATCHES]
+
+    result = simulate(tournament(finished), 1_000, seed=1)
+
+    probs = result.probabilities()
+    position = {int(t): i for i, t in enumerate(result.team_ids.tolist())}
+    assert [probs["first"][position[t]] for t in ids] == [1, 0, 0, 0]
+    assert [probs["second"][position[t]] for t in ids] == [0, 1, 0, 0]
+    assert probs["qualify"][position[ids[3]]] == 0
+
+
+def test_match_probabilities_apply_in_either_team_order():
+    a, b = MATCHES[0]["team1_id"], MATCHES[0]["team2_id"]
+
+    straight = tournament(match_probs={(a, b): (1.0, 0.0, 0.0)})
+    flipped = tournament(match_probs={(b, a): (0.0, 0.0, 1.0)})
+
+    assert straight.fixtures[0].probs == flipped.fixtures[0].probs == (1.0, 0.0, 0.0)
+
+
+def test_seed_gives_the_same_counts_for_any_number_of_jobs():
+    t = tournament()
+
+    one = simulate(t, 4_000, seed=3, batch_size=1_000)
+    two = simulate(t, 4_000, seed=3, batch_size=1_000, n_jobs=2)
+
+    assert np.array_equal(one.counts, two.counts)
+    assert not np.array_equal(one.counts, simulate(t, 4_000, seed=4, batch_size=1_000).counts)
+
+
+def test_publish_needs_the_admin_key(admin_headers):
+    deps.repo.override(SupabaseRepository("http://stub.local", "stub", transport=PostgrestStub(latency=0)))
+    params = {"sims": 1_000, "markets": "qualify"}
+
+    with TestClient(api.app) as client:
+        assert client.post("/simulations/tournament/publish", params=params).status_code == 401
+        resp = client.post("/simulations/tournament/publish", params=params, headers=admin_headers)
+        published = client.portal.call(api.repo.select, "model_probabilities")
+
+    assert resp.status_code == 200
+    assert resp.json()["teams"] == len(published) == 48
+    assert {r["market"] for r in published} == {"qualify"}
+    assert sum(r["probability"] for r in published) == pytest.approx(32, abs=0.01)
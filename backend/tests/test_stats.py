@@ -0,0 +1,67 @@
+"""Stats lookups: category parsing, team resolution and the one-query-per-table fetch."""
+import asyncio
+
+import pytest
+
+from repository import SupabaseRepository
+from stats import STATS_TABLES, fetch_table, parse_categories, resolve_teams
+from stubs import PostgrestStub
+from team_index import TeamIndex
+
+INDEX = TeamIndex([{"id": 1, "name": "United States"}, {"id": 2, "name": "Mexico"},
+                   {"id": 3, "name": "Korea Republic"}])
+
+
+def test_parse_categories():
+    assert parse_categories(None) == list(STATS_TABLES)
+    assert parse_categories(" Shooting,passing,shooting ") == ["shooting", "passing"]
+    with pytest.raises(ValueError, match="Invalid category xg, defense. Available: standard"):
+        parse_categories("xg,defense")
+
+
+def test_resolve_teams_by_id_and_alias():
+    teams = resolve_teams(INDEX, team_ids=[2, 99], names=["USA", "Mexico", "Atlantis"])
+
+    assert teams == [{"id": 2, "name": "Mexico"}, {"id": 1, "name": "United States"}]
+
+
+def fetch(spec, tables, teams):
+    requests = []
+
+    class Recording(PostgrestStub):
+        async def handle_async_request(self, request):
+            requests.append(request)
+            return await super().handle_async_request(request)
+
+    async def run():
+        repo = SupabaseRepository("http://stub.local", "stub", transport=Recording(tables, latency=0))
+        try:
+            return await fetch_table(repo, spec, INDEX, teams)
+        finally:
+            await repo.aclose()
+
+    return asyncio.run(run()), requests
+
+
+def test_rows_are_matched_by_id_or_by_any_spelling():
+    spec = STATS_TABLES["shooting"]
+    rows = [
+        {"team_id": 1, "Squad": "United States", "Gls": 9},
+        {"team_id": None, "Squad": "South Korea", "Gls": 4},   # imported without its ID
+        {"team_id": 2, "Squad": "Mexico", "Gls": 12},
+        {"team_id": 2, "Squad": "Mexico", "Gls": 0},            # duplicates keep the first row
+    ]
+
+    by_team, requests = fetch(spec, {spec.table: rows}, [INDEX.teams[2], INDEX.teams[3]])
+
+    assert {t: r["Gls"] for t, r in by_team.items()} == {2: 12, 3: 4}
+    assert len(requests) == 1
+
+
+def test_tables_without_an_id_column_are_matched_by_name():
+    spec = STATS_TABLES["passing"]
+    rows = [{"team": "USA", "Cmp%": 81.5}, {"team": "United States of America", "Cmp%": 0}]
+
+    by_team, _ = fetch(spec, {spec.table: rows}, [INDEX.teams[1]])
+
+    assert by_team == {1: {"team": "USA", "Cmp%": 81.5}}
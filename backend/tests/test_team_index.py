@@ -0,0 +1,76 @@
+"""Team detection in free text: names, aliases, codes and overlapping mentions."""
+import asyncio
+
+from team_index import AhoCorasick, TeamIndex, TeamIndexHolder, tokenize
+
+TEAMS = [
+    {"id": 1, "name": "United States", "country_code": "usa"},
+    {"id": 2, "name": "Mexico", "country_code": "MEX"},
+    {"id": 3, "name": "Republic of Ireland"},
+    {"id": 4, "name": "Northern Ireland"},
+    {"id": 5, "name": "Côte d'Ivoire"},
+    {"id": 6, "name": "Korea Republic"},
+    {"id": 7, "name": "Canada"},
+]
+INDEX = TeamIndex(TEAMS)
+
+
+def names(teams):
+    return [t["name"] for t in teams]
+
+
+def test_tokenize_drops_accents_and_punctuation():
+    assert tokenize("Côte d'Ivoire vs. CURAÇAO!") == ("cote", "d", "ivoire", "vs", "curacao")
+
+
+def test_matcher_finds_overlapping_word_patterns():
+    matcher = AhoCorasick({("ireland",): 1, ("northern", "ireland"): 2, ("republic", "of", "ireland"): 3})
+
+    assert sorted(matcher.find(tokenize("Northern Ireland and Republic of Ireland"))) == \
+        [(0, 2, 2), (1, 2, 1), (3, 6, 3), (5, 6, 1)]
+
+
+def test_detect_in_order_of_first_mention():
+    assert names(INDEX.detect("Can Mexico beat the USMNT? Mexico looked sharp")) == ["Mexico", "United States"]
+    assert names(INDEX.detect("Ivory Coast or South Korea")) == ["Côte d'Ivoire", "Korea Republic"]
+
+
+def test_longest_mention_wins():
+    # "Ireland" alone is the Republic's alias, but not inside "Northern Ireland"
+    assert names(INDEX.detect("How did Northern Ireland do?")) == ["Northern Ireland"]
+    assert names(INDEX.detect("Ireland vs Northern Ireland")) == ["Republic of Ireland", "Northern Ireland"]
+
+
+def test_short_codes_only_match_in_upper_case():
+    assert names(INDEX.detect("tell us about MEX and US")) == ["Mexico", "United States"]
+    assert INDEX.detect("can us fans travel?") == []
+    assert INDEX.resolve("USA") == {"id": 1, "name": "United States"}
+    assert INDEX.resolve("Atlantis") is None
+
+
+def test_spellings_list_every_alias():
+    assert INDEX.spellings(1) == ["United States", "USA", "US", "USMNT", "United States of America"]
+    assert INDEX.spellings(7) == ["Canada"]
+    assert INDEX.spellings(99) == []
+
+
+def test_holder_loads_once_and_swaps_on_refresh():
+    rows = [TEAMS[:2]]
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return rows[0]
+
+    async def run():
+        holder = TeamIndexHolder(load)
+        first, again = await asyncio.gather(holder.get(), holder.get())
+        rows[0] = TEAMS
+        await holder.refresh()
+        return first, again, await holder.get()
+
+    first, again, refreshed = asyncio.run(run())
+
+    assert first is again and len(first) == 2
+    assert len(refreshed) == len(TEAMS)
+    assert len(loads) == 2
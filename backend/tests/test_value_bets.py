@@ -0,0 +1,67 @@
+"""Value-bet inputs: only the market's own competition and season are priced."""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import api
+from repository import SupabaseRepository
+from stubs import PostgrestStub
+from team_index import TeamIndex
+from value_bets import MARKETS, ValueBetEngine, load_market
+
+TEAMS = [{"id": 1, "name": "Argentina"}, {"id": 2, "name": "Team A1"}]
+
+
+def odds(id, team, price, comp_id=2, season_id=2026):
+    return {"id": id, "team": team, "odds": price, "comp_id": comp_id, "season_id": season_id}
+
+
+def load(tables):
+    async def run():
+        repo = SupabaseRepository("http://stub.local", "stub", transport=PostgrestStub(tables, latency=0))
+        engine = ValueBetEngine()
+        try:
+            await load_market(repo, engine, TeamIndex(TEAMS), "qualify")
+        finally:
+            await repo.aclose()
+        return engine.inputs["qualify"]
+    return asyncio.run(run())
+
+
+def test_markets_price_the_2026_world_cup():
+    assert {(m.comp_id, m.season_id) for m in MARKETS.values()} == {(2, 2026)}
+
+
+def test_load_market_ignores_other_seasons_and_competitions():
+    inputs = load({
+        "qualifying_odds": [
+            odds(1, "Argentina", -900),
+            # Scraped history: a later id must not override the 2026 price
+            odds(2, "Argentina", 150, season_id=2022),
+            odds(3, "Team A1", 900, comp_id=1, season_id=2024),
+        ],
+        "model_probabilities": [{"id": 1, "team_id": 1, "market": "qualify", "probability": 0.95}],
+    })
+
+    assert inputs.team_ids.tolist() == [1]
+    assert inputs.odds.tolist() == [-900.0]
+
+
+def test_simulation_prices_ignore_scraped_history():
+    with TestClient(api.app) as client:
+        before = client.portal.call(api.market_prices)
+        team = client.portal.call(api.repo.select, "teams")[0]
+        client.portal.call(api.repo.insert, "qualifying_odds",
+                           odds(10_000, team["name"], 12345, comp_id=1, season_id=2024))
+        api.cache.invalidate("qualifying_odds")
+        after = client.portal.call(api.market_prices)
+
+    assert after["qualify"][team["id"]] == before["qualify"][team["id"]]
+
+
+def test_refresh_needs_the_admin_key(admin_headers):
+    with TestClient(api.app) as client:
+        assert client.post("/valuebets/refresh").status_code == 401
+        resp = client.post("/valuebets/refresh", params={"markets": "qualify"}, headers=admin_headers)
+
+    assert resp.status_code == 200
@@ -0,0 +1,297 @@
+"""
+Value-bet engine over the odds tables and the model's probabilities.
+
+For every (market, team) the bookmaker price is turned into an implied
+probability, the vig is removed per market, and the model probability is
+compared against it:
+
+    edge   = model_prob - fair_prob
+    ev     = model_prob * decimal_odds - 1          (per unit staked)
+    kelly  = KELLY_FRACTION * (b * p - q) / b       (b = decimal - 1), >= 0
+
+All markets are stacked into flat arrays and computed in one NumPy pass.
+Inputs are held per market, so a changed odds table or model output only
+reloads that market, and only picks whose numbers moved are written back.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from repository import Filters, SupabaseRepository
+from team_index import TeamIndex
+
+KELLY_FRACTION = 0.25   # fractional Kelly; full Kelly is too aggressive on model error
+MAX_STAKE = 0.05        # cap as a share of bankroll
+MIN_EV = 0.0            # only picks above this are published
+PRECISION = 4
+
+
+class Market(NamedTuple):
+    name: str          # key in model_probabilities.market and valuebets.market_key
+    label: str         # valuebets.market, as the frontend shows it
+    event: str         # valuebets.match
+    odds_table: str
+    odds_format: str   # "american" | "decimal"
+    winners: int       # how many teams the market pays out on (sum of fair probabilities)
+    comp_id: int       # odds rows priced for this competition and season only;
+    season_id: int     # the tables also hold history (see odds_scraper.SOURCES)
+
+
+WORLD_CUP = 2          # comp_id of the World Cup in the odds tables (1 is the Euros)
+
+MARKETS: Dict[str, Market] = {
+    # 2026: 32 of 48 teams advance from the group stage
+    "qualify": Market("qualify", "To Qualify", "2026 World Cup - Group Stage",
+                      "qualifying_odds", "american", 32, WORLD_CUP, 2026),
+    "outright": Market("outright", "Outright Winner", "2026 World Cup - Winner",
+                       "outright_winning_odds", "american", 1, WORLD_CUP, 2026),
+}
+ODDS_TABLES = {m.odds_table: m.name for m in MARKETS.values()}
+MODEL_TABLE = "model_probabilities"
+
+
+# --- Odds math (vectorized) ---
+
+def american_to_decimal(odds: np.ndarray) -> np.ndarray:
+    odds = np.asarray(odds, dtype=float)
+    return np.where(odds > 0, 1 + odds / 100, 1 + 100 / np.abs(odds))
+
+
+def to_decimal(odds: np.ndarray, odds_format: str) -> np.ndarray:
+    if odds_format == "american":
+        return american_to_decimal(odds)
+    if odds_format == "decimal":
+        return np.asarray(odds, dtype=float)
+    raise ValueError(f"Unknown odds format: {odds_format}")
+
+
+def decimal_to_american(decimal: np.ndarray) -> np.ndarray:
+    decimal = np.asarray(decimal, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(decimal >= 2, (decimal - 1) * 100, -100 / (decimal - 1))
+
+
+def devig(implied: np.ndarray, groups: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Proportional vig removal: scale each group's implied probabilities so they
+    sum to that group's payout count (`targets[group]`). Only scales down, so
+    a market that lists part of the field is left at its implied prices.
+    """
+    totals = np.bincount(groups, weights=implied, minlength=len(targets))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(totals > 0, np.minimum(targets / totals, 1.0), 0.0)
+    return np.clip(implied * scale[groups], 0.0, 1.0)
+
+
+def kelly(prob: np.ndarray, decimal: np.ndarray, fraction: float = KELLY_FRACTION,
+          cap: float = MAX_STAKE) -> np.ndarray:
+    b = decimal - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        full = np.where(b > 0, (b * prob - (1 - prob)) / b, 0.0)
+    return np.clip(full * fraction, 0.0, cap)
+
+
+class Evaluation(NamedTuple):
+    market: np.ndarray      # market index per row
+    team_id: np.ndarray
+    decimal: np.ndarray
+    implied: np.ndarray
+    fair: np.ndarray
+    model: np.ndarray
+    edge: np.ndarray
+    ev: np.ndarray
+    kelly: np.ndarray
+
+
+def evaluate(markets: Sequence[Market], team_ids: Sequence[np.ndarray], odds: Sequence[np.ndarray],
+             model: Sequence[np.ndarray]) -> Evaluation:
+    """Score every market at once; the i-th arrays of each argument belong to markets[i]."""
+    groups = np.concatenate([np.full(len(t), i) for i, t in enumerate(team_ids)]).astype(int)
+    decimal = np.concatenate([to_decimal(o, m.odds_format) for o, m in zip(odds, markets)])
+    prob = np.concatenate(model)
+    implied = 1 / decimal
+    fair = devig(implied, groups, np.array([m.winners for m in markets], dtype=float))
+    return Evaluation(groups, np.concatenate(team_ids), decimal, implied, fair, prob,
+                      prob - fair, prob * decimal - 1, kelly(prob, decimal))
+
+
+# --- Incremental engine ---
+
+class MarketInputs(NamedTuple):
+    team_ids: np.ndarray
+    odds: np.ndarray       # in the market's own format
+    model: np.ndarray      # NaN where the model has no probability
+    model_version: Optional[str]
+
+
+class ValueBetEngine:
+    """Holds the latest inputs per market and the picks last written back."""
+
+    def __init__(self, markets: Dict[str, Market] = MARKETS):
+        self.markets = markets
+        self.inputs: Dict[str, MarketInputs] = {}
+        self.published: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self.computed_at: Optional[float] = None
+
+    def set_market(self, name: str, odds: Dict[int, float], model: Dict[int, float],
+                   model_version: Optional[str] = None) -> None:
+        """Replace one market's inputs ({team_id: price}, {team_id: probability})."""
+        ids = np.array(sorted(odds), dtype=np.int64)
+        self.inputs[name] = MarketInputs(
+            ids, np.array([odds[t] for t in ids.tolist()], dtype=float),
+            np.array([model.get(t, np.nan) for t in ids.tolist()], dtype=float), model_version)
+
+    def picks(self, names: Dict[int, str]) -> List[Dict[str, Any]]:
+        """Every market's value picks as `valuebets` rows, ranked by EV."""
+        order = [n for n in self.markets if n in self.inputs and len(self.inputs[n].team_ids)]
+        if not order:
+            return []
+        markets = [self.markets[n] for n in order]
+        inputs = [self.inputs[n] for n in order]
+        ev = evaluate(markets, [i.team_ids for i in inputs], [i.odds for i in inputs],
+                      [i.model for i in inputs])
+        self.computed_at = time.time()
+
+        keep = np.flatnonzero(~np.isnan(ev.model) & (ev.ev > MIN_EV))
+        keep = keep[np.argsort(-ev.ev[keep], kind="stable")]
+        american = decimal_to_american(ev.decimal)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fair_american = decimal_to_american(1 / ev.model)
+        rows = []
+        for rank, i in enumerate(keep.tolist(), 1):
+            market = markets[ev.market[i]]
+            team_id = int(ev.team_id[i])
+            rows.append({
+                "market_key": market.name,
+                "team_id": team_id,
+                "match": market.event,
+                "market": market.label,
+                "pick": names.get(team_id, str(team_id)),
+                "current_odds": f"{american[i]:+.0f}",
+                "fair_odds": int(round(fair_american[i])),
+                "implied_prob": round(float(ev.implied[i]), PRECISION),
+                "fair_prob": round(float(ev.fair[i]), PRECISION),
+                "model_prob": round(float(ev.model[i]), PRECISION),
+                "edge": round(float(ev.edge[i]), PRECISION),
+                "ev": round(float(ev.ev[i]), PRECISION),
+                "kelly": round(float(ev.kelly[i]), PRECISION),
+                "rank": rank,
+                "model_version": inputs[ev.market[i]].model_version,
+            })
+        return rows
+
+    def diff(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[str, int]]]:
+        """(rows to upsert, (market_key, team_id) keys to delete) against what was last written."""
+        current = {(r["market_key"], r["team_id"]): r for r in rows}
+        changed = [r for k, r in current.items() if self.published.get(k) != r]
+        removed = [k for k in self.published if k not in current]
+        return changed, removed
+
+
+# --- Loading and write-back ---
+
+def latest_by_team(rows: List[Dict[str, Any]], index: TeamIndex, value: str) -> Dict[int, float]:
+    """{team_id: value}, resolving `team` names; later rows (higher id) win."""
+    out: Dict[int, float] = {}
+    for row in sorted(rows, key=lambda r: r.get("id") or 0):
+        team_id = row.get("team_id")
+        if team_id is None:
+            team = index.resolve(str(row.get("team") or ""))
+            team_id = team["id"] if team else None
+        if team_id is not None and row.get(value) is not None:
+            out[team_id] = float(row[value])
+    return out
+
+
+def odds_filters(market: Market) -> Filters:
+    """Select only the market's competition and season from its odds table."""
+    return {"comp_id": ("eq", market.comp_id), "season_id": ("eq", market.season_id)}
+
+
+async def load_market(repo: SupabaseRepository, engine: ValueBetEngine, index: TeamIndex,
+                      name: str) -> None:
+    market = engine.markets[name]
+    odds_rows = await repo.select(market.odds_table, filters=odds_filters(market))
+    model_rows = await repo.select(MODEL_TABLE, filters={"market": ("eq", name)})
+    versions = {r.get("model_version") for r in model_rows} - {None}
+    engine.set_market(name, latest_by_team(odds_rows, index, "odds"),
+                      latest_by_team(model_rows, index, "probability"),
+                      max(versions) if versions else None)
+
+
+async def write_back(repo: SupabaseRepository, engine: ValueBetEngine,
+                     rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[str, int]]]:
+    """Upsert changed picks and delete ones that are no longer value. Returns (upserted, deleted keys)."""
+    changed, removed = engine.diff(rows)
+    if changed:
+        now = datetime.now(timezone.utc).isoformat()
+        await repo.upsert("valuebets", [dict(r, updated_at=now) for r in changed],
+                          on_conflict="market_key,team_id")
+    for market_key in {k[0] for k in removed}:
+        ids = [k[1] for k in removed if k[0] == market_key]
+        await repo.delete("valuebets", filters={"market_key": ("eq", market_key), "team_id": ("in", ids)})
+    engine.published = {(r["market_key"], r["team_id"]): r for r in rows}
+    return changed, removed
+
+
+def pick_key(row: Dict[str, Any]) -> str:
+    return f"{row['market_key']}:{row['team_id']}"
+
+
+class ValueBetService:
+    """
+    Recomputes and writes back value bets. `schedule` debounces bursts of
+    source-table writes into one refresh of just the affected markets.
+    """
+
+    def __init__(self, repo: SupabaseRepository, get_index: Callable[[], Awaitable[TeamIndex]],
+                 on_written: Callable[[List[Dict[str, Any]], List[Tuple[str, int]]], None],
+                 engine: Optional[ValueBetEngine] = None, debounce: float = 1.0):
+        self.repo = repo
+        self.get_index = get_index
+        self.on_written = on_written
+        self.engine = engine or ValueBetEngine()
+        self.debounce = debounce
+        self._lock = asyncio.Lock()
+        self._seeded = False
+        self._dirty: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self, markets: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        async with self._lock:
+            index = await self.get_index()
+            if not self._seeded:
+                # Start from what is in the table so stale picks get deleted
+                existing = await self.repo.select("valuebets")
+                self.engine.published = {(r["market_key"], r["team_id"]): r for r in existing
+                                         if r.get("market_key") and r.get("team_id") is not None}
+                self._seeded = True
+            names = list(markets or self.engine.markets)
+            for name in set(names) | (set(self.engine.markets) - set(self.engine.inputs)):
+                await load_market(self.repo, self.engine, index, name)
+            rows = self.engine.picks({t: team["name"] for t, team in index.teams.items()})
+            changed, removed = await write_back(self.repo, self.engine, rows)
+            self.on_written(changed, removed)
+            return {"picks": len(rows), "upserted": len(changed), "deleted": len(removed),
+                    "markets": sorted(names)}
+
+    def schedule(self, *tables: str) -> None:
+        """Mark markets fed by `tables` dirty and refresh them shortly (one run per burst)."""
+        for table in tables:
+            if table in ODDS_TABLES:
+                self._dirty.add(ODDS_TABLES[table])
+            elif table == MODEL_TABLE:
+                self._dirty.update(self.engine.markets)
+        if self._dirty and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run_scheduled())
+
+    async def _run_scheduled(self) -> None:
+        await asyncio.sleep(self.debounce)
+        markets, self._dirty = self._dirty, set()
+        try:
+            await self.refresh(markets)
+        except Exception as e:
+            print(f"Value bet refresh failed: {e}")
@@ -48,10 +48,47 @@ export async function fetchResults() {
   return res.json();
 }
 
-export async function fetchUserBets(userId, betType) {
-  const res = await fetch(`${API_BASE}/user_bets?user_id=${userId}&bet_type=${betType}`);
+// accessToken: the signed-in user's Supabase session token; only their own bets are returned.
+export async function fetchUserBets(accessToken, betType) {
+  const res = await fetch(`${API_BASE}/user_bets?bet_type=${betType}`, {
+    headers: { Authorization: `Bearer ${accessToken}` },
+  });
   if (!res.ok) {
     throw new Error(`API error: ${res.status}`);
   }
   return res.json();
-}
\ No newline at end of file
+}
+
+export async function fetchBulkStats({ teamIds = [], teams = [], categories = [] } = {}) {
+  const params = new URLSearchParams();
+  if (teamIds.length) params.set("team_ids", teamIds.join(","));
+  if (teams.length) params.set("teams", teams.join(","));
+  if (categories.length) params.set("categories", categories.join(","));
+  const res = await fetch(`${API_BASE}/stats/bulk?${params}`);
+  if (!res.ok) {
+    throw new Error(`API error: ${res.status}`);
+  }
+  return res.json(); // one document per team, keyed by category
+}
+
+// Live updates instead of polling. topics: e.g. ["matches", "match:12", "valuebets", "odds"].
+// onEvents receives arrays of {topic, type, key, changes}. When the server dropped a topic's
+// events, onResync receives the topics to refetch over REST instead.
+// Returns a function that closes the subscription.
+export function subscribeLive(topics, onEvents, onResync) {
+  const url = `${API_BASE.replace(/^http/, "ws")}/live?topics=${encodeURIComponent(topics.join(","))}`;
+  const ws = new WebSocket(url);
+  ws.onmessage = (msg) => {
+    const frame = JSON.parse(msg.data);
+    if (frame.error !== undefined) {
+      console.error("Live subscription error:", frame.error);
+      return;
+    }
+    if (!Array.isArray(frame.events)) return;
+    const resync = frame.events.filter((e) => e.type === "resync").map((e) => e.topic);
+    const events = frame.events.filter((e) => e.type !== "resync");
+    if (resync.length && onResync) onResync(resync);
+    if (events.length) onEvents(events);
+  };
+  return () => ws.close();
+}
@@ -51,15 +51,39 @@ export default function ChatbotWidget() {
             responseText = "I can help with match stats, team rosters, and value bets.";
         }
       } else {
-        const res = await fetch(`${API_BASE_URL}/chat`, {
+        // Stream tokens over SSE so the answer renders as it is generated
+        const res = await fetch(`${API_BASE_URL}/chat/stream`, {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify({ query: text })
         });
 
-        if (!res.ok) throw new Error("Backend error");
-        const data = await res.json();
-        responseText = data.response;
+        if (!res.ok || !res.body) throw new Error("Backend error");
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+
+          // SSE events are separated by a blank line
+          const events = buffer.split("\n\n");
+          buffer = events.pop();
+          for (const raw of events) {
+            const lines = raw.split("\n");
+            const event = lines.find(l => l.startsWith("event: "))?.slice(7);
+            const data = lines.find(l => l.startsWith("data: "))?.slice(6);
+            if (!data) continue;
+            if (event === "error") throw new Error("Backend error");
+            if (event === "done") continue;
+            responseText += JSON.parse(data).text;
+            setMessages(prev => prev.map(m =>
+              m.id === thinkingId ? { ...m, text: responseText, isThinking: false } : m
+            ));
+          }
+        }
       }
 
       setMessages(prev => prev.map(m => 